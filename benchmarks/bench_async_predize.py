@@ -0,0 +1,56 @@
+"""
+Descarga de mensajes para miles de tickets contra el stub local: Predize
+(ThreadPoolExecutor de --hilos hilos) frente a AsyncPredize (un solo event loop).
+
+Por defecto ninguno de los dos clientes limita el ritmo (--rps), así se mide
+hilos contra event loop y no el token bucket; con --rps los dos comparten el
+mismo límite.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_async_predize --tickets 2000 --latencia 0.05
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.predize_stub import PredizeStub
+from src.async_predize import AsyncPredize
+from src.predize import Predize
+
+
+async def con_async(url, ticket_ids, concurrencia, rps):
+    async with AsyncPredize('bench@example.com', 'bench', main_url=url, max_concurrency=concurrencia,
+                            requests_per_second=rps) as predize:
+        return await predize.get_messages_in_parallel(ticket_ids)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tickets', type=int, default=2000)
+    parser.add_argument('--latencia', type=float, default=0.05)
+    parser.add_argument('--hilos', type=int, default=50)
+    parser.add_argument('--concurrencia', type=int, default=200)
+    parser.add_argument('--rps', type=float, default=None, help='límite de pedidos por segundo de cada cliente')
+    args = parser.parse_args()
+
+    stub = PredizeStub(n_tickets=args.tickets, mensajes_por_ticket=5, latencia=args.latencia)
+    url = stub.iniciar()
+    ticket_ids = list(range(1, args.tickets + 1))
+    try:
+        predize_instance = Predize('bench@example.com', 'bench', main_url=url, pool_size=args.hilos,
+                                   requests_per_second=args.rps)
+        t0 = time.perf_counter()
+        hilos = predize_instance.get_messages_in_parallel(ticket_ids, max_workers=args.hilos)
+        t_hilos = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        corutinas = asyncio.run(con_async(url, ticket_ids, args.concurrencia, args.rps))
+        t_async = time.perf_counter() - t0
+    finally:
+        stub.detener()
+
+    errores = sum(isinstance(r, Exception) for r in corutinas)
+    print(f"{args.tickets} tickets, latencia del stub {args.latencia * 1000:.0f} ms, "
+          f"límite de ritmo: {f'{args.rps:g} pedidos/s' if args.rps else 'ninguno'}")
+    print(f"Predize ({args.hilos:>4} hilos, pool {args.hilos}):    {t_hilos:7.2f}s")
+    print(f"AsyncPredize (1 hilo, {args.concurrencia:>4} en vuelo): {t_async:7.2f}s, errores={errores}")
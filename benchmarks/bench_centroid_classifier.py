@@ -0,0 +1,65 @@
+"""
+Latencia por lote de BERTopic.transform (UMAP/HDBSCAN) contra el clasificador
+por centroides, con los mismos embeddings precalculados. También informa la
+coincidencia de topics y ajusta la temperatura contra las etiquetas de BERTopic;
+con --guardar la deja junto a topic_embeddings.bin, de donde la toma
+cargar_clasificador_centroides (main.py y el topic worker).
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_centroid_classifier --repeticiones 20 --guardar
+"""
+import argparse
+import os
+import time
+from statistics import median
+
+import numpy as np
+
+from src.centroid_classifier import guardar_temperatura
+from src.topic_model import RUTA_MODELO, cargar_modelo_bertopic, cargar_clasificador_centroides
+
+RUTA_FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'mensajes.txt')
+
+
+def medir(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - t0)
+    return median(tiempos)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeticiones', type=int, default=20)
+    parser.add_argument('--guardar', action='store_true', help='guarda la temperatura ajustada con el modelo')
+    args = parser.parse_args()
+
+    with open(RUTA_FIXTURE) as f:
+        mensajes = [line.strip() for line in f if line.strip()]
+
+    modelo = cargar_modelo_bertopic()
+    clasificador = cargar_clasificador_centroides()
+    embeddings = modelo.embedding_model.embed_documents(mensajes)
+
+    t_bertopic = medir(lambda: modelo.transform(mensajes, embeddings=embeddings), args.repeticiones)
+    t_centroides = medir(lambda: clasificador.transform(mensajes, embeddings=embeddings), args.repeticiones)
+
+    topics_bertopic, _ = modelo.transform(mensajes, embeddings=embeddings)
+    topics_centroides, _ = clasificador.transform(mensajes, embeddings=embeddings)
+    coincidencia = np.mean(np.asarray(topics_bertopic) == topics_centroides)
+
+    temperatura = clasificador.ajustar_temperatura(embeddings, list(topics_bertopic))
+    _, puntajes = clasificador.transform(mensajes, embeddings=embeddings)
+
+    print(f"Lote de {len(mensajes)} mensajes (mediana de {args.repeticiones} repeticiones)")
+    print(f"BERTopic.transform:   {t_bertopic * 1000:8.2f} ms")
+    print(f"Centroides:           {t_centroides * 1000:8.2f} ms")
+    print(f"Aceleración:          {t_bertopic / t_centroides:8.1f}x")
+    print(f"Coincidencia topics:  {coincidencia:.1%}")
+    print(f"Temperatura ajustada: {temperatura:.4f} "
+          f"(probabilidad máxima mediana {np.median(puntajes.max(axis=1)):.2f})")
+    if args.guardar:
+        guardar_temperatura(RUTA_MODELO, temperatura, mensajes=len(mensajes), coincidencia=float(coincidencia))
+        print(f"Temperatura guardada en {RUTA_MODELO}")
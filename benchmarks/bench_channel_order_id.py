@@ -0,0 +1,65 @@
+"""
+paso_5 contra un stub local de Predize: el loop secuencial original
+(requests.get por ticket, sin sesión) frente a Predize.get_channel_order_ids.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_channel_order_id --tickets 300 --latencia 0.05
+"""
+import argparse
+import time
+
+import requests
+
+from benchmarks.predize_stub import PredizeStub
+from src.predize import Predize
+
+
+def secuencial(predize_instance, ticket_ids):
+    # Copia del paso_5 original
+    def get_channel_order_id(ticket_id):
+        url = f"{predize_instance.MAIN_URL}/v1/tickets/{ticket_id}/order"
+        response = requests.get(url, headers=predize_instance.headers)
+        response.raise_for_status()
+        data = response.json()
+        return data[0].get('channelOrderId') if data else None
+
+    resultados = {}
+    for ticket_id in ticket_ids:
+        try:
+            resultados[ticket_id] = get_channel_order_id(ticket_id)
+        except requests.HTTPError:
+            # El original aborta todo el paso en el primer 404; acá se sigue para poder medir
+            resultados[ticket_id] = None
+    return resultados
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tickets', type=int, default=300)
+    parser.add_argument('--latencia', type=float, default=0.05)
+    parser.add_argument('--max-in-flight', type=int, default=10)
+    parser.add_argument('--rps', type=float, default=None)
+    args = parser.parse_args()
+
+    stub = PredizeStub(n_tickets=args.tickets, latencia=args.latencia)
+    url = stub.iniciar()
+    try:
+        predize_instance = Predize('bench@example.com', 'bench', main_url=url)
+        ticket_ids = [str(i) for i in range(1, args.tickets + 1)]
+
+        t0 = time.perf_counter()
+        esperado = secuencial(predize_instance, ticket_ids)
+        t_secuencial = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        obtenido = predize_instance.get_channel_order_ids(ticket_ids, max_in_flight=args.max_in_flight,
+                                                          requests_per_second=args.rps)
+        t_concurrente = time.perf_counter() - t0
+    finally:
+        stub.detener()
+
+    print(f"{args.tickets} tickets, latencia del stub {args.latencia * 1000:.0f} ms")
+    print(f"Secuencial:  {t_secuencial:7.2f}s")
+    print(f"Concurrente: {t_concurrente:7.2f}s (max_in_flight={args.max_in_flight}, rps={args.rps})")
+    print(f"Aceleración: {t_secuencial / t_concurrente:7.1f}x")
+    print(f"Resultados iguales: {esperado == obtenido}")
@@ -0,0 +1,69 @@
+"""
+100 consultas chicas con get_data y execute_sql: una conexión nueva por
+llamada (como antes: psycopg2.connect / create_engine + dispose) frente al
+pool compartido de database.connection_registry.
+
+Contra una base local no hay TLS ni latencia de red, así que la diferencia es
+un piso de lo que se ahorra contra RDS.
+
+Uso (desde la raíz del repo; credenciales de las variables DB_* como en .env):
+    python -m benchmarks.bench_connection_pool --consultas 100
+"""
+import argparse
+import time
+
+import pandas as pd
+import psycopg2
+from sqlalchemy import create_engine, text
+
+from database.connection_registry import credentials_url, dispose_engines
+from database.execute_sql import execute_sql
+from database.get_data import get_data
+from database_credentials.db_credentials_nocnoc import db_credentials_nocnoc
+
+CONSULTA = "SELECT 1 AS uno, now() AS ahora"
+
+
+def get_data_sin_pool(query, c):
+    # Lo que hacía database.get_data: una conexión nueva por consulta
+    with psycopg2.connect(host=c['host'], port=c['port'], dbname=c['dbname'],
+                          user=c['user'], password=c['password']) as conn:
+        return pd.read_sql(query, conn)
+
+
+def execute_sql_sin_pool(sql_statement, creds):
+    # Lo que hacía database.execute_sql: un engine nuevo por sentencia
+    db = create_engine(creds)
+    with db.begin() as con:
+        con.execute(text(sql_statement))
+    db.dispose()
+
+
+def medir(funcion, n):
+    t0 = time.perf_counter()
+    for _ in range(n):
+        funcion()
+    return time.perf_counter() - t0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--consultas', type=int, default=100)
+    args = parser.parse_args()
+
+    creds = db_credentials_nocnoc['postgres_admin']
+    url = credentials_url(creds)
+    n = args.consultas
+
+    casos = {
+        'get_data sin pool': lambda: get_data_sin_pool(CONSULTA, creds),
+        'get_data con pool': lambda: get_data(CONSULTA, creds),
+        'execute_sql sin pool': lambda: execute_sql_sin_pool(CONSULTA, url),
+        'execute_sql con pool': lambda: execute_sql(CONSULTA, url),
+    }
+    print(f"{n} consultas por caso")
+    for nombre, funcion in casos.items():
+        dispose_engines()
+        segundos = medir(funcion, n)
+        print(f"  {nombre:>21}: {segundos:6.3f}s ({segundos / n * 1000:6.2f} ms por consulta)")
+    dispose_engines()
@@ -0,0 +1,74 @@
+"""
+get_data (todo el resultado en un DataFrame) frente a get_data_iter con un
+cursor del servidor, en DataFrames y en RecordBatches de Arrow: tiempo total,
+tiempo hasta el primer lote y pico de memoria de Python (tracemalloc, en una
+corrida aparte). Cada lote se consume y se descarta, como haría un proceso
+que agrega o escribe a disco. Comprueba que los lotes juntos dan lo mismo
+que get_data.
+
+Uso (desde la raíz del repo; credenciales de las variables DB_* como en .env):
+    python -m benchmarks.bench_get_data_iter --filas 1000000
+"""
+import argparse
+import time
+import tracemalloc
+
+import pandas as pd
+
+from database.get_data import get_data, get_data_iter
+from database_credentials.db_credentials_nocnoc import db_credentials_nocnoc
+
+
+def consulta(filas):
+    # Con la forma de warehouse.raw_merchant_invoice_id
+    return f"""
+        SELECT g AS id, 'k' || g AS raw_merchant_invoice_id,
+               CASE WHEN g % 3 = 0 THEN NULL ELSE g * 10 END AS order_id,
+               timestamp '2024-01-01' + g * interval '1 second' AS updated_at, g % 50 AS merchant_id
+        FROM generate_series(1, {filas}) g
+    """
+
+
+def entero(query, creds):
+    yield get_data(query, creds)
+
+
+def consumir(lotes):
+    t0 = time.perf_counter()
+    primero, filas = None, 0
+    for lote in lotes:
+        if primero is None:
+            primero = time.perf_counter() - t0
+        filas += lote.num_rows if hasattr(lote, 'num_rows') else len(lote)
+    return time.perf_counter() - t0, primero, filas
+
+
+def medir(nombre, crear_lotes):
+    segundos, primero, filas = consumir(crear_lotes())
+    tracemalloc.start()
+    consumir(crear_lotes())
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {nombre:>22}: {segundos:6.2f}s, primer lote a los {primero:6.2f}s, "
+          f"pico de memoria {pico / 2**20:8.1f} MB ({filas} filas)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--filas', type=int, default=1_000_000)
+    parser.add_argument('--chunksize', type=int, default=50_000)
+    args = parser.parse_args()
+
+    creds = db_credentials_nocnoc['postgres_admin']
+    query = consulta(args.filas)
+
+    chica = consulta(20_000)
+    por_lotes = pd.concat(get_data_iter(chica, creds, chunksize=3_000, dtype={'order_id': 'float64'}),
+                          ignore_index=True)
+    pd.testing.assert_frame_equal(por_lotes, get_data(chica, creds))
+    print("Los lotes juntos dan lo mismo que get_data")
+
+    print(f"{args.filas} filas, lotes de {args.chunksize}")
+    medir('get_data', lambda: entero(query, creds))
+    medir('get_data_iter pandas', lambda: get_data_iter(query, creds, chunksize=args.chunksize))
+    medir('get_data_iter arrow', lambda: get_data_iter(query, creds, chunksize=args.chunksize, output='arrow'))
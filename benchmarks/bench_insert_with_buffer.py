@@ -0,0 +1,81 @@
+"""
+insert_with_buffer: el CSV entero en un io.StringIO antes del COPY (como
+antes) frente al stream por lotes, en CSV y en binario. Mide tiempo y pico
+de memoria de Python (tracemalloc, en una carga aparte) y comprueba que las
+tres cargas dejan la misma tabla.
+
+Uso (desde la raíz del repo; credenciales de las variables DB_* como en .env):
+    python -m benchmarks.bench_insert_with_buffer --filas 500000
+"""
+import argparse
+import io
+import time
+import tracemalloc
+
+import pandas as pd
+
+from benchmarks.bench_upload_table import frame
+from database.connection_registry import pooled_connection
+from database.execute_sql import execute_sql
+from database.get_data import get_data
+from database.insert_with_buffer import insert_with_buffer
+from database_credentials.db_credentials_nocnoc import db_credentials_nocnoc
+
+ESQUEMA = 'development'
+TABLA = 'bench_insert_with_buffer'
+DDL = f"""
+CREATE TABLE {ESQUEMA}.{TABLA} (
+    id bigint, order_id bigint, monto double precision,
+    merchant_invoice_id text, creado timestamp, activo boolean
+)
+"""
+
+
+def insert_todo_en_memoria(df, creds, table, schema):
+    # Lo que hacía insert_with_buffer: todo el CSV en un StringIO y un solo COPY
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    with pooled_connection(creds) as conn, conn.cursor() as cursor:
+        cursor.copy_expert(f"COPY {schema}.{table} FROM STDIN (FORMAT 'csv', HEADER false)", buffer)
+
+
+def medir(nombre, funcion, creds):
+    # Tiempo sin tracemalloc (lo hace mucho más lento) y pico de memoria en otra carga
+    execute_sql(f"TRUNCATE {ESQUEMA}.{TABLA}", creds)
+    t0 = time.perf_counter()
+    funcion()
+    segundos = time.perf_counter() - t0
+    contenido = get_data(f"SELECT * FROM {ESQUEMA}.{TABLA} ORDER BY id", creds)
+    execute_sql(f"TRUNCATE {ESQUEMA}.{TABLA}", creds)
+    tracemalloc.start()
+    funcion()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {nombre:>22}: {segundos:6.2f}s, pico de memoria {pico / 2**20:8.1f} MB")
+    return contenido
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--filas', type=int, default=500_000)
+    args = parser.parse_args()
+
+    creds = db_credentials_nocnoc['postgres_admin']
+    execute_sql(f"CREATE SCHEMA IF NOT EXISTS {ESQUEMA}; DROP TABLE IF EXISTS {ESQUEMA}.{TABLA}; {DDL}", creds)
+    df = frame(args.filas)
+    # La cadena vacía no sobrevive a COPY csv con NULL '' (queda nula): se compara sin ella
+    df['merchant_invoice_id'] = df['merchant_invoice_id'].replace('', 'vacío')
+
+    print(f"{args.filas} filas")
+    resultados = {
+        'StringIO entero': medir('StringIO entero', lambda: insert_todo_en_memoria(df, creds, TABLA, ESQUEMA), creds),
+        'stream csv': medir('stream csv', lambda: insert_with_buffer(df, creds, TABLA, ESQUEMA), creds),
+        'stream binario': medir('stream binario',
+                                lambda: insert_with_buffer(df, creds, TABLA, ESQUEMA, copy_format='binary'), creds),
+    }
+    base = resultados['StringIO entero']
+    for nombre, contenido in resultados.items():
+        pd.testing.assert_frame_equal(base, contenido)
+    print("Misma tabla con las tres cargas")
+    execute_sql(f"DROP TABLE {ESQUEMA}.{TABLA}", creds)
@@ -0,0 +1,103 @@
+"""
+get_raw_merchant_invoice_id fila por fila (Series.map), InvoiceIdNormalizer.raw_serie
+(una vez por id distinto, con memoria) y get_raw_merchant_invoice_ids sobre la columna entera.
+
+Antes de medir hace un chequeo de propiedades: ids aleatorios armados con
+guiones, dígitos, sufijos de suffix_list en mayúsculas y minúsculas,
+caracteres no ASCII y saltos de línea, más casos borde, tienen que dar
+exactamente lo mismo con las tres versiones (como Serie y como array de Arrow).
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_invoice_ids --filas 1000000
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from data_manipulation.data_manipulation import (
+    InvoiceIdNormalizer, get_raw_merchant_invoice_id, get_raw_merchant_invoice_ids, suffix_list)
+
+CASOS_BORDE = [
+    '', '-', '--', 'a-', '-1', '1', '5-', 'abc-0', 'abc-1', 'abc-99', 'abc-100', 'abc-01', 'abc- 1',
+    'abc-1\n', 'abc-\n1', 'x-REENVIO', 'x-ReEnViO2', 'a-b-final', 'a-b-c', 'LU-123', 'LU-123-2',
+    'ab-FİNAL', 'ab-fİnal', 'a-ſend', 'a-ÀU', 'a-au', 'a-Au', 'ñ-del', 'x-cancelledX', 'a-b-',
+]
+
+
+def id_aleatorio(rng):
+    piezas = [rng.choice('0123456789'), rng.choice('abcXYZ'), '-', '-', rng.choice(suffix_list),
+              rng.choice(suffix_list).upper(), str(rng.randint(0, 120)), 'İ', 'ß', 'ñ', '\n', ' ']
+    return ''.join(rng.choice(piezas) for _ in range(rng.randint(0, 8)))
+
+
+def chequear_propiedades(n, semilla=0):
+    rng = random.Random(semilla)
+    ids = CASOS_BORDE + [id_aleatorio(rng) for _ in range(n)]
+    esperado = [get_raw_merchant_invoice_id(x) for x in ids]
+    serie = pd.Series(ids + [None], index=np.arange(len(ids) + 1) * 3)
+    obtenido_serie = get_raw_merchant_invoice_ids(serie)
+    assert obtenido_serie.index.equals(serie.index)
+    assert pd.isna(obtenido_serie.iloc[-1])
+    assert obtenido_serie.iloc[:-1].tolist() == esperado
+    chunks = pa.chunked_array([ids[:len(ids) // 2], ids[len(ids) // 2:]])
+    assert get_raw_merchant_invoice_ids(chunks).to_pylist() == esperado
+    assert [InvoiceIdNormalizer().raw(x) for x in ids] == esperado
+    assert InvoiceIdNormalizer().raw_serie(serie).iloc[:-1].tolist() == esperado
+    distintos = sum(a != b for a, b in zip(ids, esperado))
+    print(f"Chequeo de propiedades: {len(ids)} ids ({distintos} con sufijo recortado), resultado idéntico")
+
+
+def ids_realistas(filas, distintos=None, semilla=0):
+    rng = np.random.default_rng(semilla)
+    base = rng.integers(10**9, 10**10, size=filas).astype(str).astype(object)
+    tipo = rng.random(filas)
+    sufijos = np.array(suffix_list + [s.upper() for s in suffix_list], dtype=object)
+    ids = base.copy()
+    ids[tipo < 0.3] = 'LU-' + base[tipo < 0.3]
+    con_numero = (tipo >= 0.3) & (tipo < 0.4)
+    ids[con_numero] = base[con_numero] + '-' + rng.integers(1, 130, size=con_numero.sum()).astype(str)
+    con_sufijo = (tipo >= 0.4) & (tipo < 0.5)
+    ids[con_sufijo] = base[con_sufijo] + '-' + rng.choice(sufijos, size=con_sufijo.sum())
+    if distintos:
+        # Los mismos ids se repiten en muchas filas (varios tickets por orden, corridas sucesivas)
+        ids = ids[rng.integers(0, min(distintos, filas), size=filas)]
+    return pd.Series(ids)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--filas', type=int, default=1_000_000)
+    parser.add_argument('--distintos', type=int, default=50_000)
+    parser.add_argument('--casos', type=int, default=200_000)
+    args = parser.parse_args()
+
+    chequear_propiedades(args.casos)
+
+    serie = ids_realistas(args.filas, args.distintos)
+    t0 = time.perf_counter()
+    escalar = serie.map(get_raw_merchant_invoice_id)
+    t_escalar = time.perf_counter() - t0
+    normalizador = InvoiceIdNormalizer()
+    t0 = time.perf_counter()
+    memoizado = normalizador.raw_serie(serie)
+    t_memoizado = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    vectorizado = get_raw_merchant_invoice_ids(serie)
+    t_vectorizado = time.perf_counter() - t0
+    arrow = pa.array(serie)
+    t0 = time.perf_counter()
+    get_raw_merchant_invoice_ids(arrow)
+    t_arrow = time.perf_counter() - t0
+
+    assert escalar.equals(vectorizado) and escalar.tolist() == memoizado.tolist()
+    tasa = normalizador.estadisticas()['tasa_aciertos']
+    print(f"{args.filas} ids ({serie.nunique()} distintos)")
+    print(f"  Series.map(get_raw_merchant_invoice_id): {t_escalar:.3f}s")
+    print(f"  InvoiceIdNormalizer.raw_serie:          {t_memoizado:.3f}s ({t_escalar / t_memoizado:.1f}x, "
+          f"{tasa:.0%} aciertos en memoria)")
+    print(f"  get_raw_merchant_invoice_ids (Serie):    {t_vectorizado:.3f}s ({t_escalar / t_vectorizado:.1f}x)")
+    print(f"  get_raw_merchant_invoice_ids (Arrow):    {t_arrow:.3f}s ({t_escalar / t_arrow:.1f}x)")
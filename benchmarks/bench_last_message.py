@@ -0,0 +1,40 @@
+"""
+Bytes y tiempo de get_last_message_for_tickets contra el stub local, según
+el modo: 'page' (una página de 100 mensajes, como antes), 'scan' y 'ends'.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_last_message --tickets 300 --mensajes 150
+"""
+import argparse
+import time
+
+from benchmarks.predize_stub import PredizeStub
+from src.predize import Predize
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tickets', type=int, default=300)
+    parser.add_argument('--mensajes', type=int, default=150)
+    parser.add_argument('--latencia', type=float, default=0.01)
+    parser.add_argument('--desc', action='store_true', help='El stub devuelve los mensajes del más nuevo al más viejo')
+    args = parser.parse_args()
+
+    stub = PredizeStub(n_tickets=args.tickets, mensajes_por_ticket=args.mensajes, latencia=args.latencia,
+                       mensajes_desc=args.desc)
+    url = stub.iniciar()
+    ticket_ids = list(range(1, args.tickets + 1))
+    esperado = (args.mensajes - 1)
+    try:
+        for modo in ('page', 'scan', 'ends'):
+            predize_instance = Predize('bench@example.com', 'bench', main_url=url)
+            stub.pedidos.clear()
+            t0 = time.perf_counter()
+            ultimos = predize_instance.get_last_message_for_tickets(ticket_ids, mode=modo)
+            segundos = time.perf_counter() - t0
+            correctos = sum(m['id'] == t * 1000 + esperado for t, m in ultimos.items())
+            total = sum(predize_instance.last_message_bytes.values())
+            print(f"{modo:>5}: {segundos:6.2f}s, {stub.pedidos['/v1/tickets/{id}/messages']:5d} pedidos, "
+                  f"{total / 1024:9.1f} KiB ({total / len(ticket_ids):8.0f} B/ticket), "
+                  f"correctos {correctos}/{len(ticket_ids)}")
+    finally:
+        stub.detener()
@@ -0,0 +1,72 @@
+"""
+Chequeo de exactitud y throughput del backend ONNX int8 contra PyTorch.
+
+Sobre el corpus de fixtures compara los topics asignados por ambos backends
+(BERTopic y centroides) y la similitud coseno entre embeddings, y mide
+mensajes/segundo de cada backend. Sale con código 1 si la coincidencia de
+topics queda por debajo de --min-coincidencia.
+
+Uso (desde la raíz del repo, con el modelo ya exportado):
+    python -m src.onnx_embedder --exportar
+    python -m benchmarks.bench_onnx_embedder --mensajes 2000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from src.topic_model import cargar_embedder, cargar_modelo_bertopic, cargar_clasificador_centroides
+
+RUTA_FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'mensajes.txt')
+
+
+def throughput(embedder, mensajes):
+    embedder.embed_documents(mensajes[:8])  # calentamiento
+    t0 = time.perf_counter()
+    embedder.embed_documents(mensajes)
+    return len(mensajes) / (time.perf_counter() - t0)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--mensajes', type=int, default=2000)
+    parser.add_argument('--min-coincidencia', type=float, default=0.95)
+    args = parser.parse_args()
+
+    with open(RUTA_FIXTURE) as f:
+        corpus = [line.strip() for line in f if line.strip()]
+
+    pytorch = cargar_embedder('pytorch')
+    onnx = cargar_embedder('onnx')
+
+    emb_pytorch = np.asarray(pytorch.embed_documents(corpus))
+    emb_onnx = np.asarray(onnx.embed_documents(corpus))
+    cosenos = (emb_pytorch * emb_onnx).sum(axis=1) / (
+        np.linalg.norm(emb_pytorch, axis=1) * np.linalg.norm(emb_onnx, axis=1))
+
+    modelo = cargar_modelo_bertopic()
+    topics_pt, _ = modelo.transform(corpus, embeddings=emb_pytorch)
+    topics_ox, _ = modelo.transform(corpus, embeddings=emb_onnx)
+    coincidencia_bertopic = np.mean(np.asarray(topics_pt) == np.asarray(topics_ox))
+
+    clasificador = cargar_clasificador_centroides()
+    centroides_pt, _ = clasificador.transform(corpus, embeddings=emb_pytorch)
+    centroides_ox, _ = clasificador.transform(corpus, embeddings=emb_onnx)
+    coincidencia_centroides = np.mean(centroides_pt == centroides_ox)
+
+    mensajes = (corpus * (args.mensajes // len(corpus) + 1))[:args.mensajes]
+    mps_pytorch = throughput(pytorch, mensajes)
+    mps_onnx = throughput(onnx, mensajes)
+
+    print(f"Corpus de {len(corpus)} mensajes")
+    print(f"Coseno PyTorch vs ONNX:       min={cosenos.min():.4f} media={cosenos.mean():.4f}")
+    print(f"Coincidencia topics BERTopic:   {coincidencia_bertopic:.1%}")
+    print(f"Coincidencia topics centroides: {coincidencia_centroides:.1%}")
+    print(f"Throughput PyTorch: {mps_pytorch:8.1f} mensajes/s")
+    print(f"Throughput ONNX:    {mps_onnx:8.1f} mensajes/s ({mps_onnx / mps_pytorch:.1f}x)")
+
+    if min(coincidencia_bertopic, coincidencia_centroides) < args.min_coincidencia:
+        print("La coincidencia de topics está por debajo del mínimo.")
+        sys.exit(1)
@@ -0,0 +1,117 @@
+"""
+Pedidos a la API y filas del warehouse por corrida de main.py según el plan:
+'original' (enriquecer todo y filtrar al final) frente a 'filtrar_primero'.
+
+Corre los pasos reales de main.py contra el stub de Predize. El warehouse se
+reemplaza por un lookup que cuenta los ids consultados, y la clasificación
+por una asignación determinística de topics de topic_names.txt (un
+`--fraccion-tracking` de los mensajes cae en un topic de Tracking con
+probabilidad alta), para no depender del modelo.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_plan_enriquecimiento --tickets 2000
+"""
+import argparse
+import time
+import zlib
+from concurrent.futures import Future
+
+import pandas as pd
+
+import main
+from benchmarks.predize_stub import PredizeStub
+from src.pipeline_runner import PipelineRunner
+from src.predize import Predize
+from src.topic_model import cargar_topic_names
+
+
+def futuro_listo(valor):
+    futuro = Future()
+    futuro.set_result(valor)
+    return futuro
+
+
+class WarehouseContador:
+    """
+    Reemplaza a OrderIdLookup: cuenta las claves consultadas y responde un order_id por clave.
+    """
+
+    def __init__(self):
+        self.consultas = 0
+        self.ids_consultados = 0
+        self.filas_devueltas = 0
+
+    def registrar_estadisticas(self):
+        pass
+
+    def buscar(self, claves):
+        ids = [str(c) for c in claves]
+        self.consultas += 1
+        self.ids_consultados += len(ids)
+        df = pd.DataFrame({'raw_merchant_invoice_id': ids, 'order_id': range(len(ids))})
+        self.filas_devueltas += len(df)
+        return df
+
+
+def clasificador_falso(topic_map, fraccion_tracking):
+    tracking = [t for t, nombre in topic_map.items() if nombre.lower() == 'tracking']
+    otros = [t for t, nombre in topic_map.items() if nombre.lower() != 'tracking']
+
+    def asignar(df, modelo):
+        claves = [zlib.crc32(str(m).encode()) for m in df['message']]
+        df['topic_number'] = [tracking[c % len(tracking)] if c % 1000 < fraccion_tracking * 1000
+                              else otros[c % len(otros)] for c in claves]
+        df['probability'] = [0.9 if c % 7 else 0.5 for c in claves]
+        return df
+
+    return asignar
+
+
+def correr(plan, url, stub, topic_map, fraccion_tracking):
+    warehouse = WarehouseContador()
+    main.obtener_order_id_lookup = lambda: warehouse
+    main.paso_1_crear_instancia = lambda: Predize('bench@example.com', 'bench', main_url=url)
+    main.paso_9_asignar_topics = clasificador_falso(topic_map, fraccion_tracking)
+    etapas = main.construir_etapas(None, futuro_listo(object()), futuro_listo(topic_map), plan=plan)
+    runner = PipelineRunner(etapas, ruta_metricas=None)
+    stub.pedidos.clear()
+    t0 = time.perf_counter()
+    valores = runner.ejecutar()
+    segundos = time.perf_counter() - t0
+    final = valores.get('df_final', pd.DataFrame(columns=['ticket_id']))
+    return {
+        'segundos': segundos,
+        'mensajes': stub.pedidos['/v1/tickets/{id}/messages'],
+        'ordenes': stub.pedidos['/v1/tickets/{id}/order'],
+        'ids_warehouse': warehouse.ids_consultados,
+        'filas_warehouse': warehouse.filas_devueltas,
+        'final': set(final['ticket_id']),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tickets', type=int, default=2000)
+    parser.add_argument('--latencia', type=float, default=0.005)
+    parser.add_argument('--fraccion-tracking', type=float, default=0.15)
+    args = parser.parse_args()
+
+    stub = PredizeStub(n_tickets=args.tickets, mensajes_por_ticket=3, latencia=args.latencia)
+    url = stub.iniciar()
+    topic_map = cargar_topic_names()
+    try:
+        resultados = {plan: correr(plan, url, stub, topic_map, args.fraccion_tracking)
+                      for plan in ('original', 'filtrar_primero')}
+    finally:
+        stub.detener()
+
+    print(f"{args.tickets} tickets, {args.fraccion_tracking:.0%} de mensajes de Tracking")
+    for plan, r in resultados.items():
+        print(f"{plan:>16}: {r['segundos']:6.2f}s, pedidos de mensajes {r['mensajes']:5d}, "
+              f"de orden {r['ordenes']:5d}, ids al warehouse {r['ids_warehouse']:5d}, "
+              f"filas del warehouse {r['filas_warehouse']:5d}, resultado {len(r['final'])} tickets")
+    original, nuevo = resultados['original'], resultados['filtrar_primero']
+    ahorro_api = (original['mensajes'] + original['ordenes']) - (nuevo['mensajes'] + nuevo['ordenes'])
+    print(f"Pedidos a la API ahorrados: {ahorro_api}; "
+          f"filas del warehouse ahorradas: {original['filas_warehouse'] - nuevo['filas_warehouse']}")
+    print(f"Mismo resultado final: {original['final'] == nuevo['final']}")
@@ -0,0 +1,40 @@
+"""
+get_tickets_in_parallel sobre muchas páginas contra el stub local, con una
+fracción de respuestas 429 + Retry-After. Informa el tiempo total, los pedidos
+que recibió el stub y si se obtuvieron todas las páginas.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_predize_rate_limit --paginas 200 --fraccion-429 0.05
+"""
+import argparse
+import time
+
+from benchmarks.predize_stub import PredizeStub
+from src.predize import Predize
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--paginas', type=int, default=200)
+    parser.add_argument('--latencia', type=float, default=0.05)
+    parser.add_argument('--fraccion-429', type=float, default=0.05)
+    parser.add_argument('--retry-after', type=float, default=1)
+    parser.add_argument('--rps', type=float, default=50)
+    args = parser.parse_args()
+
+    stub = PredizeStub(n_tickets=args.paginas * 100, latencia=args.latencia,
+                       fraccion_429=args.fraccion_429, retry_after=args.retry_after)
+    url = stub.iniciar()
+    try:
+        predize_instance = Predize('bench@example.com', 'bench', main_url=url, requests_per_second=args.rps)
+        t0 = time.perf_counter()
+        paginas = predize_instance.get_tickets_in_parallel(list(range(1, args.paginas + 1)))
+        total = time.perf_counter() - t0
+    finally:
+        stub.detener()
+
+    completas = sum(len(p.get('items', [])) == 100 for p in paginas)
+    print(f"{args.paginas} páginas, latencia {args.latencia * 1000:.0f} ms, "
+          f"{args.fraccion_429:.0%} de 429 con Retry-After={args.retry_after}s")
+    print(f"Tiempo total: {total:.2f}s")
+    print(f"Pedidos recibidos por el stub: {dict(stub.pedidos)}")
+    print(f"Páginas completas: {completas}/{args.paginas}")
@@ -0,0 +1,64 @@
+"""
+Matching de search_str de B2W/Americanas contra raw_merchant_invoice_id:
+el loop de add_missing_orders (un str.contains por search_str) frente a
+buscar_subcadenas (una sola pasada), con datos sintéticos.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_substring_matcher --filas 100000 --patrones 2000
+    python -m benchmarks.bench_substring_matcher --filas 1000000 --patrones 2000 --sin-loop
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.substring_matcher import buscar_subcadenas
+
+
+def datos_sinteticos(filas, patrones, semilla=0):
+    rng = np.random.default_rng(semilla)
+    pedidos = rng.integers(10**9, 10**10, size=filas)
+    sufijos = rng.integers(1, 4, size=filas)
+    raw = pd.Series([f"Lojas Americanas-{p}-{s}" if i % 3 else f"{p}" for i, (p, s) in enumerate(zip(pedidos, sufijos))])
+    # La mitad de los patrones existe en la tabla, la otra mitad no
+    existentes = rng.choice(pedidos, size=patrones // 2, replace=False).astype(str)
+    inexistentes = rng.integers(10**9, 10**10, size=patrones - patrones // 2).astype(str)
+    return raw, list(existentes) + list(inexistentes)
+
+
+def con_loop(raw, patrones):
+    pares = []
+    for patron in patrones:
+        for indice in raw.index[raw.str.contains(patron, regex=False)]:
+            pares.append((indice, patron))
+    return pares
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--filas', type=int, default=100_000)
+    parser.add_argument('--patrones', type=int, default=2000)
+    parser.add_argument('--sin-loop', action='store_true', help='No correr el loop original (lento con 10^6 filas)')
+    args = parser.parse_args()
+
+    raw, patrones = datos_sinteticos(args.filas, args.patrones)
+    print(f"{args.filas} filas, {args.patrones} patrones")
+
+    resultados = {}
+    for motor in ('aho_corasick', 'largo'):
+        t0 = time.perf_counter()
+        try:
+            df = buscar_subcadenas(raw, patrones, motor=motor)
+        except ImportError:
+            print(f"{motor:>13}: pyahocorasick no está instalado")
+            continue
+        print(f"{motor:>13}: {time.perf_counter() - t0:8.2f}s, {len(df)} coincidencias")
+        resultados[motor] = set(df.itertuples(index=False, name=None))
+
+    if not args.sin_loop:
+        t0 = time.perf_counter()
+        esperado = set(con_loop(raw, patrones))
+        print(f"{'str.contains':>13}: {time.perf_counter() - t0:8.2f}s, {len(esperado)} coincidencias")
+        for motor, pares in resultados.items():
+            print(f"{motor} igual al loop: {pares == esperado}")
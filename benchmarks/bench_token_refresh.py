@@ -0,0 +1,41 @@
+"""
+Descarga de mensajes con 50 hilos mientras el token vence varias veces, contra
+el stub local. Cuenta cuántos /v1/auth/refresh y cuántos 401 recibió el stub:
+con el refresh single-flight y proactivo debería haber ~1 refresh por
+vencimiento y casi ningún 401.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_token_refresh --tickets 2000 --duracion-token 70
+"""
+import argparse
+import time
+
+from benchmarks.predize_stub import PredizeStub
+from src.predize import Predize
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tickets', type=int, default=2000)
+    parser.add_argument('--latencia', type=float, default=0.05)
+    parser.add_argument('--duracion-token', type=float, default=70,
+                        help="Vida del token en segundos (Predize renueva 60s antes de exp)")
+    parser.add_argument('--rps', type=float, default=50,
+                        help="Ritmo de pedidos: a 50/s la descarga dura ~40s y el token vence varias veces")
+    args = parser.parse_args()
+
+    stub = PredizeStub(n_tickets=args.tickets, mensajes_por_ticket=5, latencia=args.latencia,
+                       duracion_token=args.duracion_token)
+    url = stub.iniciar()
+    try:
+        predize_instance = Predize('bench@example.com', 'bench', main_url=url, requests_per_second=args.rps)
+        t0 = time.perf_counter()
+        resultados = predize_instance.get_messages_in_parallel(list(range(1, args.tickets + 1)), max_workers=50)
+        total = time.perf_counter() - t0
+    finally:
+        stub.detener()
+
+    completos = sum(len(r.get('items', [])) == 5 for r in resultados)
+    print(f"{args.tickets} tickets en {total:.2f}s, token de {args.duracion_token:.0f}s, {args.rps:g} pedidos/s")
+    print(f"Refresh pedidos: {stub.pedidos['/v1/auth/refresh']}")
+    print(f"Pedidos de mensajes (incluye repeticiones por 401): {stub.pedidos['/v1/tickets/{id}/messages']}")
+    print(f"Tickets completos: {completos}/{args.tickets}")
@@ -0,0 +1,68 @@
+"""
+Enrutamiento por etiqueta: .map(topic_map) + comparación de strings por
+etiqueta frente a TopicLabels (un gather sobre topic_number), para todas las
+etiquetas a la vez y para el filtro de Tracking solo.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_topic_labels --filas 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.topic_labels import TopicLabels
+
+
+def leer_topic_names(ruta='topic_names.txt'):
+    # Mismo formato que src.topic_model.cargar_topic_names, sin importar BERTopic
+    with open(ruta) as f:
+        return {int(t): nombre for t, nombre in (linea.strip().split(': ') for linea in f)}
+
+
+def con_strings(df, topic_map, etiquetas):
+    nombres = df['topic_number'].map(topic_map)
+    return {etiqueta: df[nombres == etiqueta] for etiqueta in etiquetas}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--filas', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    topic_map = leer_topic_names()
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'ticket_id': np.arange(args.filas).astype(str),
+        'topic_number': rng.choice(list(topic_map), size=args.filas),
+        'probability': rng.random(args.filas),
+    })
+
+    t0 = time.perf_counter()
+    labels = TopicLabels(topic_map)
+    t_tablas = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    esperado = con_strings(df, topic_map, labels.etiquetas)
+    t_strings = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    grupos = labels.enrutar(df)
+    t_gather = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    tracking_strings = df[df['topic_number'].map(topic_map) == 'Tracking']
+    t_una_strings = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    tracking_mascara = df[labels.mascara(df['topic_number'], ['Tracking'])]
+    t_una_mascara = time.perf_counter() - t0
+
+    iguales = tracking_strings.index.equals(tracking_mascara.index) and all(grupos[e].index.equals(esperado[e].index) for e in labels.etiquetas)
+    print(f"{args.filas} filas, {len(topic_map)} topics, {len(labels.etiquetas)} etiquetas")
+    print(f"tablas de búsqueda: {t_tablas * 1000:7.2f} ms")
+    print(f"map + strings:      {t_strings * 1000:7.1f} ms")
+    print(f"TopicLabels:        {t_gather * 1000:7.1f} ms")
+    print(f"solo Tracking, strings: {t_una_strings * 1000:7.1f} ms; máscara int8: {t_una_mascara * 1000:7.1f} ms")
+    print(f"Mismos grupos: {iguales}")
@@ -0,0 +1,98 @@
+"""
+Compara la latencia por corrida de main.py cargando BERTopic en frío contra
+pedirle el mismo lote a un topic worker residente ya caliente.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_topic_worker --runs 5 --batch 24
+"""
+import argparse
+import os
+import secrets
+import subprocess
+import sys
+import time
+from statistics import mean, median
+
+from src.topic_worker import TopicWorkerClient
+
+RUTA_FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'mensajes.txt')
+
+SCRIPT_FRIO = """
+import sys, time
+t0 = time.perf_counter()
+from src.topic_model import cargar_modelo_bertopic, asignar_topics
+mensajes = [l.strip() for l in open(sys.argv[1]) if l.strip()][:int(sys.argv[2])]
+modelo = cargar_modelo_bertopic()
+asignar_topics(modelo, mensajes)
+print(time.perf_counter() - t0)
+"""
+
+
+def cargar_lote(n):
+    with open(RUTA_FIXTURE) as f:
+        mensajes = [line.strip() for line in f if line.strip()]
+    mensajes = (mensajes * (n // len(mensajes) + 1))[:n]
+    return [(str(i), m) for i, m in enumerate(mensajes)]
+
+
+def corrida_fria(n):
+    # Proceso nuevo por corrida, igual que el cron actual (incluye imports)
+    t0 = time.perf_counter()
+    subprocess.run([sys.executable, '-c', SCRIPT_FRIO, RUTA_FIXTURE, str(n)],
+                   check=True, capture_output=True)
+    return time.perf_counter() - t0
+
+
+def esperar_worker(direccion, timeout=300):
+    limite = time.time() + timeout
+    while time.time() < limite:
+        try:
+            with TopicWorkerClient(direccion) as cliente:
+                if cliente.ping():
+                    return
+        except (ConnectionError, OSError):
+            time.sleep(1)
+    raise TimeoutError("El topic worker no arrancó a tiempo.")
+
+
+def corrida_caliente(direccion, lote):
+    # Conexión nueva por corrida: es lo que paga main.py en cada tick
+    t0 = time.perf_counter()
+    with TopicWorkerClient(direccion) as cliente:
+        cliente.clasificar(lote)
+    return time.perf_counter() - t0
+
+
+def resumen(nombre, tiempos):
+    print(f"{nombre:<10} media={mean(tiempos):8.3f}s  mediana={median(tiempos):8.3f}s  "
+          f"min={min(tiempos):8.3f}s  max={max(tiempos):8.3f}s")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--batch', type=int, default=24)
+    parser.add_argument('--address', default='localhost:6124')
+    args = parser.parse_args()
+
+    lote = cargar_lote(args.batch)
+    # El worker no arranca sin clave; el subproceso la hereda del entorno
+    os.environ.setdefault('TOPIC_WORKER_AUTHKEY', secrets.token_hex(16))
+
+    frio = [corrida_fria(args.batch) for _ in range(args.runs)]
+
+    worker = subprocess.Popen([sys.executable, '-m', 'src.topic_worker', '--address', args.address])
+    try:
+        t0 = time.perf_counter()
+        esperar_worker(args.address)
+        arranque = time.perf_counter() - t0
+        caliente = [corrida_caliente(args.address, lote) for _ in range(args.runs)]
+    finally:
+        worker.terminate()
+        worker.wait()
+
+    print(f"Lote de {args.batch} mensajes, {args.runs} corridas")
+    resumen('frio', frio)
+    resumen('caliente', caliente)
+    print(f"Arranque único del worker: {arranque:.3f}s")
+    print(f"Aceleración (mediana): {median(frio) / median(caliente):.1f}x")
@@ -0,0 +1,74 @@
+"""
+update_from_df con el camino anterior (method='multi': tabla intermedia en
+development con to_sql y dos execute_sql) frente a la transacción única
+(method='copy': tabla TEMP con los tipos de la tabla destino, COPY, índice,
+UPDATE ... FROM), contra un Postgres local. Las dos tienen que dejar la tabla
+igual.
+
+Uso (desde la raíz del repo; credenciales de las variables DB_* como en .env):
+    python -m benchmarks.bench_update_from_df --filas 100000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from database.execute_sql import execute_sql
+from database.get_data import get_data
+from database.update_from_df import update_from_df
+from database_credentials.db_credentials_nocnoc import db_credentials_nocnoc
+
+ESQUEMA = 'development'
+TABLA = 'bench_update_from_df'
+
+
+def preparar_tabla(creds, filas):
+    execute_sql(f"""
+        DROP TABLE IF EXISTS {ESQUEMA}.{TABLA};
+        CREATE TABLE {ESQUEMA}.{TABLA} (id bigint PRIMARY KEY, order_id bigint, merchant_invoice_id text);
+        INSERT INTO {ESQUEMA}.{TABLA}
+        SELECT g, CASE WHEN g % 2 = 0 THEN g * 10 END, 'mi-' || g FROM generate_series(1, {filas}) g;
+    """, creds)
+
+
+def cambios(filas, semilla=0):
+    # Un 10% de ids no existe en la tabla y un cuarto de las filas ya tiene esos valores
+    rng = np.random.default_rng(semilla)
+    ids = rng.permutation(np.arange(1, int(filas * 1.1) + 1))[:filas]
+    sin_cambio = rng.random(filas) < 0.25
+    order_id = np.where(sin_cambio & (ids % 2 == 0), ids * 10, ids * 7)
+    return pd.DataFrame({
+        'id': ids,
+        'order_id': order_id,
+        'merchant_invoice_id': np.where(sin_cambio & (ids % 2 == 0), 'mi-' + ids.astype(str), 'nuevo-' + ids.astype(str)),
+    })
+
+
+def correr(creds, df, filas, method):
+    preparar_tabla(creds, filas)
+    t0 = time.perf_counter()
+    resultado = update_from_df(df, creds, TABLA, ESQUEMA, ['id'], ['order_id', 'merchant_invoice_id'], method=method)
+    segundos = time.perf_counter() - t0
+    tabla = get_data(f"SELECT * FROM {ESQUEMA}.{TABLA} ORDER BY id", creds)
+    return segundos, resultado, tabla
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--filas', type=int, default=100_000)
+    args = parser.parse_args()
+
+    creds = db_credentials_nocnoc['postgres_admin']
+    execute_sql(f"CREATE SCHEMA IF NOT EXISTS {ESQUEMA}", creds)
+    df = cambios(args.filas)
+
+    segundos_multi, _, tabla_multi = correr(creds, df, args.filas, 'multi')
+    segundos_copy, resultado, tabla_copy = correr(creds, df, args.filas, 'copy')
+    pd.testing.assert_frame_equal(tabla_multi, tabla_copy)
+
+    print(f"{args.filas} filas en el DataFrame")
+    print(f"  multi (tabla intermedia + to_sql): {segundos_multi:6.2f}s")
+    print(f"  copy (una transacción):            {segundos_copy:6.2f}s ({segundos_multi / segundos_copy:.1f}x)")
+    print(f"  coincidencias {resultado['matched']}, actualizadas {resultado['updated']}; misma tabla final")
+    execute_sql(f"DROP TABLE {ESQUEMA}.{TABLA}", creds)
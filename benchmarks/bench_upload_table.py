@@ -0,0 +1,70 @@
+"""
+Filas por segundo de upload_table con method='multi' (df.to_sql con INSERTs
+de varias filas) frente a method='copy' (COPY FROM STDIN por lotes), contra
+un Postgres local. Antes de medir comprueba que las dos tablas quedan iguales,
+con nulos, strings con comas, comillas y saltos de línea, fechas y booleanos.
+
+Uso (desde la raíz del repo; credenciales de las variables DB_* como en .env):
+    python -m benchmarks.bench_upload_table --filas 100000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from database.execute_sql import execute_sql
+from database.get_data import get_data
+from database.upload_table import upload_table
+from database_credentials.db_credentials_nocnoc import db_credentials_nocnoc
+
+ESQUEMA = 'development'
+
+
+def frame(filas, semilla=0):
+    rng = np.random.default_rng(semilla)
+    textos = np.array(['simple', 'con, coma', 'con "comillas"', 'con\nsalto', '', 'ñandú', None], dtype=object)
+    return pd.DataFrame({
+        'id': np.arange(filas),
+        'order_id': pd.array(np.where(rng.random(filas) < 0.1, None, rng.integers(0, 10**12, filas)), dtype='Int64'),
+        'monto': np.where(rng.random(filas) < 0.1, np.nan, rng.random(filas) * 1000),
+        'merchant_invoice_id': textos[rng.integers(0, len(textos), filas)],
+        'creado': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 10**8, filas), unit='s'),
+        'activo': rng.random(filas) < 0.5,
+    })
+
+
+def subir(df, creds, tabla, method):
+    t0 = time.perf_counter()
+    upload_table(df, creds, tabla, schema=ESQUEMA, if_exists='replace', method=method)
+    return time.perf_counter() - t0
+
+
+def leer(creds, tabla):
+    return get_data(f"SELECT * FROM {ESQUEMA}.{tabla} ORDER BY id", creds)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--filas', type=int, default=100_000)
+    parser.add_argument('--filas-multi', type=int, default=20_000,
+                        help="filas para method='multi' (es lento; se mide sobre menos filas)")
+    args = parser.parse_args()
+
+    creds = db_credentials_nocnoc['postgres_admin']
+    execute_sql(f"CREATE SCHEMA IF NOT EXISTS {ESQUEMA}", creds)
+
+    muestra = frame(2_000, semilla=1)
+    subir(muestra, creds, 'bench_upload_multi', 'multi')
+    subir(muestra, creds, 'bench_upload_copy', 'copy')
+    pd.testing.assert_frame_equal(leer(creds, 'bench_upload_multi'), leer(creds, 'bench_upload_copy'))
+    print("Mismo contenido y tipos con 'multi' y 'copy'")
+
+    filas_multi = min(args.filas, args.filas_multi)
+    segundos_multi = subir(frame(filas_multi), creds, 'bench_upload_multi', 'multi')
+    segundos_copy = subir(frame(args.filas), creds, 'bench_upload_copy', 'copy')
+    print(f"  multi: {filas_multi:>8} filas en {segundos_multi:6.2f}s = {filas_multi / segundos_multi:>10,.0f} filas/s")
+    print(f"   copy: {args.filas:>8} filas en {segundos_copy:6.2f}s = {args.filas / segundos_copy:>10,.0f} filas/s")
+
+    for tabla in ('bench_upload_multi', 'bench_upload_copy'):
+        execute_sql(f"DROP TABLE IF EXISTS {ESQUEMA}.{tabla}", creds)
@@ -0,0 +1,164 @@
+"""
+Stub local de la API de Predize para los benchmarks.
+
+Responde los endpoints que usa src/predize.py con datos sintéticos y una
+latencia configurable por pedido, y cuenta los pedidos recibidos por ruta.
+"""
+import base64
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+class PredizeStub:
+
+    def __init__(self, n_tickets=500, mensajes_por_ticket=20, latencia=0.05, fraccion_sin_orden=0.1,
+                 fraccion_429=0.0, retry_after=1, duracion_token=None, mensajes_desc=False):
+        self.n_tickets = n_tickets
+        self.mensajes_por_ticket = mensajes_por_ticket
+        self.latencia = latencia
+        self.fraccion_sin_orden = fraccion_sin_orden
+        self.fraccion_429 = fraccion_429
+        self.retry_after = retry_after
+        self.duracion_token = duracion_token
+        self.mensajes_desc = mensajes_desc
+        self.pedidos = Counter()
+        self._lock = threading.Lock()
+        self.server = None
+
+    def ticket(self, ticket_id):
+        return {
+            'id': ticket_id,
+            'type': 'POST_ORDER' if ticket_id % 3 else 'PRE_ORDER',
+            'status': 'OPEN',
+            'channelDate': '2024-11-20T12:00:00.000Z',
+            'lastUpdate': '2024-11-20T12:00:00.000Z',
+            'closeDate': None,
+            'targetSla': '2024-11-21T12:00:00.000Z',
+            'lastMessageDate': '2024-11-20T12:00:00.000Z',
+            'channelAccount': {'id': 23, 'channel': 'mercadolivre' if ticket_id % 2 else 'b2w'}
+        }
+
+    def mensaje(self, ticket_id, i):
+        return {
+            'id': ticket_id * 1000 + i,
+            'ticket_id': ticket_id,
+            'message': f"Mensaje {i} del ticket {ticket_id}: meu pedido ainda não chegou",
+            'seller': False,
+            'createDate': (datetime(2024, 11, 20, 12) + timedelta(seconds=i)).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+        }
+
+    def sin_orden(self, ticket_id):
+        return (ticket_id % 100) < self.fraccion_sin_orden * 100
+
+    def emitir_token(self):
+        if self.duracion_token is None:
+            return 'token-stub'
+        payload = json.dumps({'exp': time.time() + self.duracion_token}).encode()
+        return f"e30.{base64.urlsafe_b64encode(payload).decode().rstrip('=')}.firma"
+
+    def token_valido(self, authorization):
+        if self.duracion_token is None:
+            return True
+        token = (authorization or '').replace('Bearer ', '', 1)
+        try:
+            payload = token.split('.')[1]
+            payload += '=' * (-len(payload) % 4)
+            return json.loads(base64.urlsafe_b64decode(payload))['exp'] > time.time()
+        except (IndexError, KeyError, ValueError):
+            return False
+
+    def responder(self, metodo, ruta, params):
+        """
+        Devuelve (status, cuerpo) para un pedido.
+        """
+        pagina = int(params.get('page', [1])[0])
+        limite = int(params.get('limit', [100])[0])
+
+        if metodo == 'POST' and ruta in ('/v1/auth/login', '/v1/auth/refresh'):
+            return 200, {'accessToken': self.emitir_token(), 'refreshToken': 'refresh-stub'}
+
+        if ruta == '/v1/tickets':
+            desde = (pagina - 1) * limite
+            ids = range(desde + 1, min(desde + limite, self.n_tickets) + 1)
+            return 200, {'items': [self.ticket(i) for i in ids], 'total': self.n_tickets,
+                         'page': pagina, 'limit': limite}
+
+        m = re.fullmatch(r'/v1/tickets/(\d+)/messages', ruta)
+        if m:
+            ticket_id = int(m.group(1))
+            desde = (pagina - 1) * limite
+            indices = range(desde, min(desde + limite, self.mensajes_por_ticket))
+            if self.mensajes_desc:
+                indices = [self.mensajes_por_ticket - 1 - i for i in indices]
+            return 200, {'items': [self.mensaje(ticket_id, i) for i in indices],
+                         'total': self.mensajes_por_ticket}
+
+        m = re.fullmatch(r'/v1/tickets/(\d+)/order', ruta)
+        if m:
+            ticket_id = int(m.group(1))
+            if self.sin_orden(ticket_id):
+                return 404, {'statusCode': 404, 'error': 'Not Found'}
+            return 200, [{'code': ticket_id, 'channelOrderId': f"200000{ticket_id:06d}", 'ticket_id': ticket_id}]
+
+        return 404, {'statusCode': 404, 'error': 'Not Found'}
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _atender(self, metodo):
+                url = urlparse(self.path)
+                largo = int(self.headers.get('Content-Length') or 0)
+                if largo:
+                    self.rfile.read(largo)
+                with stub._lock:
+                    stub.pedidos[re.sub(r'/\d+', '/{id}', url.path)] += 1
+                time.sleep(stub.latencia)
+                if '/auth/' not in url.path and not stub.token_valido(self.headers.get('Authorization')):
+                    status, cuerpo = 401, {'statusCode': 401, 'message': 'Unauthorized'}
+                elif '/auth/' not in url.path and random.random() < stub.fraccion_429:
+                    status, cuerpo = 429, {'statusCode': 429, 'message': 'Too Many Requests'}
+                else:
+                    status, cuerpo = stub.responder(metodo, url.path, parse_qs(url.query))
+                datos = json.dumps(cuerpo).encode()
+                self.send_response(status)
+                if status == 429:
+                    self.send_header('Retry-After', str(stub.retry_after))
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(datos)))
+                self.end_headers()
+                self.wfile.write(datos)
+
+            def do_GET(self):
+                self._atender('GET')
+
+            def do_POST(self):
+                self._atender('POST')
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def iniciar(self, host='127.0.0.1', puerto=0):
+        """
+        Levanta el servidor en un hilo y devuelve su URL base.
+        """
+        self.server = ThreadingHTTPServer((host, puerto), self._handler())
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return f"http://{host}:{self.server.server_address[1]}"
+
+    def detener(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
@@ -1,17 +1,26 @@
+import logging
+import re
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
 suffix_list = ['del','reenvio','wrong','old','au','faltante','corregido','final','unidad','envio','send','cancelled']
 
 count_last_part = [str(x) for x in range(1,100)]
 
-def check_if_bad_suffix(last_part:str):
+_SUFIJOS_REGEX = '|'.join(re.escape(suff) for suff in suffix_list)
+_SUFIJOS_NUMERICOS = frozenset(count_last_part)
+_SUFIJOS_RE = re.compile(_SUFIJOS_REGEX)
 
-    if last_part in count_last_part:
-        return True
+# Reglas por canal de Predize para llevar el channelOrderId al formato de raw_merchant_invoice_id
+PREFIJO_POR_CANAL = {'magalu': 'LU-'}
+PREFIJOS_A_QUITAR_POR_CANAL = {'b2w': ('Lojas Americanas-', 'Sou Barato-', 'soubarato-')}
 
-    for suff in suffix_list:
-        if suff in last_part.lower():
-            return True
+def check_if_bad_suffix(last_part:str):
 
-    return False
+    return last_part in _SUFIJOS_NUMERICOS or _SUFIJOS_RE.search(last_part.lower()) is not None
 
 def get_raw_merchant_invoice_id(merchant_invoice_id:str):
 
@@ -25,4 +34,197 @@ def get_raw_merchant_invoice_id(merchant_invoice_id:str):
     if flag_bad_last_part:
         return '-'.join(merchant_invoice_id.split('-')[:-1])
 
-    return merchant_invoice_id
\ No newline at end of file
+    return merchant_invoice_id
+
+def get_raw_merchant_invoice_ids(merchant_invoice_ids):
+    """
+    Versión vectorizada de get_raw_merchant_invoice_id: mismo resultado,
+    elemento por elemento, sobre una Serie de pandas o un array de Arrow.
+
+    Corta el id en el último '-' con pyarrow.compute y descarta la última parte
+    si es un número de 1 a 99 o contiene alguno de los sufijos de suffix_list.
+    Las pocas filas con caracteres no ASCII en la última parte se resuelven con
+    la función escalar, porque utf8_lower de Arrow no pasa a minúsculas igual
+    que str.lower de Python fuera de ASCII.
+
+    Args:
+        merchant_invoice_ids (pd.Series | pa.Array | pa.ChunkedArray): Ids (los nulos se mantienen).
+
+    Returns:
+        Mismo tipo que la entrada: pd.Series (con el mismo índice) o pa.Array.
+    """
+    es_serie = isinstance(merchant_invoice_ids, pd.Series)
+    if es_serie:
+        # Sin copia si la Serie ya es de strings de Arrow (dtype str de pandas 3)
+        valores = pa.array(merchant_invoice_ids, from_pandas=True)
+        if pa.types.is_null(valores.type):
+            # Serie vacía o toda nula
+            valores = valores.cast(pa.string())
+    elif isinstance(merchant_invoice_ids, pa.ChunkedArray):
+        valores = merchant_invoice_ids.combine_chunks()
+    else:
+        valores = merchant_invoice_ids
+
+    partes = pc.split_pattern(valores, '-', max_splits=1, reverse=True)
+    con_guion = pc.fill_null(pc.equal(pc.list_value_length(partes), 2), False)
+    partes = partes.filter(con_guion)
+    prefijo = pc.list_element(partes, 0)
+    ultima = pc.list_element(partes, 1)
+
+    sufijo_malo = pc.match_substring_regex(pc.utf8_lower(ultima), _SUFIJOS_REGEX).to_numpy(zero_copy_only=False)
+    no_ascii = np.flatnonzero(~pc.string_is_ascii(ultima).to_numpy(zero_copy_only=False))
+    for i in no_ascii:
+        sufijo_malo[i] = any(suff in ultima[i].as_py().lower() for suff in suffix_list)
+    malo = pc.or_(pc.is_in(ultima, value_set=pa.array(count_last_part, type=ultima.type)), pa.array(sufijo_malo))
+
+    mascara = np.zeros(len(valores), dtype=bool)
+    mascara[np.flatnonzero(con_guion.to_numpy(zero_copy_only=False))] = malo.to_numpy(zero_copy_only=False)
+    resultado = pc.replace_with_mask(valores, pa.array(mascara), prefijo.filter(malo))
+
+    if es_serie:
+        indice, nombre = merchant_invoice_ids.index, merchant_invoice_ids.name
+        if merchant_invoice_ids.dtype != object:
+            return pd.Series(pd.array(resultado, dtype=merchant_invoice_ids.dtype), index=indice, name=nombre)
+        resultado = pd.Series(resultado.to_numpy(zero_copy_only=False), index=indice, name=nombre, dtype=object)
+        # Los nulos vuelven como estaban (None o NaN)
+        return resultado.mask(merchant_invoice_ids.isna(), merchant_invoice_ids)
+    return resultado
+
+
+class InvoiceIdNormalizer:
+    """
+    Reglas de sufijos y prefijos de merchant_invoice_id compiladas una sola vez,
+    con memoria de los resultados para ids repetidos.
+
+    Los sufijos numéricos van en un frozenset y los de palabra en una sola
+    regex de alternativas. Las reglas por canal agregan un prefijo (magalu: 'LU-')
+    o quitan los de la tienda (b2w: 'Lojas Americanas-', 'Sou Barato-', ...).
+    Sobre una Serie, los ids se agrupan con pd.factorize y las reglas corren
+    una vez por id distinto.
+
+    Uso:
+        normalizador = InvoiceIdNormalizer()
+        normalizador.raw('2000001234-REENVIO')        # '2000001234'
+        normalizador.por_canal('123', 'magalu')       # 'LU-123'
+        normalizador.raw_serie(df['merchant_invoice_id'])
+        normalizador.estadisticas()
+    """
+
+    def __init__(self, sufijos=suffix_list, sufijos_numericos=count_last_part,
+                 prefijo_por_canal=PREFIJO_POR_CANAL, prefijos_a_quitar_por_canal=PREFIJOS_A_QUITAR_POR_CANAL,
+                 max_entradas=200000):
+        self.sufijos_numericos = frozenset(sufijos_numericos)
+        self.sufijos_re = re.compile('|'.join(re.escape(suff) for suff in sufijos)) if sufijos else None
+        self.prefijo_por_canal = dict(prefijo_por_canal)
+        self.prefijos_a_quitar_por_canal = {canal: tuple(prefijos) for canal, prefijos in prefijos_a_quitar_por_canal.items()}
+        self.max_entradas = max_entradas
+        self._cache_raw = {}
+        self._cache_canal = {}
+        self.aciertos = 0
+        self.fallos = 0
+
+    def es_sufijo_malo(self, last_part):
+        """
+        Igual que check_if_bad_suffix, con las reglas de esta instancia.
+        """
+        if last_part in self.sufijos_numericos:
+            return True
+        return self.sufijos_re is not None and self.sufijos_re.search(last_part.lower()) is not None
+
+    def _guardar(self, cache, clave, resultado):
+        if len(cache) >= self.max_entradas:
+            # Vaciar de una vez es más barato que llevar el orden de uso por entrada
+            cache.clear()
+        cache[clave] = resultado
+        return resultado
+
+    def raw(self, merchant_invoice_id):
+        """
+        Igual que get_raw_merchant_invoice_id: saca la última parte si es un sufijo malo.
+        Los valores que no son str (None, NaN) se devuelven tal cual.
+        """
+        try:
+            resultado = self._cache_raw[merchant_invoice_id]
+            self.aciertos += 1
+            return resultado
+        except (KeyError, TypeError):
+            pass
+        if not isinstance(merchant_invoice_id, str):
+            return merchant_invoice_id
+        self.fallos += 1
+        prefijo, guion, last_part = merchant_invoice_id.rpartition('-')
+        resultado = prefijo if guion and self.es_sufijo_malo(last_part) else merchant_invoice_id
+        return self._guardar(self._cache_raw, merchant_invoice_id, resultado)
+
+    def por_canal(self, merchant_invoice_id, canal):
+        """
+        Aplica las reglas de prefijo del canal (los canales sin reglas no cambian el id).
+        """
+        if not isinstance(merchant_invoice_id, str):
+            return merchant_invoice_id
+        clave = (canal, merchant_invoice_id)
+        try:
+            resultado = self._cache_canal[clave]
+            self.aciertos += 1
+            return resultado
+        except (KeyError, TypeError):
+            pass
+        self.fallos += 1
+        resultado = merchant_invoice_id
+        for prefijo in self.prefijos_a_quitar_por_canal.get(canal, ()):
+            resultado = resultado.replace(prefijo, '')
+        resultado = self.prefijo_por_canal.get(canal, '') + resultado
+        return self._guardar(self._cache_canal, clave, resultado)
+
+    def _por_distintos(self, serie, funcion):
+        codigos, distintos = pd.factorize(serie, use_na_sentinel=True)
+        resultados = np.empty(len(distintos), dtype=object)
+        resultados[:] = [funcion(valor) for valor in distintos]
+        valores = serie.to_numpy(dtype=object, copy=True)
+        validos = codigos >= 0
+        valores[validos] = resultados[codigos[validos]]
+        # Las filas repetidas no pasan por las reglas: se cuentan como aciertos
+        self.aciertos += int(validos.sum()) - len(distintos)
+        return pd.Series(valores, index=serie.index, name=serie.name, dtype=object)
+
+    def raw_serie(self, merchant_invoice_ids):
+        """
+        raw() para cada fila de una Serie, una vez por id distinto.
+
+        Returns:
+            pd.Series: Mismo índice y nombre; dtype object (los nulos se mantienen).
+        """
+        return self._por_distintos(merchant_invoice_ids, self.raw)
+
+    def normalizar(self, merchant_invoice_ids, canales):
+        """
+        por_canal() para cada fila, una vez por id distinto de cada canal.
+
+        Args:
+            merchant_invoice_ids (pd.Series): Ids como vienen de Predize.
+            canales (pd.Series): Canal de cada fila (mismo índice).
+
+        Returns:
+            pd.Series: Ids normalizados, con el mismo índice (dtype object).
+        """
+        resultado = merchant_invoice_ids.astype(object)
+        for canal in set(self.prefijo_por_canal) | set(self.prefijos_a_quitar_por_canal):
+            filas = (canales == canal).to_numpy()
+            if filas.any():
+                resultado[filas] = self._por_distintos(
+                    merchant_invoice_ids[filas], lambda valor: self.por_canal(valor, canal)).to_numpy()
+        return resultado
+
+    def estadisticas(self):
+        consultas = self.aciertos + self.fallos
+        return {
+            'entradas': len(self._cache_raw) + len(self._cache_canal),
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'tasa_aciertos': self.aciertos / consultas if consultas else 0.0,
+        }
+
+    def registrar_estadisticas(self):
+        e = self.estadisticas()
+        logging.info(f"InvoiceIdNormalizer: {e['entradas']} entradas en memoria; aciertos={e['aciertos']} "
+                     f"fallos={e['fallos']} ({e['tasa_aciertos']:.1%})")
@@ -1,13 +1,12 @@
-from sqlalchemy import create_engine,text
+from sqlalchemy import text
+from .connection_registry import get_engine
 
 def execute_sql(sql_statement:str,creds:str):
 
-    db = create_engine(creds)
+    db = get_engine(creds)
 
-    with db.connect() as con:
-        con.execute(text(sql_statement).execution_options(autocommit=True))
-        # con.commit()
+    # begin() hace commit al salir; la conexión vuelve al pool compartido
+    with db.begin() as con:
+        con.execute(text(sql_statement))
 
-    db.dispose()
-
-    return 1
\ No newline at end of file
+    return 1
@@ -1,9 +1,14 @@
+import uuid
 import pandas as pd
-from sqlalchemy import create_engine
+import pyarrow as pa
+from .connection_registry import pooled_connection
 def get_data(query, connection_credentials):
     """
     Ejecuta una consulta SQL y devuelve un DataFrame con los resultados.
 
+    La conexión sale del pool compartido del proceso (ver connection_registry),
+    así que consultas seguidas con las mismas credenciales no vuelven a conectarse.
+
     Args:
         query (str): Consulta SQL a ejecutar.
         connection_credentials (dict): Credenciales de conexión a la base de datos.
@@ -11,22 +16,106 @@ def get_data(query, connection_credentials):
     Returns:
         pd.DataFrame: Resultados de la consulta.
     """
-    import psycopg2
-    import pandas as pd
-
-    # Construir la cadena de conexión desde el diccionario
-    connection_string = (
-        f"host={connection_credentials['host']} "
-        f"port={connection_credentials['port']} "
-        f"dbname={connection_credentials['dbname']} "
-        f"user={connection_credentials['user']} "
-        f"password={connection_credentials['password']}"
-    )
-
     # Conectarse a la base de datos y ejecutar la consulta
     try:
-        with psycopg2.connect(connection_string) as conn:
+        with pooled_connection(connection_credentials) as conn:
             return pd.read_sql(query, conn)
     except Exception as e:
         print(f"Error al ejecutar la consulta: {e}")
-        raise
\ No newline at end of file
+        raise
+
+
+# Tipos de Arrow por OID de Postgres, para que todos los lotes tengan el mismo esquema
+_ARROW_TYPES = {
+    16: pa.bool_(),
+    20: pa.int64(),
+    21: pa.int16(),
+    23: pa.int32(),
+    25: pa.string(),
+    700: pa.float32(),
+    701: pa.float64(),
+    # numeric: float64 fijo, como coerce_float en pandas (un decimal inferido del primer
+    # lote no admite lotes posteriores con otra precisión o escala)
+    1700: pa.float64(),
+    1042: pa.string(),
+    1043: pa.string(),
+    1082: pa.date32(),
+    1114: pa.timestamp('us'),
+    1184: pa.timestamp('us', tz='UTC'),
+}
+
+
+def _record_batch(rows, columns, types):
+    arrays = []
+    for i, values in enumerate(zip(*rows)):
+        try:
+            array = pa.array(values, type=types[i])
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            if pa.types.is_floating(types[i]):
+                # numeric (Decimal) a float64, valor por valor como hace pandas con coerce_float
+                array = pa.array([v if v is None else float(v) for v in values], type=types[i])
+            elif pa.types.is_string(types[i]):
+                # p. ej. uuid en una columna que llegó toda nula en el primer lote: su texto
+                array = pa.array([v if v is None else str(v) for v in values], type=types[i])
+            else:
+                array = pa.array(values).cast(types[i])
+        if types[i] is None:
+            # Tipo desconocido: queda fijo el que se infirió del primer lote, así todos los
+            # lotes del cursor tienen el mismo esquema; si llegó toda nula, string
+            if pa.types.is_null(array.type):
+                array = array.cast(pa.string())
+            types[i] = array.type
+        arrays.append(array)
+    if not rows:
+        arrays = [pa.array([], type=t or pa.string()) for t in types]
+    return pa.RecordBatch.from_arrays(arrays, names=columns)
+
+
+def get_data_iter(query, connection_credentials, chunksize=50_000, output='pandas', dtype=None):
+    """
+    Ejecuta una consulta SQL y devuelve los resultados de a lotes.
+
+    Usa un cursor con nombre (del lado del servidor): el cliente recibe
+    chunksize filas por vez, así que la memoria no crece con el tamaño del
+    resultado y el procesamiento puede empezar con el primer lote.
+
+    Args:
+        query (str): Consulta SQL a ejecutar.
+        connection_credentials (dict): Credenciales de conexión a la base de datos.
+        chunksize (int): Filas por lote.
+        output (str): 'pandas' (DataFrames) o 'arrow' (pyarrow.RecordBatch).
+        dtype (dict, optional): Tipos por columna: dtypes de pandas, o tipos de
+            pyarrow con output='arrow'. Las demás columnas se infieren (en
+            Arrow, del tipo de Postgres cuando se conoce; si no, del primer
+            lote, o string si ahí llegó toda nula: todos los lotes tienen el
+            mismo esquema).
+
+    Yields:
+        pd.DataFrame | pa.RecordBatch: Un lote por vez; si la consulta no
+            devuelve filas, un único lote vacío con las columnas.
+    """
+    if output not in ('pandas', 'arrow'):
+        raise ValueError(f"output desconocido: {output}")
+    dtype = dtype or {}
+
+    with pooled_connection(connection_credentials) as conn:
+        with conn.cursor(name=f"get_data_iter_{uuid.uuid4().hex}") as cursor:
+            cursor.itersize = chunksize
+            cursor.execute(query)
+            columns, types, batches = None, None, 0
+            while True:
+                rows = cursor.fetchmany(chunksize)
+                if columns is None:
+                    columns = [d.name for d in cursor.description]
+                    types = [dtype.get(d.name, _ARROW_TYPES.get(d.type_code)) for d in cursor.description]
+                if not rows and batches > 0:
+                    return
+                batches += 1
+                if output == 'arrow':
+                    yield _record_batch(rows, columns, types)
+                else:
+                    # coerce_float como pd.read_sql en get_data (numeric llega como Decimal)
+                    df = pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+                    yield df.astype({c: t for c, t in dtype.items() if c in df.columns}) if dtype else df
+                if not rows:
+                    return
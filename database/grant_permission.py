@@ -1,5 +1,5 @@
 import logging
-from sqlalchemy import create_engine
+from .connection_registry import get_engine
 from datetime import datetime
 
 def grant_permissions(schema:str, postgres_cred:str,role_list:list):
@@ -12,6 +12,6 @@ def grant_permissions(schema:str, postgres_cred:str,role_list:list):
                           GRANT SELECT ON ALL TABLES IN SCHEMA {schema} TO {roles};
                           GRANT SELECT ON ALL SEQUENCES IN SCHEMA {schema} TO {roles};"""
     
-    db = create_engine(postgres_cred)
-    db.execute(access_statement)
-    db.dispose()
\ No newline at end of file
+    db = get_engine(postgres_cred)
+    with db.begin() as con:
+        con.exec_driver_sql(access_statement)
\ No newline at end of file
@@ -1,33 +1,240 @@
-import io
+import queue
+import struct
+import threading
+from itertools import chain, repeat
 from typing import Union
+import numpy as np
 import pandas as pd
-import psycopg2
-from .split_conn_string import split_conn_string
+from .connection_registry import pooled_connection
+
+# Filas que se serializan por vez; el stream tiene en memoria solo unos pocos lotes
+COPY_CHUNKSIZE = 10_000
+# Bytes (o caracteres) que psycopg2 pide por lectura al stream
+COPY_READ_SIZE = 1 << 16
+
+_PGCOPY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('>ii', 0, 0)
+_PGCOPY_TRAILER = struct.pack('>h', -1)
+_NULL_FIELD = struct.pack('>i', -1)
+# Microsegundos y días entre 1970-01-01 y 2000-01-01, el origen de fechas del formato binario
+_PG_EPOCH_US = 946_684_800_000_000
+_PG_EPOCH_DAYS = 10_957
+
+_BINARY_FIXED = {
+    'smallint': '>i2',
+    'integer': '>i4',
+    'bigint': '>i8',
+    'real': '>f4',
+    'double precision': '>f8',
+    'boolean': '>u1',
+    'timestamp without time zone': '>i8',
+    'timestamp with time zone': '>i8',
+    'date': '>i4',
+}
+_BINARY_TEXT = {'text', 'character varying', 'character', 'name', 'json', 'jsonb'}
+
+
+def _fixed_fields(values:np.ndarray, nulls:np.ndarray, dtype:str) -> list:
+    width = np.dtype(dtype).itemsize
+    records = np.empty(len(values), dtype=[('length', '>i4'), ('value', dtype)])
+    records['length'] = width
+    records['value'] = values
+    data = records.tobytes()
+    step = 4 + width
+    fields = [data[i:i + step] for i in range(0, len(data), step)]
+    for i in np.flatnonzero(nulls):
+        fields[i] = _NULL_FIELD
+    return fields
+
+
+def _binary_fields(column:pd.Series, pg_type:str) -> list:
+    """
+    Codifica una columna en el formato binario de COPY para el tipo de Postgres de destino.
+    """
+    nulls = column.isna().to_numpy()
+    if pg_type in _BINARY_TEXT:
+        prefix = b'\x01' if pg_type == 'jsonb' else b''
+        fields = []
+        for value, null in zip(column.to_numpy(dtype=object), nulls):
+            if null:
+                fields.append(_NULL_FIELD)
+            else:
+                data = prefix + str(value).encode('utf-8')
+                fields.append(struct.pack('>i', len(data)) + data)
+        return fields
+    if pg_type not in _BINARY_FIXED:
+        raise ValueError(f"Column '{column.name}' has type {pg_type}, not supported by copy_format='binary'; "
+                         "use copy_format='csv'")
+
+    if pg_type in ('smallint', 'integer', 'bigint'):
+        values = column.astype('Int64').fillna(0).to_numpy(dtype='int64')
+    elif pg_type in ('real', 'double precision'):
+        values = column.astype('float64').fillna(0).to_numpy()
+    elif pg_type == 'boolean':
+        values = column.astype('boolean').fillna(False).to_numpy(dtype=bool)
+    else:
+        timestamps = pd.to_datetime(column)
+        if timestamps.dt.tz is not None:
+            timestamps = timestamps.dt.tz_convert('UTC').dt.tz_localize(None)
+        if pg_type == 'date':
+            values = timestamps.to_numpy(dtype='datetime64[D]').astype('int64') - _PG_EPOCH_DAYS
+        else:
+            # Los timestamps sin zona se envían tal cual: para timestamptz se toman como UTC
+            values = timestamps.to_numpy(dtype='datetime64[us]').astype('int64') - _PG_EPOCH_US
+        values[nulls] = 0
+    return _fixed_fields(values, nulls, _BINARY_FIXED[pg_type])
+
+
+class DataFrameCopyStream:
+    """
+    Objeto tipo archivo que psycopg2 lee con copy_expert mientras el
+    DataFrame se serializa por lotes de chunksize filas, en CSV (str) o en el
+    formato binario de COPY (bytes). En memoria hay a lo sumo `prefetch` lotes
+    serializados en lugar de todo el CSV.
+
+    Con prefetch > 0 un hilo serializa los lotes siguientes mientras psycopg2
+    envía el actual (psycopg2 libera el GIL al escribir en el socket).
+
+    Args:
+        df (pd.DataFrame): Datos, con las columnas en el orden de la tabla.
+        chunksize (int): Filas por lote.
+        copy_format (str): 'csv' o 'binary'.
+        header (bool): Solo CSV; escribe los nombres de columna en la primera línea.
+        na_rep (str): Solo CSV; texto de los nulos ('' es NULL para COPY csv por defecto).
+        column_types (list): Solo binario; tipo de Postgres de cada columna (p. ej. 'bigint').
+        prefetch (int): Lotes que se serializan por adelantado en otro hilo (0: en el mismo hilo).
+    """
+
+    def __init__(self, df:pd.DataFrame, chunksize:int=COPY_CHUNKSIZE, copy_format:str='csv',
+                 header:bool=False, na_rep:str='', column_types:list=None, prefetch:int=2):
+        if copy_format not in ('csv', 'binary'):
+            raise ValueError(f"Unknown copy_format: {copy_format}")
+        if copy_format == 'binary' and (column_types is None or len(column_types) != df.shape[1]):
+            raise ValueError("copy_format='binary' needs the Postgres type of every column")
+        self.df = df
+        self.chunksize = max(1, chunksize)
+        self.copy_format = copy_format
+        self.header = header
+        self.na_rep = na_rep
+        self.column_types = column_types
+        self._empty = b'' if copy_format == 'binary' else ''
+        self._current = self._empty
+        self._position = 0
+        self._closed = threading.Event()
+        self._chunks = self._prefetched(prefetch) if prefetch > 0 else self._serialize()
+
+    def _serialize(self):
+        if self.copy_format == 'binary':
+            yield _PGCOPY_HEADER
+        for start in range(0, len(self.df), self.chunksize):
+            chunk = self.df.iloc[start:start + self.chunksize]
+            if self.copy_format == 'csv':
+                yield chunk.to_csv(index=False, header=self.header and start == 0, na_rep=self.na_rep)
+            else:
+                fields = [_binary_fields(chunk.iloc[:, j], pg_type) for j, pg_type in enumerate(self.column_types)]
+                row_header = struct.pack('>h', len(fields))
+                yield b''.join(chain.from_iterable(zip(repeat(row_header, len(chunk)), *fields)))
+        if self.copy_format == 'binary':
+            yield _PGCOPY_TRAILER
+
+    def _prefetched(self, prefetch:int):
+        chunks = queue.Queue(maxsize=prefetch)
+        end = object()
+
+        def put(item):
+            # Si el COPY se cortó nadie más lee: el hilo termina en lugar de quedar bloqueado
+            while not self._closed.is_set():
+                try:
+                    chunks.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def produce():
+            try:
+                for chunk in self._serialize():
+                    if not put(chunk):
+                        return
+                put(end)
+            except BaseException as error:
+                put(error)
+
+        threading.Thread(target=produce, daemon=True).start()
+        while True:
+            chunk = chunks.get()
+            if chunk is end:
+                return
+            if isinstance(chunk, BaseException):
+                raise chunk
+            yield chunk
+
+    def readable(self):
+        return True
+
+    def close(self):
+        self._closed.set()
+
+    def read(self, size:int=-1):
+        if size is None or size < 0:
+            rest = self._current[self._position:]
+            self._current, self._position = self._empty, 0
+            return self._empty.join(chain([rest], self._chunks))
+        parts = []
+        while size > 0:
+            if self._position >= len(self._current):
+                self._current = next(self._chunks, None)
+                self._position = 0
+                if self._current is None:
+                    self._current = self._empty
+                    break
+            part = self._current[self._position:self._position + size]
+            self._position += len(part)
+            size -= len(part)
+            parts.append(part)
+        return self._empty.join(parts)
+
+
+def _column_types(cursor, schema:str, table:str) -> list:
+    cursor.execute("""
+        SELECT format_type(atttypid, NULL)
+        FROM pg_attribute
+        WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped
+        ORDER BY attnum
+    """, (f"{schema}.{table}",))
+    return [row[0] for row in cursor.fetchall()]
 
 
 def insert_with_buffer(df: pd.DataFrame,
                     conn_auth:Union[str,dict],
                     table:str,
                     schema:str,
-                    header:bool=False):
-    
+                    header:bool=False,
+                    chunksize:int=COPY_CHUNKSIZE,
+                    copy_format:str='csv'):
+
     """
-    Insert a pandas DataFrame into a PostgreSQL table using a StringIO buffer and the COPY command.
-    
+    Insert a pandas DataFrame into a PostgreSQL table with the COPY command, streaming the rows.
+
+    The dataframe is serialised chunk by chunk while psycopg2 reads it
+    (see DataFrameCopyStream), so the full CSV never lives in memory.
+
     Parameters:
         df (pandas.DataFrame): The dataframe to be inserted.
         conn_auth (Union[str, dict]): The connection string or dictionary containing the connection information.
         table (str): The name of the table to insert data into.
         schema (str): The name of the schema in which the table is located.
         header (bool, optional): Indicates whether the first row of the dataframe should be treated as header. Defaults to False.
-    
+        chunksize (int, optional): Rows serialised at a time. Defaults to COPY_CHUNKSIZE.
+        copy_format (str, optional): 'csv' or 'binary'. Binary skips text parsing on the server and
+            needs column types it can encode (integers, floats, booleans, text, json, dates and timestamps).
+
     Returns:
         None
-    
+
     Raises:
         Exception: Raises an error if an exception occurs during the insert process.
         psycopg2.DatabaseError: Raises an error if a database error occurs during the insert process.
-    
+
     Example:
         >>> import pandas as pd
         >>> df = pd.DataFrame({'col1': [1, 2], 'col2': ['a', 'b']})
@@ -38,27 +245,22 @@ def insert_with_buffer(df: pd.DataFrame,
         >>> insert_with_buffer(df, conn_auth, table, schema, header)
     """
 
-    if isinstance(conn_auth,str):
-        conn_auth = split_conn_string(conn_auth)
-    
-    for key in conn_auth.keys():
-        if key not in ['user','password','host','port','db']:
-            conn_auth.pop(key,None)
-
-    connection = psycopg2.connect(
-            **conn_auth
-        )
-    connection.autocommit = True
-    buffer = io.StringIO()
-    df.to_csv(buffer, index=False, header=header)
-    buffer.seek(0)
-
-    with connection.cursor() as cursor:        
+    with pooled_connection(conn_auth) as connection, connection.cursor() as cursor:
         try:
-            cursor.copy_expert(f"COPY postgres.{schema}.{table} FROM STDIN (FORMAT 'csv', HEADER {str(header).lower()})" , buffer)
+            if copy_format == 'binary':
+                stream = DataFrameCopyStream(df, chunksize, 'binary',
+                                             column_types=_column_types(cursor, schema, table))
+                statement = f"COPY postgres.{schema}.{table} FROM STDIN (FORMAT binary)"
+            else:
+                stream = DataFrameCopyStream(df, chunksize, 'csv', header=header)
+                statement = f"COPY postgres.{schema}.{table} FROM STDIN (FORMAT 'csv', HEADER {str(header).lower()})"
+            try:
+                cursor.copy_expert(statement, stream, size=COPY_READ_SIZE)
+            finally:
+                stream.close()
         except Exception  as error:
             print("Error: %s" % error)
             if "data" in str(error).lower() or 'style' in str(error).lower() :
                 print("Remember: The dataframe must contain all the columns in the extact same order and all columns should be present. In case a default column exist in a table then should exists in the dataframe as well")
-                
-            raise error
\ No newline at end of file
+
+            raise error
@@ -1,7 +1,13 @@
+import logging
+import pandas as pd
 from .upload_table import upload_table
 from .execute_sql import execute_sql
+from .connection_registry import pooled_connection
+from .insert_with_buffer import DataFrameCopyStream, COPY_CHUNKSIZE, COPY_READ_SIZE
 from datetime import datetime
 
+_INTEGER_TYPES = {'smallint', 'integer', 'bigint'}
+
 def upload_from_df(
     df,
     conn_string:str,
@@ -36,14 +42,105 @@ def upload_from_df(
     execute_sql(f"drop table IF EXISTS development.{temp_table_name}",conn_string)
 
 
+def _temp_column_types(cursor, temp_table_name:str) -> dict:
+    cursor.execute("""
+        SELECT attname, format_type(atttypid, NULL)
+        FROM pg_attribute
+        WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped
+    """, (f"pg_temp.{temp_table_name}",))
+    return dict(cursor.fetchall())
+
+
+def _update_in_transaction(df, conn_string, target_table, target_schema, match_columns, update_columns,
+                           only_changed, chunksize):
+    """
+    update_from_df en una sola transacción sobre una conexión del pool: tabla
+    TEMP de la sesión con los tipos de la tabla destino, COPY, índice sobre
+    match_columns, UPDATE ... FROM y commit.
+    """
+    temp_table_name = 'temp_update_from_df'
+    columns = list(dict.fromkeys(list(match_columns) + list(update_columns)))
+    column_list = ','.join(columns)
+    target = f"{target_schema}.{target_table}"
+    where_clause = ' AND '.join([f"t.{x} = temp_t.{x}" for x in match_columns])
+    update_columns_clause = ','.join([f"{x} = temp_t.{x}" for x in update_columns])
+    if only_changed:
+        # Las filas que ya tienen esos valores no se reescriben (no dejan tuplas muertas ni disparan triggers)
+        changed_clause = ' OR '.join([f"t.{x} IS DISTINCT FROM temp_t.{x}" for x in update_columns])
+        where_update = f"{where_clause} AND ({changed_clause})"
+    else:
+        where_update = where_clause
+
+    with pooled_connection(conn_string) as conn, conn.cursor() as cursor:
+        # Mismos tipos que la tabla destino: el JOIN usa los índices sin casts
+        cursor.execute(f"CREATE TEMP TABLE {temp_table_name} ON COMMIT DROP AS "
+                       f"SELECT {column_list} FROM {target} WITH NO DATA")
+        types = _temp_column_types(cursor, temp_table_name)
+        data = df[columns]
+        for column in columns:
+            if types.get(column) in _INTEGER_TYPES and pd.api.types.is_float_dtype(data[column]):
+                # Enteros que pandas pasó a float por los nulos: '1.0' no entra en una columna bigint
+                data = data.assign(**{column: data[column].astype('Int64')})
+
+        stream = DataFrameCopyStream(data, chunksize, 'csv', na_rep='\\N')
+        try:
+            cursor.copy_expert(f"COPY {temp_table_name} ({column_list}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+                               stream, size=COPY_READ_SIZE)
+        finally:
+            stream.close()
+        cursor.execute(f"CREATE INDEX ON {temp_table_name} ({','.join(match_columns)})")
+        cursor.execute(f"ANALYZE {temp_table_name}")
+
+        cursor.execute(f"""
+            SELECT count(*) FROM {target} t
+            WHERE EXISTS (SELECT 1 FROM {temp_table_name} temp_t WHERE {where_clause})
+        """)
+        matched = cursor.fetchone()[0]
+        cursor.execute(f"""
+            update {target} t
+            set {update_columns_clause}
+            from {temp_table_name} temp_t
+            where {where_update}
+        """)
+        updated = cursor.rowcount
+
+    return {'rows': len(df), 'matched': matched, 'updated': updated}
+
+
 def update_from_df(
     df,
     conn_string:str,
     target_table:str,
     target_schema:str,
     match_columns:list,
-    update_columns:list
+    update_columns:list,
+    method:str='copy',
+    only_changed:bool=False,
+    chunksize:int=COPY_CHUNKSIZE
     ):
+    """
+    Actualiza update_columns de target_schema.target_table con los valores de
+    df, en las filas donde coinciden match_columns.
+
+    Con method='copy' (por defecto) todo pasa en una transacción sobre una
+    conexión del pool: tabla TEMP con los tipos de la tabla destino, COPY,
+    índice sobre match_columns, UPDATE ... FROM y commit. Por defecto se
+    actualizan todas las filas con coincidencia, como en el camino anterior;
+    con only_changed=True solo se reescriben las filas donde algún valor
+    cambia, así que en las demás no corren triggers ni columnas tipo
+    updated_at. method='multi' usa el camino anterior, con una tabla
+    intermedia en el esquema development.
+
+    Returns:
+        dict: rows (filas de df), matched (filas de la tabla con coincidencia) y
+            updated (filas actualizadas); None con method='multi'.
+    """
+    if method == 'copy':
+        result = _update_in_transaction(df, conn_string, target_table, target_schema, match_columns,
+                                        update_columns, only_changed, chunksize)
+        logging.info(f"update_from_df {target_schema}.{target_table}: {result['rows']} filas, "
+                     f"{result['matched']} con coincidencia, {result['updated']} actualizadas")
+        return result
 
     temp_table_name = 'temp_update_'+datetime.now().strftime('%Y%m%d%M%S')
 
@@ -52,7 +149,8 @@ def update_from_df(
         conn_string=conn_string,
         table_name=temp_table_name,
         schema='development',
-        if_exists='replace'
+        if_exists='replace',
+        method=method
     )
 
     update_columns_clause = ','.join([f"{x} = temp_t.{x}" for x in update_columns])
@@ -68,4 +166,3 @@ def update_from_df(
     execute_sql(update_statement,conn_string)
 
     execute_sql(f"drop table IF EXISTS development.{temp_table_name}",conn_string)
-
@@ -1,5 +1,49 @@
-from sqlalchemy import create_engine
 import pandas as pd
+from .connection_registry import get_engine, pooled_connection
+from .insert_with_buffer import DataFrameCopyStream, COPY_CHUNKSIZE, COPY_READ_SIZE
+
+
+def _upload_with_copy(df:pd.DataFrame,
+                    conn_string:str,
+                    table_name:str,
+                    if_exists:str,
+                    index:bool,
+                    index_label,
+                    schema,
+                    chunksize:int):
+    """
+    upload_table para Postgres con COPY: crea la tabla con el mismo DDL que
+    generaría to_sql (pd.io.sql.get_schema) y la carga por lotes, todo en una
+    transacción sobre una conexión del pool. Las filas van en un solo COPY que
+    lee los lotes a medida que se serializan.
+    """
+    if index:
+        df = df.reset_index()
+        if index_label is not None:
+            labels = [index_label] if isinstance(index_label, str) else list(index_label)
+            df = df.rename(columns=dict(zip(df.columns[:len(labels)], labels)))
+
+    engine = get_engine(conn_string)
+    quote = engine.dialect.identifier_preparer.quote
+    full_name = f"{quote(schema)}.{quote(table_name)}" if schema else quote(table_name)
+    columns = ','.join(quote(str(c)) for c in df.columns)
+
+    with pooled_connection(conn_string) as conn, conn.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s)", (full_name,))
+        exists = cursor.fetchone()[0] is not None
+        if exists and if_exists == 'fail':
+            raise ValueError(f"Table '{table_name}' already exists.")
+        if exists and if_exists == 'replace':
+            cursor.execute(f"DROP TABLE {full_name}")
+        if not exists or if_exists == 'replace':
+            cursor.execute(pd.io.sql.get_schema(df, table_name, con=engine, schema=schema))
+        stream = DataFrameCopyStream(df, chunksize, 'csv', na_rep='\\N')
+        try:
+            cursor.copy_expert(f"COPY {full_name} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+                               stream, size=COPY_READ_SIZE)
+        finally:
+            stream.close()
+
 
 def upload_table(df:pd.DataFrame,
                 conn_string:str,
@@ -9,15 +53,31 @@ def upload_table(df:pd.DataFrame,
                 index_label=None,
                 db_type='postgres',
                 schema=None,
-                chunksize=1024):
-    
+                chunksize=None,
+                method='multi'):
+    """
+    Sube un DataFrame a una tabla.
+
+    method='multi' usa df.to_sql con INSERTs de varias filas (chunksize por
+    defecto 1024). method='copy' (solo Postgres) crea la tabla si hace falta y
+    carga las filas con COPY, serializadas en lotes de chunksize (por defecto COPY_CHUNKSIZE),
+    mucho más rápido para miles de filas.
+    """
+    if method == 'copy':
+        if db_type != 'postgres':
+            raise ValueError("method='copy' is only available for postgres")
+        _upload_with_copy(df, conn_string, table_name, if_exists, index, index_label, schema,
+                          chunksize or COPY_CHUNKSIZE)
+        return
+
     if db_type =='mysql':
         if index == False and index_label==None:
             df = df.reset_index()
             df.rename(columns={'index':'id'},inplace=True)
 
-    engine = create_engine(conn_string)
+    engine = get_engine(conn_string)
     conn = engine.connect()
+    trans = conn.begin()
 
     if db_type== 'mysql':
         # Handling sql_require_primary_key parameter of Digital Ocean
@@ -32,7 +92,7 @@ def upload_table(df:pd.DataFrame,
             name = table_name,
             if_exists=if_exists,
             con= conn,
-            chunksize=chunksize,
+            chunksize=chunksize or 1024,
             method='multi',
             index=index ,
             index_label=index_label,
@@ -42,9 +102,14 @@ def upload_table(df:pd.DataFrame,
         if db_type=='mysql':
             conn.execute(f'ALTER TABLE {table_name} ADD PRIMARY KEY (id);')
 
+        trans.commit()
+
     except Exception as e:
+        trans.rollback()
         raise(e)
 
     finally:
-        conn.invalidate()
-        engine.dispose()
\ No newline at end of file
+        if db_type == 'mysql':
+            # La sesión quedó con sql_require_primary_key cambiado: no vuelve al pool
+            conn.invalidate()
+        conn.close()
\ No newline at end of file
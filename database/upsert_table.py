@@ -2,12 +2,13 @@
 
 
 from pandas import notnull, DataFrame
-from sqlalchemy import create_engine,text
+from sqlalchemy import text
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.automap import automap_base
-from sqlalchemy import create_engine, MetaData
+from sqlalchemy import MetaData
 from typing import Union
 from numpy import nan
+from .connection_registry import get_engine
 
 
 def upsert_redshift(df:DataFrame,
@@ -20,11 +21,13 @@ def upsert_redshift(df:DataFrame,
 
     # create temp table
 
-    db = create_engine(conn_string)
+    db = get_engine(conn_string)
 
-    with db.connect() as con:
+    with db.begin() as con:
 
-        con.execute(text(f"create temp table temp_{table}(like {schema}.{table});").execution_options(autocommit=True))
+        # La conexión vuelve al pool con la sesión abierta: la tabla temporal de una llamada anterior puede seguir ahí
+        con.execute(text(f"drop table if exists temp_{table};"))
+        con.execute(text(f"create temp table temp_{table}(like {schema}.{table});"))
         soure_table_full_nm = f"temp_{table}"
         target_table_full_nm = f"{schema}.{table}"
         source_table_alias  = f"temp_{table}"
@@ -52,9 +55,7 @@ def upsert_redshift(df:DataFrame,
                 index_label=None,
             )
 
-        con.execute(text(merge_stmt).execution_options(autocommit=True))
-
-    db.dispose()
+        con.execute(text(merge_stmt))
 
 def upsert_dataframe(df:DataFrame,
                     conn_string:str,
@@ -100,7 +101,7 @@ def upsert_dataframe(df:DataFrame,
         )
         return None
 
-    engine = create_engine(conn_string)
+    engine = get_engine(conn_string)
 
     metadata = MetaData()
     # auto-map db tables, list down the tables you want to query here
@@ -125,5 +126,5 @@ def upsert_dataframe(df:DataFrame,
         stmt = stmt.on_conflict_do_update(index_elements = pk,
                                         set_ = dict(stmt.excluded.items()))
 
-    with engine.connect() as conn:
-        conn.execute(stmt.execution_options(autocommit=True))
\ No newline at end of file
+    with engine.begin() as conn:
+        conn.execute(stmt)
\ No newline at end of file
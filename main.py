@@ -1,19 +1,62 @@
-import requests
 import logging
 from datetime import datetime, timedelta
 import numpy as np
 import pandas as pd
 from dotenv import load_dotenv
 import os
-from bertopic import BERTopic
+from functools import partial
 from tqdm import tqdm
 from src.predize_utils import fetch_api_order_ids, convert_tickets_to_df
 from src.predize import Predize
-from database.get_data import get_data
+from src.topic_model import (cargar_modelo_bertopic, cargar_topic_names, asignar_topics, crear_cache_embeddings,
+                             cargar_clasificador_centroides, cargar_en_segundo_plano)
+from src.topic_worker import TopicWorkerClient
+from src.pipeline_state import PipelineState
+from src.pipeline_runner import PipelineRunner, Etapa
+from src.topic_labels import TopicLabels
+from src.order_id_lookup import OrderIdLookup
+from src.rmii_snapshot import RawMerchantInvoiceSnapshot
 from database_credentials.db_credentials_nocnoc import db_credentials_nocnoc as creds
 
 last_message_to = datetime.utcnow() - timedelta(minutes=15)  # 
 LAST_MESSAGE_MINUTES = 90 
+# Si está definida, los topics se piden al worker residente (python -m src.topic_worker)
+TOPIC_WORKER_ADDRESS = os.getenv('TOPIC_WORKER_ADDRESS')
+# Con la ventana de 90 minutos cada mensaje se vería ~6 veces: se cachean sus embeddings
+EMBEDDING_CACHE_PATH = os.getenv('EMBEDDING_CACHE_PATH', 'embedding_cache.sqlite')
+# 'bertopic' (UMAP/HDBSCAN) o 'centroides' (similitud coseno contra topic_embeddings.bin)
+TOPIC_CLASIFICADOR = os.getenv('TOPIC_CLASIFICADOR', 'bertopic')
+# Temperatura del clasificador por centroides; sin definir, la ajustada que se guardó con el modelo
+TOPIC_TEMPERATURA = float(os.getenv('TOPIC_TEMPERATURA')) if os.getenv('TOPIC_TEMPERATURA') else None
+# 'pytorch' (sentence-transformers) u 'onnx' (int8 con onnxruntime, ver src/onnx_embedder.py)
+EMBEDDING_BACKEND = os.getenv('EMBEDDING_BACKEND', 'pytorch')
+# Concurrencia y ritmo de los pedidos por ticket a la API de Predize
+PREDIZE_MAX_IN_FLIGHT = int(os.getenv('PREDIZE_MAX_IN_FLIGHT', 10))
+PREDIZE_RPS = float(os.getenv('PREDIZE_RPS', 20))
+# Tamaño de los lotes de tickets que se convierten mientras se siguen paginando
+TICKETS_POR_LOTE = 100
+# Estado incremental: solo se procesan tickets con mensajes posteriores a la última corrida
+PIPELINE_STATE_PATH = os.getenv('PIPELINE_STATE_PATH', 'pipeline_state.sqlite')
+# Margen hacia atrás del high-watermark, por mensajes que la API indexa con demora
+STATE_OVERLAP_MINUTES = int(os.getenv('STATE_OVERLAP_MINUTES', 5))
+# Tope de recuperación si el pipeline estuvo parado mucho tiempo
+MAX_BACKFILL_MINUTES = int(os.getenv('MAX_BACKFILL_MINUTES', 24 * 60))
+# Una línea JSON por etapa y corrida: tiempo, filas de entrada/salida y memoria
+PIPELINE_METRICS_PATH = os.getenv('PIPELINE_METRICS_PATH', 'pipeline_metrics.jsonl')
+# Cache persistente channelOrderId -> order_id del warehouse
+ORDER_ID_CACHE_PATH = os.getenv('ORDER_ID_CACHE_PATH', 'order_id_cache.sqlite')
+# 'postgres' o 'snapshot' (copia local Arrow con sync incremental, ver src/rmii_snapshot.py)
+WAREHOUSE_LOOKUP = os.getenv('WAREHOUSE_LOOKUP', 'postgres')
+RMII_SNAPSHOT_PATH = os.getenv('RMII_SNAPSHOT_PATH', 'rmii_snapshot.arrow')
+# Columna creciente para traer solo filas nuevas ('id', o 'updated_at' si la tabla la tiene:
+# con 'id' los cambios en filas existentes recién llegan con la próxima carga completa)
+RMII_DELTA_COLUMN = os.getenv('RMII_DELTA_COLUMN', 'id')
+# Segundos tras los que el snapshot se vuelve a traer entero (borrados y cambios)
+RMII_MAX_AGE_SECONDS = int(os.getenv('RMII_MAX_AGE_SECONDS', 24 * 3600))
+# Etiqueta de topic_names.txt que se conserva en paso_12 (tal cual figura en el archivo)
+ETIQUETA_TRACKING = os.getenv('ETIQUETA_TRACKING', 'Tracking')
+# 'filtrar_primero' (filtros y clasificación antes de channelOrderId/order_id) u 'original'
+PIPELINE_PLAN = os.getenv('PIPELINE_PLAN', 'filtrar_primero')
 # Configuración del logger
 logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s',
@@ -27,6 +70,19 @@ logging.basicConfig(
 # Cargar variables de entorno
 load_dotenv()
 
+def en_lotes(iterable, tamanio):
+    """
+    Agrupa un iterable en listas de a lo sumo `tamanio` elementos.
+    """
+    lote = []
+    for elemento in iterable:
+        lote.append(elemento)
+        if len(lote) == tamanio:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
 def paso_1_crear_instancia():
     """
     Crea una instancia de Predize utilizando las credenciales del archivo .env.
@@ -53,27 +109,40 @@ def paso_1_crear_instancia():
     except Exception as e:
         logging.error(f"Error al crear instancia de Predize: {e}")
         raise
-def paso_2_obtener_tickets(predize_instance):
+def paso_2_obtener_tickets(predize_instance, estado=None):
     """
-    Obtiene los tickets de los últimos 15 minutos.
+    Obtiene los tickets de los últimos 15 minutos (todas las páginas).
+    Con `estado` la ventana arranca en el high-watermark de la última corrida
+    (menos STATE_OVERLAP_MINUTES) y se descartan los tickets sin mensajes nuevos.
     """
     try:
         now = datetime.utcnow()
         fifteen_minutes_ago = now - timedelta(minutes=LAST_MESSAGE_MINUTES)
 
-        tickets_response = predize_instance.get_tickets(
+        watermark = estado.high_watermark() if estado is not None else None
+        if watermark is not None:
+            desde = watermark.tz_convert(None).to_pydatetime() - timedelta(minutes=STATE_OVERLAP_MINUTES)
+            fifteen_minutes_ago = max(desde, now - timedelta(minutes=MAX_BACKFILL_MINUTES))
+            logging.info(f"High-watermark: {watermark}. Ventana desde {fifteen_minutes_ago}.")
+
+        tickets = predize_instance.iter_tickets(
             last_message_to=fifteen_minutes_ago.isoformat() + "Z",
             last_message_from=now.isoformat() + "Z"
         )
-        tickets = tickets_response.get('items', [])
 
-        if not tickets:
+        # Se convierte por lotes a medida que llegan las páginas, sin esperar a la última
+        lotes = [convert_tickets_to_df(lote, keep_columns=['lastMessageDate'])
+                 for lote in en_lotes(tickets, TICKETS_POR_LOTE)]
+
+        if not lotes:
             logging.warning("No hay tickets para procesar.")
             return pd.DataFrame()
 
-        df_tickets = convert_tickets_to_df(tickets)
+        df_tickets = pd.concat(lotes, ignore_index=True).drop_duplicates(subset='id')
         df_tickets['id'] = df_tickets['id'].astype(str)
         logging.info(f"Tickets obtenidos: {len(df_tickets)}")
+        if estado is not None:
+            df_tickets = estado.filtrar_tickets_nuevos(df_tickets)
         return df_tickets
     except Exception as e:
         logging.error(f"Error al obtener tickets: {e}")
@@ -94,19 +163,24 @@ def paso_3_filtrar_por_tipo(df_tickets):
         logging.error(f"Error al filtrar tickets por tipo: {e}")
         raise
 
-def paso_4_obtener_mensajes(predize_instance, df_tickets):
+def paso_4_obtener_mensajes(predize_instance, df_tickets, estado=None):
     """
     Obtiene los mensajes asociados a los tickets.
+    Con `estado` se descartan los tickets cuyo último mensaje ya se clasificó.
     """
     try:
         ticket_ids = df_tickets['id'].tolist()
         last_messages = predize_instance.get_last_message_for_tickets(ticket_ids)
 
-        df_messages = pd.DataFrame.from_dict(last_messages, orient='index').reset_index()
+        # Si el mensaje ya trae su ticket_id, se queda el del índice para no duplicar la columna
+        df_messages = pd.DataFrame.from_dict(last_messages, orient='index').drop(columns='ticket_id', errors='ignore')
+        df_messages = df_messages.reset_index()
         df_messages.rename(columns={'index': 'ticket_id'}, inplace=True)
 
         df_combined = df_tickets.merge(df_messages, left_on='id', right_on='ticket_id', how='left', suffixes=('', '_message'))
         logging.info(f"Mensajes obtenidos y combinados: {len(df_messages)}")
+        if estado is not None:
+            df_combined = estado.filtrar_mensajes_nuevos(df_combined)
         return df_combined
     except Exception as e:
         logging.error(f"Error al obtener mensajes: {e}")
@@ -115,26 +189,42 @@ def paso_4_obtener_mensajes(predize_instance, df_tickets):
 def paso_5_traer_channel_order_id(predize_instance, df_combined):
     """
     Obtiene el campo channelOrderId desde la API para cada ticket y lo agrega al DataFrame combinado.
+    Los pedidos se hacen en paralelo (acotados por PREDIZE_MAX_IN_FLIGHT y PREDIZE_RPS);
+    si un ticket falla queda con channelOrderId nulo y el resto sigue.
     """
     try:
-        def get_channel_order_id(ticket_id):
-            url = f"{predize_instance.MAIN_URL}/v1/tickets/{ticket_id}/order"
-            headers = predize_instance.headers
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()
-            data = response.json()
-            return data[0].get('channelOrderId') if data else None
-
         ticket_ids = df_combined['ticket_id'].tolist()
-        df_combined['channelOrderId'] = [
-            get_channel_order_id(ticket_id) for ticket_id in ticket_ids
-        ]
+        channel_order_ids = predize_instance.get_channel_order_ids(
+            ticket_ids,
+            max_in_flight=PREDIZE_MAX_IN_FLIGHT,
+            requests_per_second=PREDIZE_RPS
+        )
+        df_combined['channelOrderId'] = [channel_order_ids.get(ticket_id) for ticket_id in ticket_ids]
         logging.info("Campo channelOrderId agregado.")
         return df_combined
     except Exception as e:
         logging.error(f"Error al obtener channelOrderId: {e}")
         raise
 
+_order_id_lookup = None
+
+def obtener_order_id_lookup():
+    """
+    Lookup de order_id compartido por el proceso: OrderIdLookup contra el
+    warehouse o, con WAREHOUSE_LOOKUP='snapshot', el snapshot local de
+    warehouse.raw_merchant_invoice_id (sincronizado una vez por corrida).
+    """
+    global _order_id_lookup
+    if _order_id_lookup is None:
+        if WAREHOUSE_LOOKUP == 'snapshot':
+            _order_id_lookup = RawMerchantInvoiceSnapshot(creds['postgres_admin'], ruta=RMII_SNAPSHOT_PATH,
+                                                          columna_delta=RMII_DELTA_COLUMN,
+                                                          max_edad=RMII_MAX_AGE_SECONDS)
+            _order_id_lookup.sincronizar()
+        else:
+            _order_id_lookup = OrderIdLookup(creds['postgres_admin'], ruta_cache=ORDER_ID_CACHE_PATH)
+    return _order_id_lookup
+
 def paso_5_1_buscar_order_id_con_channelOrderId(df_combined):
     """
     Utiliza el channelOrderId para buscar el order_id en la tabla warehouse.raw_merchant_invoice_id.
@@ -159,16 +249,10 @@ def paso_5_1_buscar_order_id_con_channelOrderId(df_combined):
             logging.warning("No se encontraron channelOrderIds.")
             return df_combined
 
-        # Convertir lista a string para consulta SQL
-        channel_order_ids_str = ','.join([f"'{x}'" for x in channel_order_ids])
-
-        # Consultar en la tabla `warehouse.raw_merchant_invoice_id`
-        query = f"""
-        SELECT raw_merchant_invoice_id, order_id
-        FROM warehouse.raw_merchant_invoice_id
-        WHERE raw_merchant_invoice_id IN ({channel_order_ids_str})
-        """
-        df_order_ids = get_data(query, creds['postgres_admin'])
+        # Consultar en la tabla `warehouse.raw_merchant_invoice_id` (con cache entre corridas)
+        lookup = obtener_order_id_lookup()
+        df_order_ids = lookup.buscar(channel_order_ids)[['raw_merchant_invoice_id', 'order_id']]
+        lookup.registrar_estadisticas()
 
         if df_order_ids.empty:
             logging.warning("La consulta a warehouse.raw_merchant_invoice_id no devolvió resultados.")
@@ -233,10 +317,12 @@ def paso_6_filtrar_por_channel(df_combined):
 
 def paso_7_simplificar_dataframe(df_combined):
     """
-    Simplifica el DataFrame combinado para incluir solo ticket_id, message, order_id y channelOrderId.
+    Simplifica el DataFrame combinado para incluir solo ticket_id, message, order_id y channelOrderId
+    (y las columnas de topic si ya se clasificó, como en el plan 'filtrar_primero').
     """
     try:
         columnas_necesarias = ['ticket_id', 'message','channelOrderId','order_id']
+        columnas_necesarias += [c for c in ['topic_number', 'probability', 'topic_name'] if c in df_combined.columns]
         df_simplificado = df_combined[columnas_necesarias]
         logging.info(f"DataFrame simplificado: {len(df_simplificado)} filas.")
         return df_simplificado
@@ -246,13 +332,21 @@ def paso_7_simplificar_dataframe(df_combined):
 
 def paso_8_cargar_modelo_bertopic():
     """
-    Carga el modelo BERTopic desde la ruta especificada.
+    Carga el modelo BERTopic desde la ruta especificada (o el clasificador por
+    centroides si TOPIC_CLASIFICADOR='centroides').
+    Si TOPIC_WORKER_ADDRESS está definida, se conecta al worker residente en su lugar.
     """
     try:
-        ruta_modelo = 'bertopic_model_post'
-        modelo = BERTopic.load(ruta_modelo)
-        logging.info("Modelo BERTopic cargado.")
-        return modelo
+        if TOPIC_WORKER_ADDRESS:
+            try:
+                cliente = TopicWorkerClient(TOPIC_WORKER_ADDRESS)
+                logging.info(f"Usando topic worker en {TOPIC_WORKER_ADDRESS}.")
+                return cliente
+            except (ConnectionError, OSError) as e:
+                logging.warning(f"Topic worker no disponible ({e}). Se carga el modelo localmente.")
+        if TOPIC_CLASIFICADOR == 'centroides':
+            return cargar_clasificador_centroides(temperatura=TOPIC_TEMPERATURA, embedding_backend=EMBEDDING_BACKEND)
+        return cargar_modelo_bertopic(embedding_backend=EMBEDDING_BACKEND)
     except Exception as e:
         logging.error(f"Error al cargar el modelo BERTopic: {e}")
         raise
@@ -263,9 +357,18 @@ def paso_9_asignar_topics(df_simplificado, modelo_bertopic):
     """
     try:
         mensajes = df_simplificado['message'].tolist()
-        topics, probs = modelo_bertopic.transform(mensajes)
+        if isinstance(modelo_bertopic, TopicWorkerClient):
+            lote = zip(df_simplificado['ticket_id'].tolist(), mensajes)
+            resultados = modelo_bertopic.clasificar(lote)
+            topics = [r['topic_number'] for r in resultados]
+            probabilidades = [r['probability'] for r in resultados]
+        else:
+            cache = crear_cache_embeddings(ruta_cache=EMBEDDING_CACHE_PATH, embedding_backend=EMBEDDING_BACKEND)
+            topics, probabilidades = asignar_topics(modelo_bertopic, mensajes, cache)
+            cache.registrar_estadisticas()
+            cache.close()
         df_simplificado['topic_number'] = topics
-        df_simplificado['probability'] = [prob.max() for prob in probs]
+        df_simplificado['probability'] = probabilidades
         logging.info("Topics asignados a los mensajes.")
         return df_simplificado
     except Exception as e:
@@ -277,14 +380,7 @@ def paso_10_cargar_topic_names():
     Carga el archivo de topic names y devuelve un diccionario.
     """
     try:
-        ruta_topic_names = 'topic_names.txt'
-        topic_map = {}
-        with open(ruta_topic_names, 'r') as f:
-            for line in f:
-                topic_number, topic_name = line.strip().split(': ')
-                topic_map[int(topic_number)] = topic_name
-        logging.info("Topic names cargados.")
-        return topic_map
+        return cargar_topic_names()
     except Exception as e:
         logging.error(f"Error al cargar topic names: {e}")
         raise
@@ -292,23 +388,43 @@ def paso_10_cargar_topic_names():
 def paso_11_asignar_topic_names(df_simplificado, topic_map):
     """
     Asigna topic_name a cada mensaje en base a topic_number.
+    `topic_map` puede ser el diccionario de paso_10 o un TopicLabels.
     """
     try:
-        df_simplificado['topic_name'] = df_simplificado['topic_number'].map(topic_map)
+        if isinstance(topic_map, TopicLabels):
+            df_simplificado['topic_name'] = topic_map.nombres(df_simplificado['topic_number'])
+        else:
+            df_simplificado['topic_name'] = df_simplificado['topic_number'].map(topic_map)
         logging.info("Topic names asignados.")
         return df_simplificado
     except Exception as e:
         logging.error(f"Error al asignar topic names: {e}")
         raise
 
-def paso_12_filtrar_por_tracking(df_final):
+def paso_12_enrutar_por_etiqueta(df_final, topic_labels, etiquetas=None):
+    """
+    Separa los mensajes en un DataFrame por etiqueta de topic_names.txt en una
+    sola pasada sobre topic_number (ver TopicLabels.enrutar).
+    """
+    try:
+        grupos = topic_labels.enrutar(df_final, etiquetas)
+        logging.info("Mensajes por etiqueta: " + ", ".join(f"{e}={len(df)}" for e, df in grupos.items()))
+        return grupos
+    except Exception as e:
+        logging.error(f"Error al enrutar mensajes por etiqueta: {e}")
+        raise
+
+def paso_12_filtrar_por_tracking(df_final, topic_labels=None):
     """
-    Filtra los mensajes para dejar solo aquellos con topic_name='tracking'.
+    Filtra los mensajes para dejar solo aquellos con la etiqueta ETIQUETA_TRACKING.
+    Con `topic_labels` el filtro es un gather sobre topic_number; sin él se compara topic_name.
     """
     try:
-        if 'topic_name' in df_final.columns:
-            df_tracking = df_final[df_final['topic_name'] == 'tracking']
-            logging.info(f"Mensajes filtrados por topic_name='tracking': {len(df_tracking)}")
+        if topic_labels is not None and 'topic_number' in df_final.columns:
+            df_tracking = paso_12_enrutar_por_etiqueta(df_final, topic_labels, [ETIQUETA_TRACKING])[ETIQUETA_TRACKING]
+        elif 'topic_name' in df_final.columns:
+            df_tracking = df_final[df_final['topic_name'] == ETIQUETA_TRACKING]
+            logging.info(f"Mensajes filtrados por topic_name='{ETIQUETA_TRACKING}': {len(df_tracking)}")
         else:
             logging.warning("La columna 'topic_name' no está presente. No se aplicó el filtro.")
             df_tracking = df_final
@@ -329,61 +445,94 @@ def paso_13_filtrar_por_probabilidad(df_final):
         logging.error(f"Error al filtrar mensajes por probabilidad: {e}")
         raise
 
+def registrar_estado(estado, df_tickets, df_combined=None):
+    """
+    Marca como procesados los tickets de la corrida. Se llama solo cuando el
+    flujo terminó bien: si se corta antes, la próxima corrida los repite.
+    Los tickets cuyo último mensaje no se pudo traer quedan pendientes.
+    """
+    mensajes, pendientes = None, None
+    if df_combined is not None and 'id_message' in df_combined.columns:
+        mensajes = dict(zip(df_combined['ticket_id'], df_combined['id_message']))
+        pendientes = df_combined.loc[df_combined['id_message'].isna(), 'id']
+    estado.registrar(df_tickets, mensajes, pendientes)
+    estado.close()
+
+def construir_etapas(estado, modelo_futuro, topic_map_futuro, plan=None):
+    """
+    Declara los pasos como un DAG. El modelo y los topic names se cargan en
+    segundo plano desde el arranque (ver cargar_en_segundo_plano), solapados
+    con los pasos de red; los pasos 8 y 10 solo esperan esos futuros, y recién
+    cuando hay mensajes que clasificar, así una corrida sin tickets no espera
+    al modelo. Su wall_s en las métricas es la espera que no se llegó a ocultar.
+
+    Con plan='filtrar_primero' los filtros baratos van antes que los pedidos
+    caros: el canal (paso 6) se filtra con los datos del ticket antes de pedir
+    mensajes, y la clasificación (pasos 9 a 13) corre antes del enriquecimiento,
+    así paso_5 y paso_5_1 solo piden channelOrderId y order_id de los tickets
+    que quedan. Con plan='original' se respeta el orden numérico de los pasos.
+    """
+    plan = plan or PIPELINE_PLAN
+    inicio = [
+        Etapa('paso_1', paso_1_crear_instancia, salida='predize'),
+        Etapa('paso_2', partial(paso_2_obtener_tickets, estado=estado), ['predize'], 'df_tickets_corrida',
+              detener_si_vacio=True),
+        Etapa('paso_3', paso_3_filtrar_por_tipo, ['df_tickets_corrida'], 'df_tickets', detener_si_vacio=True),
+    ]
+    if plan == 'original':
+        return inicio + [
+            Etapa('paso_4', partial(paso_4_obtener_mensajes, estado=estado), ['predize', 'df_tickets'],
+                  'df_mensajes', detener_si_vacio=True),
+            Etapa('paso_5', paso_5_traer_channel_order_id, ['predize', 'df_mensajes'], 'df_channel_order_id'),
+            Etapa('paso_5_1', paso_5_1_buscar_order_id_con_channelOrderId, ['df_channel_order_id'], 'df_order_id'),
+            Etapa('paso_6', paso_6_filtrar_por_channel, ['df_order_id'], 'df_mercadolivre'),
+            Etapa('paso_7', paso_7_simplificar_dataframe, ['df_mercadolivre'], 'df_simplificado'),
+            Etapa('paso_8', lambda _: modelo_futuro.result(), ['df_simplificado'], 'modelo_bertopic'),
+            Etapa('paso_9', paso_9_asignar_topics, ['df_simplificado', 'modelo_bertopic'], 'df_topics'),
+            Etapa('paso_10', lambda _: topic_map_futuro.result(), ['df_simplificado'], 'topic_map'),
+            Etapa('paso_10_1', TopicLabels, ['topic_map'], 'topic_labels'),
+            Etapa('paso_11', paso_11_asignar_topic_names, ['df_topics', 'topic_labels'], 'df_topic_names'),
+            Etapa('paso_12', paso_12_filtrar_por_tracking, ['df_topic_names', 'topic_labels'], 'df_tracking'),
+            Etapa('paso_13', paso_13_filtrar_por_probabilidad, ['df_tracking'], 'df_final'),
+        ]
+    if plan == 'filtrar_primero':
+        return inicio + [
+            Etapa('paso_6', paso_6_filtrar_por_channel, ['df_tickets'], 'df_mercadolivre', detener_si_vacio=True),
+            Etapa('paso_4', partial(paso_4_obtener_mensajes, estado=estado), ['predize', 'df_mercadolivre'],
+                  'df_mensajes', detener_si_vacio=True),
+            Etapa('paso_8', lambda _: modelo_futuro.result(), ['df_mensajes'], 'modelo_bertopic'),
+            Etapa('paso_9', paso_9_asignar_topics, ['df_mensajes', 'modelo_bertopic'], 'df_topics'),
+            Etapa('paso_10', lambda _: topic_map_futuro.result(), ['df_mensajes'], 'topic_map'),
+            Etapa('paso_10_1', TopicLabels, ['topic_map'], 'topic_labels'),
+            Etapa('paso_11', paso_11_asignar_topic_names, ['df_topics', 'topic_labels'], 'df_topic_names'),
+            Etapa('paso_12', paso_12_filtrar_por_tracking, ['df_topic_names', 'topic_labels'], 'df_tracking'),
+            Etapa('paso_13', paso_13_filtrar_por_probabilidad, ['df_tracking'], 'df_confiables',
+                  detener_si_vacio=True),
+            Etapa('paso_5', paso_5_traer_channel_order_id, ['predize', 'df_confiables'], 'df_channel_order_id'),
+            Etapa('paso_5_1', paso_5_1_buscar_order_id_con_channelOrderId, ['df_channel_order_id'], 'df_order_id'),
+            Etapa('paso_7', paso_7_simplificar_dataframe, ['df_order_id'], 'df_final'),
+        ]
+    raise ValueError(f"Plan desconocido: {plan}")
+
 if __name__ == "__main__":
     try:
-        # Paso 1: Crear instancia
-        predize_instance = paso_1_crear_instancia()
-
-        # Paso 2: Obtener tickets
-        df_tickets = paso_2_obtener_tickets(predize_instance)
-        if df_tickets.empty:
-            logging.info("No hay tickets para procesar. Finalizando flujo.")
-            exit()
-
-        # Paso 3: Filtrar por tipo
-        df_tickets = paso_3_filtrar_por_tipo(df_tickets)
-        if df_tickets.empty:
-            logging.info("No hay tickets de tipo POST_ORDER. Finalizando flujo.")
-            exit()
-
-        # Paso 4: Obtener mensajes
-        df_combined = paso_4_obtener_mensajes(predize_instance, df_tickets)
-        print(creds)
-        # Paso 5: Traer channelOrderId
-        df_combined = paso_5_traer_channel_order_id(predize_instance, df_combined)
-        
-        # Paso 5.1: Buscar order_id con channelOrderId
-        df_combined = paso_5_1_buscar_order_id_con_channelOrderId(df_combined)
-        print(df_combined)
-
-        # Paso 6: Filtrar por channelAccount_channel
-        df_combined = paso_6_filtrar_por_channel(df_combined)
-
-        # Paso 7: Simplificar DataFrame
-        df_simplificado = paso_7_simplificar_dataframe(df_combined)
-        print(df_simplificado)
-
-        # Paso 8: Cargar modelo BERTopic
-        modelo_bertopic = paso_8_cargar_modelo_bertopic()
+        # Lo primero: el modelo carga (CPU/disco) mientras los pasos 1 a 5.1 esperan a la red
+        modelo_futuro = cargar_en_segundo_plano(paso_8_cargar_modelo_bertopic)
+        topic_map_futuro = cargar_en_segundo_plano(paso_10_cargar_topic_names)
 
-        # Paso 9: Asignar topics
-        df_simplificado = paso_9_asignar_topics(df_simplificado, modelo_bertopic)
+        estado = PipelineState(PIPELINE_STATE_PATH)
+        runner = PipelineRunner(construir_etapas(estado, modelo_futuro, topic_map_futuro),
+                                ruta_metricas=PIPELINE_METRICS_PATH)
+        valores = runner.ejecutar()
 
-        # Paso 10: Cargar topic names
-        topic_map = paso_10_cargar_topic_names()
-
-        # Paso 11: Asignar topic names
-        df_final = paso_11_asignar_topic_names(df_simplificado, topic_map)
-
-        # Paso 12: Filtrar por tracking
-        df_final = paso_12_filtrar_por_tracking(df_final)
-
-        # Paso 13: Filtrar por probabilidad > 80%
-        df_final = paso_13_filtrar_por_probabilidad(df_final)
+        if runner.detenido_en:
+            logging.info(f"Sin datos para seguir después de {runner.detenido_en}. Finalizando flujo.")
+        else:
+            # Resultado final
+            logging.info("Flujo completado exitosamente. DataFrame final:")
+            print(valores['df_final'].head())
 
-        # Resultado final
-        logging.info("Flujo completado exitosamente. DataFrame final:")
-        print(df_final.head())
+        registrar_estado(estado, valores['df_tickets_corrida'], valores.get('df_mensajes'))
 
     except Exception as e:
         logging.critical(f"El flujo se detuvo debido a un error crítico: {e}")
@@ -1,11 +1,28 @@
 from database.get_data import get_data
-import numpy as np
 import pandas as pd
 from database.update_from_df import update_from_df
 from database_credentials import db_credentials_nocnoc as creds
-from tqdm import tqdm
+import pyarrow as pa
+import pyarrow.compute as pc
+from src.rmii_snapshot import RawMerchantInvoiceSnapshot
+from src.substring_matcher import buscar_subcadenas
+from data_manipulation.data_manipulation import InvoiceIdNormalizer
 
-def add_missing_orders():
+def add_missing_orders(snapshot=None, normalizador=None):
+    """
+    Completa el order_id de las órdenes de Predize que no lo tienen.
+
+    Args:
+        snapshot (RawMerchantInvoiceSnapshot, optional): Copia local de
+            warehouse.raw_merchant_invoice_id; si no se pasa, se sincroniza la de por defecto.
+        normalizador (InvoiceIdNormalizer, optional): Reglas de prefijo por canal
+            (magalu agrega 'LU-', b2w quita el nombre de la tienda).
+    """
+    if normalizador is None:
+        normalizador = InvoiceIdNormalizer()
+    if snapshot is None:
+        snapshot = RawMerchantInvoiceSnapshot(creds['postgres_admin'])
+        snapshot.sincronizar()
 
     query = """
     select o.id,
@@ -19,16 +36,11 @@ def add_missing_orders():
 
     df = get_data(query,creds['postgres_admin'])
 
-    df['merchant_invoice_id_predize'] = np.where(
-        df['channel_name']=='magalu',
-        'LU-'+df['merchant_invoice_id_predize'],
-        df['merchant_invoice_id_predize']
-    )
+    df['merchant_invoice_id_predize'] = normalizador.normalizar(df['merchant_invoice_id_predize'], df['channel_name'])
 
     df_americanas = df[df['channel_name']=='b2w']
     df = df[df['channel_name']!='b2w']
 
-    df_americanas['merchant_invoice_id_predize'] = df_americanas['merchant_invoice_id_predize'].str.replace('Lojas Americanas-','').str.replace('Sou Barato-','').str.replace('soubarato-','')
     df_americanas['contains_delimiter'] = df_americanas['merchant_invoice_id_predize'].str.contains('-')
     df_americanas['code_length'] = df_americanas['merchant_invoice_id_predize'].str.len()
     df = pd.concat([
@@ -38,9 +50,7 @@ def add_missing_orders():
 
     df_americanas = df_americanas[df_americanas['contains_delimiter']==True]
 
-    raw_merchant_invoce_id = ','.join([f"'{x}'" for x in df['merchant_invoice_id_predize'].values])
-
-    df_rmii = get_data(f"SELECT * from warehouse.raw_merchant_invoice_id ffi where ffi.raw_merchant_invoice_id in ({raw_merchant_invoce_id})",creds['postgres_admin'])
+    df_rmii = snapshot.buscar(df['merchant_invoice_id_predize'].values)
 
     df_americanas['search_str'] = df_americanas['merchant_invoice_id_predize'].str.split('-').str[-1]
 
@@ -64,41 +74,42 @@ def add_missing_orders():
             target_schema='predize_info'
         )
 
-    df_americanas_rmii = get_data("""
-    with mi as (
-        select *
-        from warehouse.raw_merchant_invoice_id rmii
-        where rmii.merchant_id  in (
-            select merchant_id
-            from warehouse.dim_merchant dm
-            where lower(merchant_name)  like '%%america%%'
-        )
-    )
-    select mi.*
-    from mi
-    left join (
-        select o.order_id
-        from predize_info.orders o
-        inner join predize_info.tickets t
-        on o.ticket_id =t.id
-        where t."channelAccount_channel" = 'b2w'
-    ) _to
-    on mi.order_id = _to.order_id
-    where _to.order_id is null
-    """, creds['postgres_admin'])
-
-    list_results = []
-
-    for search_str in tqdm(df_americanas['search_str'].unique()):
+    # Filas de Americanas del snapshot cuyo order_id todavía no está en una orden de b2w.
+    # A Postgres solo van las dos listas chicas de ids, no la tabla de Americanas entera.
+    americanas_merchant_ids = get_data("""
+    select merchant_id
+    from warehouse.dim_merchant dm
+    where lower(merchant_name)  like '%%america%%'
+    """, creds['postgres_admin'])['merchant_id']
 
-        df_search = df_americanas_rmii[df_americanas_rmii['raw_merchant_invoice_id'].str.contains(search_str)]
-
-        if df_search.shape[0]>0:
-            list_results.append(df_search.assign(search_str=search_str))
-
-
-    if len(list_results)>0:
-        df_search_results = pd.concat(list_results)
+    b2w_order_ids = get_data("""
+    select o.order_id
+    from predize_info.orders o
+    inner join predize_info.tickets t
+    on o.ticket_id =t.id
+    where t."channelAccount_channel" = 'b2w'
+    and o.order_id is not null
+    """, creds['postgres_admin'])['order_id']
+
+    def es_americanas_sin_orden(tabla):
+        merchant_ids = pa.array(americanas_merchant_ids.tolist()).cast(tabla['merchant_id'].type)
+        order_ids = pa.array(b2w_order_ids.tolist()).cast(tabla['order_id'].type)
+        return pc.and_(pc.is_in(tabla['merchant_id'], value_set=merchant_ids),
+                       pc.invert(pc.is_in(tabla['order_id'], value_set=order_ids)))
+
+    df_americanas_rmii = snapshot.filtrar(es_americanas_sin_orden)
+
+    # Todas las search_str contra todos los raw_merchant_invoice_id en una sola pasada
+    search_strs = df_americanas['search_str'].unique()
+    coincidencias = buscar_subcadenas(df_americanas_rmii['raw_merchant_invoice_id'], search_strs)
+
+    if len(coincidencias)>0:
+        # Mismo orden que el loop por search_str que había antes
+        orden_search_str = {search_str: i for i, search_str in enumerate(search_strs)}
+        coincidencias = coincidencias.sort_values(by='patron', key=lambda x: x.map(orden_search_str), kind='stable')
+        df_search_results = df_americanas_rmii.loc[coincidencias['indice']].assign(
+            search_str=coincidencias['patron'].values
+        )
 
         df_americanas = df_search_results.join(
                     df_americanas.set_index('search_str'),on='search_str',how='inner'
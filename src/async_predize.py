@@ -0,0 +1,206 @@
+import asyncio
+import logging
+
+import aiohttp
+
+from src.predize import PredizeUnauthorized, TokenRefreshMixin
+from src.rate_limit import TokenBucket, RetryableError, RETRYABLE_STATUS, parse_retry_after, retry_on_retryable
+
+
+class AsyncPredize(TokenRefreshMixin):
+    """
+    Cliente asyncio de la API de Predize con la misma superficie que Predize.
+
+    Todos los pedidos comparten un único pool de conexiones, un semáforo que
+    limita la concurrencia y un token bucket que limita el ritmo (si se pasa
+    requests_per_second; sin él solo aplica las pausas por 429), y la
+    renovación del token es compartida: si varias corutinas reciben 401 a la
+    vez, solo una llama a /v1/auth/refresh. El token también se renueva antes
+    de su `exp`, con la misma política que Predize (TokenRefreshMixin).
+
+    Uso:
+        async with AsyncPredize(email, password) as predize:
+            tickets = await predize.get_tickets(last_message_from=..., last_message_to=...)
+    """
+
+    def __init__(self, email: str, password: str, main_url: str = "https://api.predize.com",
+                 max_concurrency: int = 100, requests_per_second: float = None, timeout: float = 60) -> None:
+        self.MAIN_URL = main_url
+        self.email = email
+        self.password = password
+        self.max_concurrency = max_concurrency
+        self.tenant_id = 'efb0b1c4-32ae-4355-8465-4013e27f88be'
+        self.session = None
+        self.token = None
+        self.token_refresh_at = None
+        self.refresh_token = None
+        self.headers = {}
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.rate_limiter = TokenBucket(requests_per_second)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._refresh_lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency)
+        self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        try:
+            await self.get_token(self.email, self.password)
+        except BaseException:
+            # __aexit__ no corre si __aenter__ falla: la sesión (y su conector) se cierra acá
+            await self.session.close()
+            raise
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+
+    async def _send(self, method, url, autenticado=False, **kwargs):
+        """
+        Envía un pedido respetando el token bucket y devuelve (status, body).
+        Los status transitorios y los errores de conexión se elevan como RetryableError.
+        """
+        await self.rate_limiter.acquire_async()
+        if autenticado:
+            # Después del bucket: la espera por el rate limit puede haber vencido el token
+            await self._ensure_fresh_token()
+            kwargs['headers'] = self.headers
+        try:
+            async with self._semaphore:
+                async with self.session.request(method, url, **kwargs) as response:
+                    status = response.status
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                    try:
+                        body = await response.json(content_type=None)
+                    except ValueError:
+                        body = {'message': await response.text()}
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+            raise RetryableError(str(e)) from e
+        if status in RETRYABLE_STATUS:
+            if status == 429 and retry_after is not None:
+                self.rate_limiter.pausar(retry_after)
+            raise RetryableError(f"HTTP {status}: {body}", retry_after=retry_after)
+        return status, body
+
+    @retry_on_retryable()
+    async def get_token(self, email: str, password: str) -> dict:
+        url = f"{self.MAIN_URL}/v1/auth/login"
+        status, body = await self._send('POST', url, json={"email": email, "password": password})
+        if status >= 400:
+            raise Exception(body)
+        self._set_token_info(body)
+        return body
+
+    async def _refresh_token(self, token_usado):
+        async with self._refresh_lock:
+            # Otra corutina ya renovó el token mientras esperábamos el lock
+            if self.token != token_usado:
+                return
+            logging.info('Refreshing token')
+            url = f"{self.MAIN_URL}/v1/auth/refresh"
+            status, body = await self._send('POST', url, json={'refreshToken': self.refresh_token})
+            if status >= 400:
+                # El refresh token también venció: login de nuevo
+                await self.get_token(self.email, self.password)
+            else:
+                self._set_token_info(body)
+
+    async def _ensure_fresh_token(self):
+        if self._token_vencido():
+            await self._refresh_token(self.token)
+
+    async def _request(self, method, path, params=None, raise_unauthorized=True):
+        """
+        Hace un pedido autenticado. Ante un 401 renueva el token (una sola vez
+        para todas las corutinas) y repite el pedido con el header nuevo.
+        """
+        url = f"{self.MAIN_URL}{path}"
+        for intento in range(2):
+            token_usado = self.token
+            status, body = await self._send(method, url, autenticado=True, params=params)
+            if status == 401 or (isinstance(body, dict) and body.get('message') == 'Unauthorized'):
+                await self._refresh_token(token_usado)
+                if intento == 0:
+                    continue
+                if raise_unauthorized:
+                    raise PredizeUnauthorized()
+                return body
+            if status == 404 or (isinstance(body, dict) and body.get('error') == 'Not Found'):
+                return body
+            if status >= 400:
+                raise Exception(body)
+            return body
+
+    @retry_on_retryable()
+    async def get_tickets(self, page=1, limit=100, status=None, type=None, claim_type=None,
+                          greater_than_date: str = None, less_than_date: str = None,
+                          last_message_from: str = None, last_message_to: str = None):
+        params = {
+            'page': page,
+            'limit': limit,
+            'status': status,
+            'type': type,
+            'claimType': claim_type,
+            'greaterThanDate': greater_than_date,
+            'lessThanDate': less_than_date,
+            'lastMessageFrom': last_message_from,
+            'lastMessageTo': last_message_to
+        }
+        params = {k: v for k, v in params.items() if v is not None}
+        return await self._request('GET', '/v1/tickets', params=params)
+
+    @retry_on_retryable()
+    async def get_messages_by_ticket_id(self, ticket_id, page=1, limit=100, raise_unauthorized=True):
+        return await self._request('GET', f"/v1/tickets/{ticket_id}/messages",
+                                   params={'page': page, 'limit': limit},
+                                   raise_unauthorized=raise_unauthorized)
+
+    @retry_on_retryable()
+    async def get_order_by_ticket_id(self, ticket_id, raise_unauthorized=True):
+        body = await self._request('GET', f"/v1/tickets/{ticket_id}/order",
+                                   raise_unauthorized=raise_unauthorized)
+        return body if isinstance(body, list) else []
+
+    async def _gather(self, coros):
+        # return_exceptions: un ticket que falla no cancela el resto
+        return await asyncio.gather(*coros, return_exceptions=True)
+
+    async def get_tickets_in_parallel(self, pages=[], **kwargs):
+        return await self._gather([self.get_tickets(page=page, **kwargs) for page in pages])
+
+    async def get_messages_in_parallel(self, tickets=[], raise_unauthorized=True):
+        return await self._gather([self.get_messages_by_ticket_id(ticket_id, raise_unauthorized=raise_unauthorized)
+                                   for ticket_id in tickets])
+
+    async def get_channel_order_ids(self, ticket_ids):
+        """
+        Returns:
+            dict: {ticket_id: channelOrderId}; None si el ticket no tiene orden o falló.
+        """
+        orders = await self._gather([self.get_order_by_ticket_id(ticket_id) for ticket_id in ticket_ids])
+        resultado = {}
+        for ticket_id, order in zip(ticket_ids, orders):
+            if isinstance(order, Exception):
+                logging.warning(f"Error al obtener la orden del ticket {ticket_id}: {order}")
+                order = None
+            resultado[ticket_id] = order[0].get('channelOrderId') if order else None
+        return resultado
+
+    async def get_last_message_for_tickets(self, ticket_ids):
+        """
+        Obtiene el último mensaje para cada ticket en la lista de ticket_ids.
+
+        Returns:
+            dict: Diccionario donde las claves son ticket_ids y los valores son los últimos mensajes.
+        """
+        async def fetch_last_message(ticket_id):
+            try:
+                messages = await self.get_messages_by_ticket_id(ticket_id)
+                if not messages or not messages.get('items'):
+                    return None
+                return max(messages['items'], key=lambda x: x['createDate'])
+            except Exception as e:
+                logging.warning(f"Error al obtener el último mensaje para el ticket {ticket_id}: {e}")
+                return None
+
+        results = await asyncio.gather(*[fetch_last_message(ticket_id) for ticket_id in ticket_ids])
+        return {ticket_id: message for ticket_id, message in zip(ticket_ids, results) if message}
@@ -0,0 +1,168 @@
+"""
+Clasificador de topics por centroide más cercano.
+
+Usa directamente bertopic_model_post/topic_embeddings.bin (un tensor de torch
+guardado sin compresión dentro de un zip) mapeado en memoria, y puntúa cada
+mensaje contra todos los centroides con una sola multiplicación de matrices.
+No pasa por UMAP/HDBSCAN.
+"""
+import json
+import logging
+import os
+import struct
+import zipfile
+import numpy as np
+
+ARCHIVO_TOPIC_EMBEDDINGS = 'topic_embeddings.bin'
+# Temperatura ajustada con ajustar_temperatura, guardada junto a topic_embeddings.bin
+ARCHIVO_TEMPERATURA = 'centroid_temperature.json'
+# Solo si no hay temperatura ajustada para el modelo
+TEMPERATURA_POR_DEFECTO = 0.02
+
+
+def _offset_datos_zip(ruta, sufijo):
+    """
+    Devuelve (offset, tamaño) de la entrada del zip cuyo nombre termina en `sufijo`.
+    Solo sirve para entradas sin compresión, que es como torch guarda los tensores.
+    """
+    with zipfile.ZipFile(ruta) as z:
+        info = next(i for i in z.infolist() if i.filename.endswith(sufijo))
+    if info.compress_type != zipfile.ZIP_STORED:
+        raise ValueError(f"{ruta}: la entrada {info.filename} está comprimida, no se puede mapear.")
+    with open(ruta, 'rb') as f:
+        f.seek(info.header_offset)
+        cabecera = f.read(30)
+    largo_nombre, largo_extra = struct.unpack('<HH', cabecera[26:30])
+    return info.header_offset + 30 + largo_nombre + largo_extra, info.file_size
+
+
+def cargar_topic_embeddings(ruta_modelo):
+    """
+    Mapea en memoria los centroides de topics del modelo BERTopic.
+
+    Returns:
+        tuple: (np.memmap float32 (n_topics, dim), lista de topic ids por fila)
+    """
+    with open(os.path.join(ruta_modelo, 'topics.json')) as f:
+        topics_info = json.load(f)
+    outliers = int(topics_info.get('_outliers', 0))
+    n_topics = len(topics_info['topic_labels'])
+    topic_ids = [i - outliers for i in range(n_topics)]
+
+    ruta = os.path.join(ruta_modelo, ARCHIVO_TOPIC_EMBEDDINGS)
+    offset, tamanio = _offset_datos_zip(ruta, '/data/0')
+    dim = tamanio // (4 * n_topics)
+    centroides = np.memmap(ruta, dtype='<f4', mode='r', offset=offset, shape=(n_topics, dim))
+    return centroides, topic_ids
+
+
+def guardar_temperatura(ruta_modelo, temperatura, **detalles):
+    """
+    Guarda la temperatura ajustada junto a los centroides del modelo, con
+    `detalles` opcionales (p. ej. cuántos mensajes se usaron para ajustarla).
+    """
+    with open(os.path.join(ruta_modelo, ARCHIVO_TEMPERATURA), 'w') as f:
+        json.dump({'temperatura': float(temperatura), **detalles}, f, indent=2)
+
+
+def leer_temperatura(ruta_modelo):
+    """
+    Temperatura ajustada guardada con guardar_temperatura, o None si no hay.
+    """
+    ruta = os.path.join(ruta_modelo, ARCHIVO_TEMPERATURA)
+    if not os.path.exists(ruta):
+        return None
+    with open(ruta) as f:
+        return float(json.load(f)['temperatura'])
+
+
+class CentroidTopicClassifier:
+    """
+    Asigna a cada mensaje el topic cuyo centroide tiene mayor similitud coseno.
+
+    Los puntajes se calibran con un softmax con temperatura sobre las
+    similitudes, así `probability` queda en [0, 1] y suma 1 entre topics.
+    Sin `temperatura` explícita se usa la ajustada para el modelo
+    (ARCHIVO_TEMPERATURA, ver ajustar_temperatura y guardar_temperatura) y,
+    si no la hay, TEMPERATURA_POR_DEFECTO.
+    Expone `transform` y `embedding_model` igual que BERTopic, por lo que
+    funciona con src.topic_model.asignar_topics.
+    """
+
+    def __init__(self, embedding_model, ruta_modelo, temperatura=None, excluir_outliers=False):
+        self.embedding_model = embedding_model
+        if temperatura is None:
+            temperatura = leer_temperatura(ruta_modelo)
+        if temperatura is None:
+            logging.warning(f"{ruta_modelo} no tiene temperatura ajustada ({ARCHIVO_TEMPERATURA}); "
+                            f"se usa {TEMPERATURA_POR_DEFECTO}, las probabilidades no están calibradas.")
+            temperatura = TEMPERATURA_POR_DEFECTO
+        self.temperatura = temperatura
+        centroides, topic_ids = cargar_topic_embeddings(ruta_modelo)
+        if excluir_outliers and topic_ids[0] == -1:
+            centroides, topic_ids = centroides[1:], topic_ids[1:]
+        normas = np.linalg.norm(centroides, axis=1, keepdims=True)
+        # Copia normalizada de (n_topics, dim): con 143 x 384 son ~220 KB
+        self.centroides = (centroides / np.maximum(normas, 1e-12)).astype(np.float32)
+        self.topic_ids = np.asarray(topic_ids, dtype=int)
+
+    def similitudes(self, embeddings):
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        normas = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return (embeddings / np.maximum(normas, 1e-12)) @ self.centroides.T
+
+    def _softmax(self, similitudes, temperatura=None):
+        z = similitudes / (temperatura or self.temperatura)
+        z = z - z.max(axis=1, keepdims=True)
+        e = np.exp(z)
+        return e / e.sum(axis=1, keepdims=True)
+
+    def puntajes(self, embeddings):
+        """
+        Matriz (n_mensajes, n_topics) de probabilidades calibradas.
+        """
+        return self._softmax(self.similitudes(embeddings))
+
+    def top_k(self, embeddings, k=3):
+        """
+        Returns:
+            tuple: (topic ids (n, k), puntajes (n, k)) ordenados de mayor a menor.
+        """
+        puntajes = self.puntajes(embeddings)
+        k = min(k, puntajes.shape[1])
+        indices = np.argpartition(-puntajes, k - 1, axis=1)[:, :k]
+        orden = np.take_along_axis(-puntajes, indices, axis=1).argsort(axis=1)
+        indices = np.take_along_axis(indices, orden, axis=1)
+        return self.topic_ids[indices], np.take_along_axis(puntajes, indices, axis=1)
+
+    def transform(self, mensajes, embeddings=None):
+        """
+        Misma firma y salida que BERTopic.transform con calculate_probabilities=True.
+        """
+        if embeddings is None:
+            embeddings = self.embedding_model.embed_documents(mensajes)
+        puntajes = self.puntajes(embeddings)
+        return self.topic_ids[puntajes.argmax(axis=1)], puntajes
+
+    def ajustar_temperatura(self, embeddings, topics_objetivo, grilla=None):
+        """
+        Elige la temperatura que minimiza la log-loss contra topics de referencia
+        (por ejemplo, los que asigna BERTopic sobre un corpus etiquetado).
+
+        Returns:
+            float: Temperatura elegida (también queda en self.temperatura).
+        """
+        if grilla is None:
+            grilla = np.logspace(-3, 0, 60)
+        similitudes = self.similitudes(embeddings)
+        posiciones = {t: i for i, t in enumerate(self.topic_ids)}
+        filas = [i for i, t in enumerate(topics_objetivo) if t in posiciones]
+        columnas = [posiciones[topics_objetivo[i]] for i in filas]
+        if not filas:
+            raise ValueError("Ningún topic objetivo coincide con los centroides.")
+        perdidas = [
+            -np.log(self._softmax(similitudes[filas], t)[np.arange(len(filas)), columnas] + 1e-12).mean()
+            for t in grilla
+        ]
+        self.temperatura = float(grilla[int(np.argmin(perdidas))])
+        return self.temperatura
@@ -0,0 +1,41 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Iterable
+
+
+def fetch_concurrently(func: Callable, items: Iterable, max_in_flight: int = 10, rate_limiter=None):
+    """
+    Ejecuta `func(item)` para cada item con a lo sumo `max_in_flight` llamadas
+    simultáneas. Un error en un item no corta el resto del lote.
+
+    Args:
+        func (callable): Función que recibe un item y devuelve su resultado.
+        items (iterable): Items a procesar (deben ser hasheables).
+        max_in_flight (int): Máximo de llamadas en curso a la vez.
+        rate_limiter (TokenBucket, optional): Limita el ritmo de llamadas.
+
+    Returns:
+        tuple: (resultados, errores), dos diccionarios indexados por item.
+    """
+    items = list(dict.fromkeys(items))
+    resultados, errores = {}, {}
+    if not items:
+        return resultados, errores
+
+    def llamar(item):
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        return func(item)
+
+    with ThreadPoolExecutor(max_workers=min(max_in_flight, len(items))) as executor:
+        futuros = {executor.submit(llamar, item): item for item in items}
+        for futuro in as_completed(futuros):
+            item = futuros[futuro]
+            try:
+                resultados[item] = futuro.result()
+            except Exception as e:
+                errores[item] = e
+
+    if errores:
+        logging.warning(f"{len(errores)} de {len(items)} llamadas fallaron; se continúa con el resto.")
+    return resultados, errores
@@ -0,0 +1,113 @@
+import hashlib
+import logging
+import threading
+import time
+import numpy as np
+
+from src.sqlite_utils import conectar, seleccionar_en_lotes, desalojar_lru
+
+RUTA_CACHE = 'embedding_cache.sqlite'
+MAX_ENTRADAS = 50000
+
+
+class EmbeddingCache:
+    """
+    Cache persistente de embeddings en SQLite, indexada por hash del mensaje.
+
+    Cada vector se guarda como float32 crudo. Cuando se supera `max_entradas`
+    se eliminan las entradas usadas hace más tiempo.
+    """
+
+    def __init__(self, ruta=RUTA_CACHE, nombre_modelo='', max_entradas=MAX_ENTRADAS):
+        self.ruta = ruta
+        self.nombre_modelo = nombre_modelo
+        self.max_entradas = max_entradas
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = conectar(ruta, """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                hash TEXT PRIMARY KEY,
+                dim INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used);
+        """)
+
+    def hash_mensaje(self, texto):
+        # El nombre del modelo entra en la clave: otro backend no reutiliza vectores ajenos
+        return hashlib.sha1(f"{self.nombre_modelo}\0{texto}".encode('utf-8')).hexdigest()
+
+    def obtener(self, hashes):
+        """
+        Devuelve {hash: vector} para los hashes presentes y actualiza su last_used.
+        """
+        hashes = list(set(hashes))
+        encontrados = {}
+        with self._lock:
+            filas = seleccionar_en_lotes(self._conn, "SELECT hash, dim, vector FROM embeddings "
+                                                     "WHERE hash IN ({placeholders})", hashes)
+            for h, dim, vector in filas:
+                encontrados[h] = np.frombuffer(vector, dtype=np.float32, count=dim)
+            ahora = time.time()
+            self._conn.executemany("UPDATE embeddings SET last_used = ? WHERE hash = ?",
+                                   [(ahora, h) for h in encontrados])
+            self._conn.commit()
+        return encontrados
+
+    def guardar(self, vectores):
+        """
+        Guarda {hash: vector} y aplica el límite de tamaño.
+        """
+        ahora = time.time()
+        filas = [(h, int(v.shape[0]), np.ascontiguousarray(v, dtype=np.float32).tobytes(), ahora)
+                 for h, v in vectores.items()]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", filas)
+            self.evictions += desalojar_lru(self._conn, 'embeddings', self.max_entradas)
+            self._conn.commit()
+
+    def embeber(self, textos, funcion_embedding):
+        """
+        Devuelve los embeddings de `textos` en orden, calculando solo los que no
+        están en la cache.
+
+        Args:
+            textos (list): Lista de mensajes.
+            funcion_embedding (callable): Recibe una lista de textos y devuelve
+                una matriz (n, dim).
+
+        Returns:
+            np.ndarray: Matriz float32 (len(textos), dim).
+        """
+        hashes = [self.hash_mensaje(t) for t in textos]
+        vectores = self.obtener(hashes)
+
+        nuevos = {}
+        for h, texto in zip(hashes, textos):
+            if h not in vectores:
+                nuevos[h] = texto
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        if nuevos:
+            calculados = np.asarray(funcion_embedding(list(nuevos.values())), dtype=np.float32)
+            calculados = dict(zip(nuevos.keys(), calculados))
+            self.guardar(calculados)
+            vectores.update(calculados)
+
+        if not textos:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.vstack([vectores[h] for h in hashes])
+
+    def registrar_estadisticas(self):
+        total = self.hits + self.misses
+        tasa = self.hits / total if total else 0.0
+        logging.info(f"Cache de embeddings: hits={self.hits} misses={self.misses} "
+                     f"hit_rate={tasa:.1%} evictions={self.evictions}")
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,116 @@
+"""
+Backend de embeddings ONNX (int8) para CPU.
+
+Exporta all-MiniLM-L6-v2 a ONNX, lo cuantiza con cuantización dinámica int8 y
+lo ejecuta con onnxruntime, replicando el pipeline de sentence-transformers
+(transformer -> mean pooling -> normalización L2).
+
+Exportar una vez:
+    python -m src.onnx_embedder --exportar
+"""
+import argparse
+import logging
+import os
+import numpy as np
+from bertopic.backend import BaseEmbedder
+
+RUTA_ONNX = 'modelo_onnx'
+ARCHIVO_FP32 = 'model.onnx'
+ARCHIVO_INT8 = 'model_int8.onnx'
+MAX_LENGTH = 256  # max_seq_length de all-MiniLM-L6-v2 en sentence-transformers
+
+
+def exportar_modelo_onnx(nombre_modelo, carpeta_salida=RUTA_ONNX, opset=14):
+    """
+    Exporta el transformer a ONNX y genera la versión cuantizada int8.
+
+    Args:
+        nombre_modelo (str): Modelo de Hugging Face, p. ej. 'sentence-transformers/all-MiniLM-L6-v2'.
+        carpeta_salida (str): Carpeta donde se guardan el modelo y el tokenizer.
+
+    Returns:
+        str: Ruta del modelo int8.
+    """
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    os.makedirs(carpeta_salida, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(nombre_modelo)
+    modelo = AutoModel.from_pretrained(nombre_modelo)
+    modelo.eval()
+
+    ejemplo = tokenizer(["exportación"], return_tensors='pt')
+    entradas = ['input_ids', 'attention_mask', 'token_type_ids']
+    ejes = {nombre: {0: 'batch', 1: 'secuencia'} for nombre in entradas}
+    ejes['last_hidden_state'] = {0: 'batch', 1: 'secuencia'}
+
+    ruta_fp32 = os.path.join(carpeta_salida, ARCHIVO_FP32)
+    with torch.no_grad():
+        torch.onnx.export(
+            modelo,
+            tuple(ejemplo[nombre] for nombre in entradas),
+            ruta_fp32,
+            input_names=entradas,
+            output_names=['last_hidden_state'],
+            dynamic_axes=ejes,
+            opset_version=opset
+        )
+
+    ruta_int8 = os.path.join(carpeta_salida, ARCHIVO_INT8)
+    quantize_dynamic(ruta_fp32, ruta_int8, weight_type=QuantType.QInt8)
+    tokenizer.save_pretrained(carpeta_salida)
+    logging.info(f"Modelo ONNX exportado en {ruta_int8}.")
+    return ruta_int8
+
+
+class OnnxEmbedder(BaseEmbedder):
+    """
+    Embedder compatible con BERTopic que corre el modelo int8 con onnxruntime.
+    """
+
+    def __init__(self, carpeta=RUTA_ONNX, archivo=ARCHIVO_INT8, batch_size=64, max_length=MAX_LENGTH):
+        super().__init__()
+        import onnxruntime
+        from transformers import AutoTokenizer
+
+        opciones = onnxruntime.SessionOptions()
+        opciones.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(os.path.join(carpeta, archivo), opciones,
+                                                    providers=['CPUExecutionProvider'])
+        self.entradas = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(carpeta)
+        self.batch_size = batch_size
+        self.max_length = max_length
+
+    def _embeber_lote(self, documentos):
+        tokens = self.tokenizer(documentos, padding=True, truncation=True,
+                                max_length=self.max_length, return_tensors='np')
+        feed = {k: v.astype(np.int64) for k, v in tokens.items() if k in self.entradas}
+        hidden = self.session.run(None, feed)[0]
+
+        # Mean pooling sobre los tokens reales, igual que sentence-transformers
+        mascara = tokens['attention_mask'][..., None].astype(np.float32)
+        embeddings = (hidden * mascara).sum(axis=1) / np.maximum(mascara.sum(axis=1), 1e-9)
+        normas = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.maximum(normas, 1e-12)
+
+    def embed(self, documents, verbose=False):
+        documents = list(documents)
+        if not documents:
+            return np.empty((0, 0), dtype=np.float32)
+        lotes = [self._embeber_lote(documents[i:i + self.batch_size])
+                 for i in range(0, len(documents), self.batch_size)]
+        return np.vstack(lotes).astype(np.float32)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(format='%(asctime)s - %(levelname)s - %(message)s', level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Exporta el modelo de embeddings a ONNX int8.")
+    parser.add_argument('--exportar', action='store_true')
+    parser.add_argument('--modelo', default='sentence-transformers/all-MiniLM-L6-v2')
+    parser.add_argument('--salida', default=RUTA_ONNX)
+    args = parser.parse_args()
+
+    if args.exportar:
+        exportar_modelo_onnx(args.modelo, args.salida)
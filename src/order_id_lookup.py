@@ -0,0 +1,143 @@
+import io
+import logging
+import threading
+import time
+
+import pandas as pd
+import psycopg2
+
+from database.connection_registry import pooled_connection
+from src.sqlite_utils import conectar, seleccionar_en_lotes, desalojar_lru
+
+RUTA_CACHE_ORDER_ID = 'order_id_cache.sqlite'
+MAX_ENTRADAS = 200000
+# Con más claves que esto se cargan a una tabla temporal con COPY y se hace un JOIN
+UMBRAL_TABLA_TEMPORAL = 5000
+
+CONSULTA_ANY = """
+    SELECT raw_merchant_invoice_id, order_id
+    FROM warehouse.raw_merchant_invoice_id
+    WHERE raw_merchant_invoice_id = ANY(%s)
+"""
+CONSULTA_JOIN = """
+    SELECT r.raw_merchant_invoice_id, r.order_id
+    FROM warehouse.raw_merchant_invoice_id r
+    JOIN tmp_claves_rmii t ON t.clave = r.raw_merchant_invoice_id
+"""
+
+
+def _escapar_copy(valor):
+    """
+    Escapa un valor para COPY en formato texto.
+    """
+    return valor.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+class OrderIdLookup:
+    """
+    Búsqueda de order_id por raw_merchant_invoice_id (el channelOrderId de Predize).
+
+    Las claves se consultan con un array como parámetro (`= ANY(%s)`), o con
+    una tabla temporal y un JOIN si son muchas, sobre el pool de conexiones
+    compartido del proceso (database.connection_registry). Los resultados se guardan en una cache
+    LRU en SQLite que persiste entre corridas: una clave que ya se resolvió
+    no vuelve a consultarse a Postgres. Las claves sin resultado no se
+    cachean, porque el warehouse puede cargarlas más tarde.
+
+    Uso:
+        lookup = OrderIdLookup(creds['postgres_admin'])
+        df = lookup.buscar(['2000001234', ...])  # columnas raw_merchant_invoice_id, order_id
+    """
+
+    def __init__(self, credenciales, ruta_cache=RUTA_CACHE_ORDER_ID, max_entradas=MAX_ENTRADAS,
+                 umbral_tabla_temporal=UMBRAL_TABLA_TEMPORAL):
+        self.credenciales = credenciales
+        self.max_entradas = max_entradas
+        self.umbral_tabla_temporal = umbral_tabla_temporal
+        self.hits = 0
+        self.misses = 0
+        self.consultas = 0
+        self._lock = threading.Lock()
+        self._conn_cache = conectar(ruta_cache, """
+            CREATE TABLE IF NOT EXISTS order_ids (
+                clave TEXT NOT NULL,
+                order_id INTEGER,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (clave, order_id)
+            );
+            CREATE INDEX IF NOT EXISTS idx_order_ids_last_used ON order_ids(last_used);
+        """)
+
+    def _consultar(self, claves):
+        """
+        Devuelve [(clave, order_id)] de Postgres para las claves dadas.
+        """
+        for intento in range(2):
+            try:
+                with pooled_connection(self.credenciales) as conn, conn.cursor() as cur:
+                    if len(claves) < self.umbral_tabla_temporal:
+                        cur.execute(CONSULTA_ANY, (list(claves),))
+                    else:
+                        cur.execute("CREATE TEMP TABLE IF NOT EXISTS tmp_claves_rmii (clave text PRIMARY KEY) "
+                                    "ON COMMIT DELETE ROWS")
+                        datos = io.StringIO('\n'.join(_escapar_copy(c) for c in claves))
+                        cur.copy_expert("COPY tmp_claves_rmii (clave) FROM STDIN", datos)
+                        cur.execute("ANALYZE tmp_claves_rmii")
+                        cur.execute(CONSULTA_JOIN)
+                    self.consultas += 1
+                    return cur.fetchall()
+            except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+                # Conexión del pool caída (timeout del servidor, failover): se reintenta con otra
+                if intento == 1:
+                    raise
+                logging.warning(f"Conexión al warehouse caída ({e}); se reintenta.")
+
+    def _obtener_cache(self, claves):
+        with self._lock:
+            encontradas = seleccionar_en_lotes(self._conn_cache, "SELECT clave, order_id FROM order_ids "
+                                                                 "WHERE clave IN ({placeholders})", claves)
+            ahora = time.time()
+            self._conn_cache.executemany("UPDATE order_ids SET last_used = ? WHERE clave = ?",
+                                         [(ahora, clave) for clave in {c for c, _ in encontradas}])
+            self._conn_cache.commit()
+        return encontradas
+
+    def _guardar_cache(self, filas):
+        ahora = time.time()
+        with self._lock:
+            self._conn_cache.executemany("INSERT OR REPLACE INTO order_ids VALUES (?, ?, ?)",
+                                         [(clave, order_id, ahora) for clave, order_id in filas])
+            desalojar_lru(self._conn_cache, 'order_ids', self.max_entradas)
+            self._conn_cache.commit()
+
+    def buscar(self, claves):
+        """
+        Busca el order_id de cada clave, primero en la cache y después en Postgres.
+
+        Args:
+            claves (iterable): raw_merchant_invoice_id a buscar.
+
+        Returns:
+            pd.DataFrame: Columnas raw_merchant_invoice_id y order_id, una fila por
+                par encontrado (igual que la consulta a warehouse.raw_merchant_invoice_id).
+        """
+        claves = list(dict.fromkeys(str(c) for c in claves if pd.notna(c)))
+        filas = self._obtener_cache(claves)
+        cacheadas = {clave for clave, _ in filas}
+        faltantes = [c for c in claves if c not in cacheadas]
+        self.hits += len(cacheadas)
+        self.misses += len(faltantes)
+        if faltantes:
+            nuevas = self._consultar(faltantes)
+            self._guardar_cache(nuevas)
+            filas += nuevas
+        return pd.DataFrame(filas, columns=['raw_merchant_invoice_id', 'order_id'])
+
+    def registrar_estadisticas(self):
+        total = self.hits + self.misses
+        tasa = self.hits / total if total else 0.0
+        logging.info(f"Cache de order_id: hits={self.hits} misses={self.misses} "
+                     f"hit_rate={tasa:.1%} consultas={self.consultas}")
+
+    def close(self):
+        self._conn_cache.close()
@@ -0,0 +1,181 @@
+import json
+import logging
+import resource
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+
+import pandas as pd
+
+
+def _filas(valor):
+    """
+    Cantidad de filas si el valor es un DataFrame/Series, si no None.
+    """
+    return len(valor) if isinstance(valor, (pd.DataFrame, pd.Series)) else None
+
+
+def _rss_pico_mb():
+    """
+    Pico de memoria residente del proceso en MB (ru_maxrss: KB en Linux, bytes en macOS).
+    """
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / (1024 * 1024) if sys.platform == 'darwin' else pico / 1024
+
+
+class Etapa:
+    """
+    Nodo del pipeline: `funcion(*entradas)` y su resultado queda guardado con
+    el nombre `salida` para las etapas que lo usen como entrada.
+
+    Args:
+        nombre (str): Nombre de la etapa en logs y métricas.
+        funcion (callable): Recibe los valores de `entradas` en orden.
+        entradas (list): Nombres de salidas de otras etapas.
+        salida (str, optional): Nombre del resultado; por defecto `nombre`.
+        detener_si_vacio (bool): Si el resultado es un DataFrame vacío, no se
+            lanzan más etapas (equivale al exit() temprano del flujo manual).
+    """
+
+    def __init__(self, nombre, funcion, entradas=(), salida=None, detener_si_vacio=False):
+        self.nombre = nombre
+        self.funcion = funcion
+        self.entradas = list(entradas)
+        self.salida = salida or nombre
+        self.detener_si_vacio = detener_si_vacio
+
+
+class PipelineRunner:
+    """
+    Ejecuta un DAG de etapas: cada etapa arranca apenas están sus entradas, y
+    las etapas independientes corren en paralelo en un pool de hilos (las de
+    red y la carga del modelo liberan el GIL casi todo el tiempo).
+
+    Por cada etapa se agrega una línea JSON a `ruta_metricas` con el tiempo de
+    pared, filas de entrada/salida y memoria. La memoria es la del proceso
+    (pico de RSS al terminar la etapa y cuánto creció mientras corría): con
+    etapas en paralelo, el crecimiento se reparte entre las que se solaparon.
+
+    Uso:
+        runner = PipelineRunner([Etapa('a', f), Etapa('b', g, ['a'])])
+        valores = runner.ejecutar()
+        if runner.detenido_en: ...
+    """
+
+    def __init__(self, etapas, max_workers=4, ruta_metricas='pipeline_metrics.jsonl'):
+        self.etapas = list(etapas)
+        self.max_workers = max_workers
+        self.ruta_metricas = ruta_metricas
+        self.detenido_en = None
+        self.metricas = []
+        self._validar()
+
+    def _validar(self):
+        salidas = {}
+        for etapa in self.etapas:
+            if etapa.salida in salidas:
+                raise ValueError(f"La salida '{etapa.salida}' la producen '{salidas[etapa.salida]}' y '{etapa.nombre}'.")
+            salidas[etapa.salida] = etapa.nombre
+        for etapa in self.etapas:
+            faltantes = [e for e in etapa.entradas if e not in salidas]
+            if faltantes:
+                raise ValueError(f"La etapa '{etapa.nombre}' espera entradas que nadie produce: {faltantes}")
+        # Kahn: si quedan etapas sin poder ordenarse hay un ciclo
+        pendientes = {e.nombre: set(e.entradas) for e in self.etapas}
+        disponibles = set()
+        while True:
+            listas = [n for n, ent in pendientes.items() if ent <= disponibles]
+            if not listas:
+                break
+            for nombre in listas:
+                disponibles.add(next(e.salida for e in self.etapas if e.nombre == nombre))
+                del pendientes[nombre]
+        if pendientes:
+            raise ValueError(f"Hay un ciclo entre las etapas: {sorted(pendientes)}")
+
+    def _correr(self, etapa, argumentos, inicio_corrida):
+        inicio = time.perf_counter()
+        rss_antes = _rss_pico_mb()
+        estado, resultado, error = 'ok', None, None
+        try:
+            resultado = etapa.funcion(*argumentos)
+        except Exception as e:
+            estado, error = 'error', e
+        fin = time.perf_counter()
+        filas_entrada = [f for f in map(_filas, argumentos) if f is not None]
+        rss_despues = _rss_pico_mb()
+        metrica = {
+            'stage': etapa.nombre,
+            'status': estado,
+            'start_s': round(inicio - inicio_corrida, 3),
+            'wall_s': round(fin - inicio, 3),
+            'rows_in': sum(filas_entrada) if filas_entrada else None,
+            'rows_out': _filas(resultado),
+            'peak_rss_mb': round(rss_despues, 1),
+            'rss_growth_mb': round(rss_despues - rss_antes, 1),
+        }
+        if error is not None:
+            metrica['error'] = repr(error)
+        return resultado, error, metrica
+
+    def ejecutar(self, valores_iniciales=None):
+        """
+        Corre el DAG y devuelve el diccionario {salida: valor}.
+        Si una etapa falla, no se espera a las que siguen corriendo, se cancelan
+        las que no empezaron y se relanza el error.
+        """
+        valores = dict(valores_iniciales or {})
+        pendientes = list(self.etapas)
+        self.detenido_en = None
+        self.metricas = []
+        run_id = uuid.uuid4().hex[:12]
+        run_started_at = datetime.utcnow().isoformat() + 'Z'
+        inicio_corrida = time.perf_counter()
+        error_fatal = None
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        en_curso = {}
+        try:
+            while pendientes or en_curso:
+                for etapa in [e for e in pendientes if all(x in valores for x in e.entradas)]:
+                    pendientes.remove(etapa)
+                    argumentos = [valores[x] for x in etapa.entradas]
+                    futuro = executor.submit(self._correr, etapa, argumentos, inicio_corrida)
+                    en_curso[futuro] = etapa
+                if not en_curso:
+                    break
+                listos, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+                for futuro in listos:
+                    etapa = en_curso.pop(futuro)
+                    resultado, error, metrica = futuro.result()
+                    metrica.update({'run_id': run_id, 'run_started_at': run_started_at})
+                    self.metricas.append(metrica)
+                    logging.info(f"Etapa {etapa.nombre}: {metrica['status']} en {metrica['wall_s']:.2f}s "
+                                 f"(filas {metrica['rows_in']} -> {metrica['rows_out']})")
+                    if error is not None:
+                        logging.error(f"La etapa {etapa.nombre} falló: {error}")
+                        error_fatal = error_fatal or error
+                        continue
+                    valores[etapa.salida] = resultado
+                    if etapa.detener_si_vacio and isinstance(resultado, pd.DataFrame) and resultado.empty:
+                        logging.info(f"La etapa {etapa.nombre} no devolvió filas. No se lanzan más etapas.")
+                        self.detenido_en = self.detenido_en or etapa.nombre
+                if self.detenido_en is not None or error_fatal is not None:
+                    # Lo que sigue corriendo (p. ej. la carga del modelo) ya no hace falta
+                    break
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+            self._guardar_metricas()
+
+        if error_fatal is not None:
+            raise error_fatal
+        return valores
+
+    def _guardar_metricas(self):
+        if not self.ruta_metricas or not self.metricas:
+            return
+        with open(self.ruta_metricas, 'a') as f:
+            for metrica in self.metricas:
+                f.write(json.dumps(metrica) + '\n')
@@ -0,0 +1,135 @@
+import logging
+import threading
+import time
+import pandas as pd
+
+from src.sqlite_utils import conectar, seleccionar_en_lotes
+
+RUTA_ESTADO = 'pipeline_state.sqlite'
+
+
+class PipelineState:
+    """
+    Estado persistente de main.py en SQLite: último lastMessageDate y último
+    id de mensaje procesados por ticket, más un high-watermark global.
+
+    El estado solo se escribe con `registrar` al final de una corrida exitosa,
+    así una corrida que se cae a la mitad se repite entera en el próximo tick.
+    Las etapas del pipeline corren en hilos distintos: la conexión se comparte
+    entre hilos y el acceso se serializa con un lock.
+    """
+
+    def __init__(self, ruta=RUTA_ESTADO):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        self._conn = conectar(ruta, """
+            CREATE TABLE IF NOT EXISTS tickets (
+                ticket_id TEXT PRIMARY KEY,
+                last_message_date TEXT,
+                last_message_id TEXT,
+                processed_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS estado (
+                clave TEXT PRIMARY KEY,
+                valor TEXT
+            );
+        """)
+
+    def high_watermark(self):
+        """
+        Mayor lastMessageDate procesado (pd.Timestamp UTC) o None si nunca se corrió.
+        """
+        with self._lock:
+            fila = self._conn.execute("SELECT valor FROM estado WHERE clave = 'high_watermark'").fetchone()
+        return pd.Timestamp(fila[0]) if fila and fila[0] else None
+
+    def _leer_tickets(self, ticket_ids):
+        with self._lock:
+            filas = seleccionar_en_lotes(
+                self._conn,
+                "SELECT ticket_id, last_message_date, last_message_id FROM tickets WHERE ticket_id IN ({placeholders})",
+                (str(x) for x in ticket_ids)
+            )
+        return pd.DataFrame(filas, columns=['ticket_id', 'last_message_date', 'last_message_id'])
+
+    def filtrar_tickets_nuevos(self, df_tickets, col_id='id', col_fecha='lastMessageDate'):
+        """
+        Deja los tickets nunca vistos o cuyo lastMessageDate avanzó desde la última corrida.
+        """
+        if df_tickets.empty:
+            return df_tickets
+        previos = self._leer_tickets(df_tickets[col_id].unique()).set_index('ticket_id')['last_message_date']
+        anterior = pd.to_datetime(df_tickets[col_id].astype(str).map(previos), utc=True)
+        actual = pd.to_datetime(df_tickets[col_fecha], utc=True)
+        mascara = anterior.isna() | actual.isna() | (actual > anterior)
+        logging.info(f"Tickets nuevos o con mensajes nuevos: {int(mascara.sum())} de {len(df_tickets)}")
+        return df_tickets[mascara.values]
+
+    def filtrar_mensajes_nuevos(self, df_combined, col_ticket='ticket_id', col_mensaje='id_message'):
+        """
+        Descarta los tickets cuyo último mensaje ya fue procesado.
+        """
+        if df_combined.empty or col_mensaje not in df_combined.columns:
+            return df_combined
+        previos = self._leer_tickets(df_combined[col_ticket].dropna().unique()).set_index('ticket_id')['last_message_id']
+        anterior = df_combined[col_ticket].astype(str).map(previos)
+        actual = df_combined[col_mensaje].astype('string')
+        mascara = anterior.isna() | actual.isna() | (actual != anterior)
+        logging.info(f"Tickets con último mensaje sin procesar: {int(mascara.sum())} de {len(df_combined)}")
+        return df_combined[mascara.fillna(True).values]
+
+    def registrar(self, df_tickets, mensajes=None, pendientes=None, col_id='id', col_fecha='lastMessageDate'):
+        """
+        Marca como procesados los tickets de la corrida, en una sola transacción.
+
+        Los tickets en `pendientes` (se pidió su último mensaje y no llegó) no se
+        registran y el high-watermark no pasa de su lastMessageDate: la próxima
+        corrida los vuelve a traer.
+
+        Args:
+            df_tickets (pd.DataFrame): Tickets que entraron a la corrida (con lastMessageDate).
+            mensajes (dict, optional): {ticket_id: id del último mensaje procesado}.
+            pendientes (iterable, optional): ids de tickets que quedaron sin mensaje.
+        """
+        if df_tickets.empty:
+            return
+        mensajes = {str(k): v for k, v in (mensajes or {}).items()}
+        pendientes = {str(t) for t in (pendientes or ())}
+        es_pendiente = df_tickets[col_id].astype(str).isin(pendientes).to_numpy()
+        fechas_pendientes = pd.to_datetime(df_tickets.loc[es_pendiente, col_fecha], utc=True)
+        df_tickets = df_tickets[~es_pendiente]
+        fechas = pd.to_datetime(df_tickets[col_fecha], utc=True)
+        ahora = time.time()
+        filas = [
+            (str(ticket_id),
+             None if pd.isna(fecha) else fecha.isoformat(),
+             None if pd.isna(mensajes.get(str(ticket_id))) else str(mensajes.get(str(ticket_id))),
+             ahora)
+            for ticket_id, fecha in zip(df_tickets[col_id], fechas)
+        ]
+        maximo = fechas.max()
+        if not pd.isna(fechas_pendientes.min()):
+            maximo = min(maximo, fechas_pendientes.min()) if not pd.isna(maximo) else fechas_pendientes.min()
+        watermark = self.high_watermark()
+        with self._lock, self._conn:
+            # COALESCE: un ticket filtrado antes de pedir mensajes conserva el último id conocido
+            self._conn.executemany("""
+                INSERT INTO tickets (ticket_id, last_message_date, last_message_id, processed_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(ticket_id) DO UPDATE SET
+                    last_message_date = excluded.last_message_date,
+                    last_message_id = COALESCE(excluded.last_message_id, tickets.last_message_id),
+                    processed_at = excluded.processed_at
+            """, filas)
+            if not pd.isna(maximo) and (watermark is None or maximo > watermark):
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO estado (clave, valor) VALUES ('high_watermark', ?)",
+                    (maximo.isoformat(),)
+                )
+        if pendientes:
+            logging.warning(f"{int(es_pendiente.sum())} tickets sin mensaje quedan pendientes para la próxima corrida.")
+        logging.info(f"Estado actualizado: {len(filas)} tickets registrados.")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
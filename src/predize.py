@@ -1,11 +1,18 @@
+import base64
+import json
+import logging
+import threading
+import time
 import requests
-from tenacity import retry, stop_after_attempt, wait_fixed
-from time import sleep
-from random import randint
+from requests.adapters import HTTPAdapter
 from typing import Iterable
 from tqdm import tqdm
-from datetime import datetime, timedelta
+from collections import deque
 from concurrent.futures import ThreadPoolExecutor
+from math import ceil
+from src.concurrent_fetcher import fetch_concurrently
+from src.rate_limit import (TokenBucket, RetryableError, RETRYABLE_STATUS, parse_retry_after,
+                            retry_on_retryable)
 
 
 def unpack_messages(messages):
@@ -21,51 +28,201 @@ def return_error_ticket_id(retry_state):
     return {'id': ticket_id, 'exception': _exception}
 
 
-class Predize:
-    def __init__(self, email: str, password: str) -> None:
-        self.MAIN_URL = "https://api.predize.com"
-        self.token_info = self.get_token(email, password)
-        self.token = self.token_info.get('accessToken')
+class PredizeUnauthorized(RetryableError):
+    """
+    401 de la API. Se reintenta sin espera porque el token ya se renovó.
+    """
+
+    def __init__(self, message='Not Authorized') -> None:
+        super().__init__(message, retry_after=0)
+
+
+def token_expiry(token):
+    """
+    Devuelve el claim `exp` (epoch) de un JWT sin verificar la firma, o None.
+    """
+    try:
+        payload = token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))['exp'])
+    except (AttributeError, IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+def total_pages(response: dict, limit: int):
+    """
+    Cantidad de páginas que declara una respuesta paginada, o None si no la informa.
+    Solo se usan claves de total de ítems: 'count' suele ser el tamaño de la página.
+    """
+    fuentes = [response, response.get('meta') or {}]
+    for fuente in fuentes:
+        for clave in ('totalPages', 'pages', 'lastPage'):
+            if isinstance(fuente.get(clave), int):
+                return fuente[clave]
+        for clave in ('total', 'totalItems'):
+            if isinstance(fuente.get(clave), int):
+                return ceil(fuente[clave] / limit)
+    return None
+
+
+def fecha_creacion(mensaje):
+    """
+    createDate de un mensaje para comparar (ISO 8601, ordena como texto).
+    """
+    return mensaje.get('createDate') or ''
+
+
+def response_body(response):
+    """
+    Cuerpo JSON de la respuesta; si no es JSON (p. ej. un 502 en HTML), {'message': texto}.
+    """
+    try:
+        return response.json()
+    except ValueError:
+        return {'message': response.text}
+
+
+class TokenRefreshMixin:
+    """
+    Política de renovación del JWT compartida por Predize y AsyncPredize:
+    guarda el token y sus headers y calcula cuándo renovarlo antes de su exp.
+    """
+    # Se renueva el token este margen (segundos) antes de su exp
+    TOKEN_REFRESH_MARGIN = 60
+
+    def build_headers(self, token) -> dict:
+        return {"accept": "application/json", "Authorization": f"Bearer {token}"}
+
+    def _set_token_info(self, token_info):
+        self.token_info = token_info
+        self.token = token_info.get('accessToken')
+        self.token_refresh_at = self._calcular_refresh_at(token_expiry(self.token))
         self.headers = self.build_headers(self.token)
-        self.refresh_token = self.token_info.get('refreshToken')
+        self.refresh_token = token_info.get('refreshToken')
+
+    def _calcular_refresh_at(self, exp):
+        if exp is None:
+            return None
+        # Con tokens cortos el margen no puede comerse toda la vida del token
+        margen = min(self.TOKEN_REFRESH_MARGIN, max(exp - time.time(), 0) / 2)
+        return exp - margen
+
+    def _token_vencido(self):
+        return self.token_refresh_at is not None and time.time() >= self.token_refresh_at
+
+
+class Predize(TokenRefreshMixin):
+
+    def __init__(self, email: str, password: str, main_url: str = "https://api.predize.com",
+                 pool_size: int = 50, requests_per_second: float = None, timeout: float = 60) -> None:
+        self.MAIN_URL = main_url
+        self.timeout = timeout
+        self._email = email
+        self._password = password
+        # Un único token bucket para todos los hilos que usan esta instancia. Sin
+        # requests_per_second no limita el ritmo (cada llamada puede pasar el suyo),
+        # pero sigue frenando a todos los hilos ante un 429 con Retry-After
+        self.rate_limiter = TokenBucket(requests_per_second)
+        # Un solo refresh en curso: los demás hilos esperan este lock y reutilizan el resultado
+        self._token_lock = threading.Lock()
+        self.token = None
+        self.token_refresh_at = None
+        self.headers = {}
+        self.refresh_token = None
+        # Orden en que la API devuelve los mensajes ('asc'/'desc'), detectado en get_last_message
+        self._messages_order = None
+        self.last_message_bytes = {}
+        # Una sola sesión: reutiliza conexiones TCP/TLS entre pedidos e hilos
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._set_token_info(self.get_token(email, password))
         self.tenant_id = 'efb0b1c4-32ae-4355-8465-4013e27f88be'
 
-    def _refresh_token(self):
-        print(datetime.now(), 'Refreshing token')
-        url = f"{self.MAIN_URL}/v1/auth/refresh"
-        params = {'refreshToken': self.refresh_token}
-        response = requests.post(url, json=params)
-        self.validate_response(response)
-        self.token_info = response.json()
-        self.token = self.token_info.get('accessToken')
-        self.headers = self.build_headers(self.token)
-        self.refresh_token = self.token_info.get('refreshToken')
+    def _refresh_token(self, token_usado=None):
+        """
+        Renueva el token (single-flight). Si otro hilo ya lo renovó desde que se
+        usó `token_usado`, no hace nada y el llamador reintenta con el token nuevo.
+        """
+        with self._token_lock:
+            if token_usado is not None and token_usado != self.token:
+                return
+            logging.info('Refreshing token')
+            url = f"{self.MAIN_URL}/v1/auth/refresh"
+            params = {'refreshToken': self.refresh_token}
+            response = self._request('POST', url, headers={}, json=params)
+            if response.ok:
+                self._set_token_info(response.json())
+            else:
+                # El refresh token también venció: login de nuevo
+                self._set_token_info(self.get_token(self._email, self._password))
+
+    def _ensure_fresh_token(self):
+        if self._token_vencido():
+            self._refresh_token(self.token)
+
+    def _request(self, method, url, headers=None, **kwargs):
+        """
+        Único punto de salida HTTP: pasa por el token bucket compartido y
+        convierte los errores de conexión en RetryableError.
+
+        Sin `headers` explícitos el pedido va autenticado: se renueva el token
+        antes de que venza y, si igual llega un 401, se renueva una vez y se
+        repite el pedido con el header nuevo.
+        """
+        autenticado = headers is None
+        for intento in range(2):
+            self.rate_limiter.acquire()
+            # Después del bucket: la espera por el rate limit puede haber vencido el token
+            if autenticado:
+                self._ensure_fresh_token()
+            token_usado = self.token
+            try:
+                response = self.session.request(method, url, headers=self.headers if autenticado else headers,
+                                                timeout=self.timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                raise RetryableError(str(e)) from e
+            if autenticado and intento == 0 and response.status_code == 401:
+                self._refresh_token(token_usado)
+                continue
+            return response
 
     def validate_response(self, response, raise_unauthorized=True):
-        if not response.ok:
-            sleep(randint(5, 7))
-            if response.json().get('message') == 'Unauthorized':
-                self._refresh_token()
-                if raise_unauthorized:
-                    raise Exception('Not Authorized')
-            elif response.json().get('error') == 'Not Found':
-                pass
-            else:
-                raise Exception(response.json())
+        if response.ok:
+            return
+        body = response_body(response)
+        if response.status_code in RETRYABLE_STATUS:
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            if response.status_code == 429 and retry_after is not None:
+                # El servidor pidió frenar: se frena a todos los hilos, no solo a este
+                self.rate_limiter.pausar(retry_after)
+            raise RetryableError(f"HTTP {response.status_code}: {body}", retry_after=retry_after)
+        if not isinstance(body, dict):
+            raise Exception(body)
+        if response.status_code == 401 or body.get('message') == 'Unauthorized':
+            token_usado = response.request.headers.get('Authorization', '').replace('Bearer ', '', 1)
+            if not token_usado:
+                # 401 en login/refresh: credenciales inválidas, no hay token que renovar
+                raise Exception(body)
+            self._refresh_token(token_usado)
+            if raise_unauthorized:
+                raise PredizeUnauthorized()
+        elif body.get('error') == 'Not Found':
+            pass
+        else:
+            raise Exception(body)
 
-    @retry(stop=stop_after_attempt(3), wait=wait_fixed(3))
+    @retry_on_retryable()
     def get_token(self, email: str, password: str) -> dict:
         params = {"email": email, "password": password}
         headers = {'Content-Type': 'application/json', 'accept': 'application/json'}
         url = f"{self.MAIN_URL}/v1/auth/login"
-        response = requests.post(url=url, headers=headers, json=params)
+        response = self._request('POST', url=url, headers=headers, json=params)
         self.validate_response(response)
         return response.json()
 
-    def build_headers(self, token) -> dict:
-        return {"accept": "application/json", "Authorization": f"Bearer {token}"}
-
-    @retry(stop=stop_after_attempt(3), wait=wait_fixed(3))
+    @retry_on_retryable()
     def get_tickets(self, page=1, limit=100, status=None, type=None, claim_type=None,
                     greater_than_date: str = None, less_than_date: str = None,
                     last_message_from: str = None, last_message_to: str = None):
@@ -80,22 +237,113 @@ class Predize:
         }
         params = {k: v for k, v in params.items() if v is not None}
         url = f"{self.MAIN_URL}/v1/tickets?page={page}&limit={limit}"
-        response = requests.get(url=url, headers=self.headers, params=params)
+        response = self._request('GET', url=url, params=params)
         self.validate_response(response)
-        sleep(randint(1, 3))
         return response.json()
 
-    @retry(stop=stop_after_attempt(3), wait=wait_fixed(3))
+    @retry_on_retryable()
     def get_messages_by_ticket_id(self, ticket_id, page=1, limit=100, raise_unauthorized=True):
         url = f"{self.MAIN_URL}/v1/tickets/{ticket_id}/messages?page={page}&limit={limit}"
-        response = requests.get(url=url, headers=self.headers)
+        response = self._request('GET', url=url)
+        self.validate_response(response, raise_unauthorized)
+        return response.json()
+
+    @retry_on_retryable()
+    def get_order_by_ticket_id(self, ticket_id, raise_unauthorized=True):
+        url = f"{self.MAIN_URL}/v1/tickets/{ticket_id}/order"
+        response = self._request('GET', url=url)
+        if response.status_code == 404:
+            return []
         self.validate_response(response, raise_unauthorized)
         return response.json()
 
+    def get_channel_order_ids(self, ticket_ids, max_in_flight=10, requests_per_second=None):
+        """
+        Obtiene el channelOrderId de cada ticket con pedidos concurrentes acotados.
+
+        Args:
+            ticket_ids (list): Lista de IDs de tickets.
+            max_in_flight (int): Máximo de pedidos simultáneos.
+            requests_per_second (float, optional): Límite adicional de pedidos por segundo
+                para esta llamada (el límite global de la instancia siempre aplica).
+
+        Returns:
+            dict: {ticket_id: channelOrderId}; None si el ticket no tiene orden o falló.
+        """
+        rate_limiter = TokenBucket(requests_per_second) if requests_per_second else None
+        orders, errores = fetch_concurrently(self.get_order_by_ticket_id, ticket_ids,
+                                             max_in_flight=max_in_flight, rate_limiter=rate_limiter)
+        for ticket_id, error in errores.items():
+            logging.warning(f"Error al obtener la orden del ticket {ticket_id}: {error}")
+        return {
+            ticket_id: (orders[ticket_id][0].get('channelOrderId') if orders.get(ticket_id) else None)
+            for ticket_id in ticket_ids
+        }
+
     def get_messages_in_parallel(self, tickets=[], raise_unauthorized=True, max_workers=50):
         list_params = [{'ticket_id': x, 'raise_unauthorized': raise_unauthorized} for x in tickets]
         return self._run_parallel(self.get_messages_by_ticket_id, list_params, max_workers=max_workers)
 
+    def iter_tickets(self, limit=100, lookahead=4, **filters):
+        """
+        Recorre todas las páginas de get_tickets y va entregando los tickets.
+
+        La primera página informa el total; las siguientes se piden en paralelo
+        con a lo sumo `lookahead` páginas por delante de la que se está
+        consumiendo. Si la API no informa el total, se pide página por página
+        hasta recibir una incompleta. Un ticket que aparece en dos páginas
+        (porque cambió mientras se paginaba) se entrega una sola vez.
+
+        Args:
+            limit (int): Tickets por página.
+            lookahead (int): Máximo de páginas pedidas por adelantado.
+            **filters: Mismos filtros que get_tickets (status, type, last_message_from, ...).
+
+        Yields:
+            dict: Un ticket.
+        """
+        vistos = set()
+
+        def nuevos(respuesta):
+            for ticket in respuesta.get('items', []) or []:
+                if ticket.get('id') not in vistos:
+                    vistos.add(ticket.get('id'))
+                    yield ticket
+
+        primera = self.get_tickets(page=1, limit=limit, **filters)
+        yield from nuevos(primera)
+        paginas = total_pages(primera, limit)
+
+        if paginas is None:
+            page, items = 2, primera.get('items', []) or []
+            while len(items) == limit:
+                respuesta = self.get_tickets(page=page, limit=limit, **filters)
+                items = respuesta.get('items', []) or []
+                yield from nuevos(respuesta)
+                page += 1
+            return
+
+        pendientes_de_pedir = iter(range(2, paginas + 1))
+        with ThreadPoolExecutor(max_workers=max(1, lookahead)) as executor:
+            en_vuelo = deque()
+
+            def pedir_siguiente():
+                page = next(pendientes_de_pedir, None)
+                if page is not None:
+                    en_vuelo.append(executor.submit(self.get_tickets, page=page, limit=limit, **filters))
+
+            for _ in range(max(1, lookahead)):
+                pedir_siguiente()
+            try:
+                while en_vuelo:
+                    futuro = en_vuelo.popleft()
+                    pedir_siguiente()
+                    yield from nuevos(futuro.result())
+            finally:
+                # Si el consumidor corta antes, no se esperan páginas que nadie va a leer
+                for futuro in en_vuelo:
+                    futuro.cancel()
+
     def get_tickets_in_parallel(self, pages=[], max_workers=50):
         list_params = [{'page': x} for x in pages]
         return self._run_parallel(self.get_tickets, list_params, max_workers=max_workers)
@@ -109,31 +357,105 @@ class Predize:
                             total=len(list_params)))
         return res
 
-    def get_last_message_for_tickets(self, ticket_ids, max_workers=10):
+    @retry_on_retryable()
+    def _get_messages_page(self, ticket_id, page=1, limit=100):
+        """
+        Como get_messages_by_ticket_id, pero devuelve también los bytes recibidos.
+        """
+        url = f"{self.MAIN_URL}/v1/tickets/{ticket_id}/messages?page={page}&limit={limit}"
+        response = self._request('GET', url=url)
+        self.validate_response(response)
+        return response.json(), len(response.content)
+
+    def _last_message_by_scan(self, ticket_id, limit=100):
+        """
+        Recorre todas las páginas de mensajes quedándose solo con el de mayor
+        createDate; nunca guarda más de una página en memoria.
+        """
+        ultimo, recibidos, page = None, 0, 1
+        while True:
+            respuesta, bytes_pagina = self._get_messages_page(ticket_id, page=page, limit=limit)
+            recibidos += bytes_pagina
+            items = respuesta.get('items') or []
+            for item in items:
+                if ultimo is None or fecha_creacion(item) > fecha_creacion(ultimo):
+                    ultimo = item
+            paginas = total_pages(respuesta, limit)
+            # len(items) > limit: la API ignoró el limit y ya devolvió todo
+            if not items or len(items) > limit or (paginas is None and len(items) < limit) \
+                    or (paginas is not None and page >= paginas):
+                return ultimo, recibidos
+            page += 1
+
+    def get_last_message(self, ticket_id, mode='ends', limit=100):
+        """
+        Obtiene el último mensaje de un ticket pidiendo lo mínimo posible.
+
+        Modos:
+            'ends': pide la primera y la última página de tamaño 1 y se queda
+                con la de mayor createDate, lo que es correcto tanto si la API
+                ordena de más viejo a más nuevo como al revés. Si detecta que
+                ordena de más nuevo a más viejo, los tickets siguientes se
+                resuelven con un solo pedido. Si la API no respeta limit=1 o
+                no informa el total, cae a 'scan'.
+            'scan': recorre todas las páginas de `limit` mensajes con un máximo
+                por createDate.
+            'page': comportamiento anterior, una sola página de `limit` mensajes.
+
+        Returns:
+            tuple: (mensaje o None, bytes recibidos)
+        """
+        if mode == 'page':
+            respuesta, recibidos = self._get_messages_page(ticket_id, page=1, limit=limit)
+            return max(respuesta.get('items') or [], key=fecha_creacion, default=None), recibidos
+        if mode == 'scan':
+            return self._last_message_by_scan(ticket_id, limit)
+
+        primera, recibidos = self._get_messages_page(ticket_id, page=1, limit=1)
+        items = primera.get('items') or []
+        # Con páginas de un mensaje, la cantidad de páginas es la de mensajes
+        total = total_pages(primera, 1)
+        if len(items) > 1 or total is None:
+            mensaje, recibidos_scan = self._last_message_by_scan(ticket_id, limit)
+            return mensaje, recibidos + recibidos_scan
+        if total <= 1 or self._messages_order == 'desc':
+            return (items[0] if items else None), recibidos
+
+        ultima, recibidos_ultima = self._get_messages_page(ticket_id, page=total, limit=1)
+        recibidos += recibidos_ultima
+        extremos = items + (ultima.get('items') or [])
+        if self._messages_order is None and len(extremos) == 2 \
+                and fecha_creacion(extremos[0]) != fecha_creacion(extremos[1]):
+            self._messages_order = 'desc' if fecha_creacion(extremos[0]) > fecha_creacion(extremos[1]) else 'asc'
+        return max(extremos, key=fecha_creacion), recibidos
+
+    def get_last_message_for_tickets(self, ticket_ids, max_workers=10, mode='ends'):
         """
         Obtiene el último mensaje para cada ticket en la lista de ticket_ids.
+        Los bytes recibidos por ticket quedan en `self.last_message_bytes`.
 
         Args:
             ticket_ids (list): Lista de IDs de tickets.
             max_workers (int): Número máximo de hilos para paralelizar la consulta.
+            mode (str): 'ends', 'scan' o 'page' (ver get_last_message).
 
         Returns:
             dict: Diccionario donde las claves son ticket_ids y los valores son los últimos mensajes.
         """
         def fetch_last_message(ticket_id):
             try:
-                messages = self.get_messages_by_ticket_id(ticket_id)
-                if not messages or not messages.get('items'):
-                    return None
-                # Ordenar mensajes por fecha de creación para obtener el último
-                sorted_messages = sorted(messages['items'], key=lambda x: x['createDate'], reverse=True)
-                return sorted_messages[0]  # El último mensaje
+                return self.get_last_message(ticket_id, mode=mode)
             except Exception as e:
-                print(f"Error al obtener el último mensaje para el ticket {ticket_id}: {e}")
-                return None
+                logging.warning(f"Error al obtener el último mensaje para el ticket {ticket_id}: {e}")
+                return None, 0
 
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
             results = list(executor.map(fetch_last_message, ticket_ids))
 
+        self.last_message_bytes = {ticket_id: recibidos for ticket_id, (_, recibidos) in zip(ticket_ids, results)}
+        total = sum(self.last_message_bytes.values())
+        logging.info(f"Últimos mensajes ({mode}): {total / 1024:.1f} KiB para {len(ticket_ids)} tickets "
+                     f"({total / max(len(ticket_ids), 1):.0f} B por ticket)")
+
         # Crear un diccionario de ticket_id a último mensaje
-        return {ticket_id: message for ticket_id, message in zip(ticket_ids, results) if message}
+        return {ticket_id: message for ticket_id, (message, _) in zip(ticket_ids, results) if message}
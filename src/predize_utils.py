@@ -31,7 +31,7 @@ def unpack_relevant_tickets(predize_tickets:list):
     return predize_tickets
 
 
-def convert_tickets_to_df(predize_tickets:list)->pd.DataFrame:
+def convert_tickets_to_df(predize_tickets:list, keep_columns=())->pd.DataFrame:
 
     df = pd.json_normalize(predize_tickets)
 
@@ -61,7 +61,7 @@ def convert_tickets_to_df(predize_tickets:list)->pd.DataFrame:
     
 
     for col in ['context','whoResponded','apiId','buyer','observation','tags','lastMessageDate','reasons']:
-        if col in df.columns:
+        if col in df.columns and col not in keep_columns:
             df.drop(columns=col,inplace=True)
 
     # claim_meli = []
@@ -0,0 +1,141 @@
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+
+from tenacity import retry, retry_if_exception_type, stop_after_attempt
+
+# Status HTTP que vale la pena reintentar; el resto de los errores se propaga enseguida
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class RetryableError(Exception):
+    """
+    Error transitorio. `retry_after` (segundos) indica cuánto esperar si el
+    servidor lo pidió explícitamente.
+    """
+
+    def __init__(self, message, retry_after: float = None) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def parse_retry_after(valor) -> float:
+    """
+    Interpreta el header Retry-After (segundos o fecha HTTP). None si no es válido.
+    """
+    if valor is None:
+        return None
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+    try:
+        fecha = parsedate_to_datetime(valor)
+    except (TypeError, ValueError):
+        return None
+    if fecha.tzinfo is None:
+        fecha = fecha.replace(tzinfo=timezone.utc)
+    return max(0.0, (fecha - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_exponencial(intento: int, base: float = 0.5, tope: float = 30.0) -> float:
+    """
+    Backoff exponencial con "full jitter": uniforme en [0, min(tope, base * 2^intento)].
+    """
+    return random.uniform(0, min(tope, base * 2 ** intento))
+
+
+def wait_retry_after_or_backoff(retry_state) -> float:
+    """
+    Estrategia de espera para tenacity: respeta Retry-After si el error lo trae,
+    si no aplica backoff exponencial con jitter.
+    """
+    excepcion = retry_state.outcome.exception()
+    if isinstance(excepcion, RetryableError) and excepcion.retry_after is not None:
+        return excepcion.retry_after
+    return backoff_exponencial(retry_state.attempt_number - 1)
+
+
+def retry_on_retryable(max_attempts: int = 5):
+    """
+    Decorador de reintentos para los pedidos a APIs: solo reintenta RetryableError.
+    """
+    return retry(
+        stop=stop_after_attempt(max_attempts),
+        wait=wait_retry_after_or_backoff,
+        retry=retry_if_exception_type(RetryableError),
+        reraise=True
+    )
+
+
+class TokenBucket:
+    """
+    Token bucket thread-safe: permite `rate` pedidos por segundo con ráfagas de
+    hasta `capacity`. `acquire` bloquea hasta que haya un token disponible.
+
+    Una misma instancia se comparte entre todos los hilos (o corutinas) que
+    pegan a la misma API; `pausar` la frena para todos, por ejemplo ante un 429.
+    Con rate=None no hay límite de ritmo y solo se respetan las pausas.
+    """
+
+    def __init__(self, rate: float = None, capacity: float = None) -> None:
+        self.rate = float(rate) if rate is not None else None
+        self.capacity = float(capacity if capacity is not None else max(rate or 1, 1))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._pausado_hasta = 0.0
+        self._lock = threading.Lock()
+
+    def _reponer(self, ahora):
+        self._tokens = min(self.capacity, self._tokens + (ahora - self._last) * self.rate)
+        self._last = ahora
+
+    def _reservar(self, tokens) -> float:
+        """
+        Consume los tokens si se puede y devuelve 0; si no, los segundos a esperar.
+        """
+        with self._lock:
+            ahora = time.monotonic()
+            if ahora < self._pausado_hasta:
+                return self._pausado_hasta - ahora
+            if self.rate is None:
+                return 0.0
+            self._reponer(ahora)
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def pausar(self, segundos: float) -> None:
+        """
+        Ningún pedido obtiene token durante `segundos` (se respeta la pausa más larga).
+        """
+        with self._lock:
+            self._pausado_hasta = max(self._pausado_hasta, time.monotonic() + segundos)
+
+    def acquire(self, tokens: float = 1) -> float:
+        """
+        Consume `tokens` y devuelve cuántos segundos se esperó.
+        """
+        esperado = 0.0
+        while True:
+            espera = self._reservar(tokens)
+            if espera == 0:
+                return esperado
+            time.sleep(espera)
+            esperado += espera
+
+    async def acquire_async(self, tokens: float = 1) -> float:
+        """
+        Igual que `acquire` pero sin bloquear el event loop.
+        """
+        esperado = 0.0
+        while True:
+            espera = self._reservar(tokens)
+            if espera == 0:
+                return esperado
+            await asyncio.sleep(espera)
+            esperado += espera
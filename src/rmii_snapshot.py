@@ -0,0 +1,209 @@
+import logging
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from database.get_data import get_data_iter
+
+RUTA_SNAPSHOT = 'rmii_snapshot.arrow'
+# Cada cuánto se vuelve a traer la tabla entera (borrados y cambios que el delta no ve)
+MAX_EDAD_SNAPSHOT = 24 * 3600
+TABLA = 'warehouse.raw_merchant_invoice_id'
+
+
+def _leer(ruta):
+    with pa.memory_map(ruta, 'r') as origen:
+        return pa.ipc.open_file(origen).read_all()
+
+
+def _castear(tabla, schema):
+    try:
+        return tabla.cast(schema)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError, ValueError):
+        # p. ej. order_id int64 en el delta y double en un snapshot escrito desde pandas (por nulos)
+        return tabla
+
+
+class RawMerchantInvoiceSnapshot:
+    """
+    Copia local de warehouse.raw_merchant_invoice_id en un archivo Arrow IPC.
+
+    `sincronizar` trae de Postgres solo las filas nuevas (columna_delta mayor
+    al máximo local) y las guarda en un archivo de delta aparte, así cada
+    corrida reescribe solo lo que cambió desde la última carga completa.
+    Con columna_delta='id' el delta no ve los cambios en filas existentes;
+    con un updated_at sí, y la versión del delta reemplaza a la de la base.
+    Ninguno de los dos ve los borrados: por eso cuando la base tiene más de
+    max_edad segundos se vuelve a traer la tabla entera, de a lotes con un
+    cursor del servidor que van directo al archivo (igual que la primera vez).
+    Los archivos se abren mapeados en memoria, sin copiarlos, y las búsquedas
+    por raw_merchant_invoice_id usan un índice hash (pd.Index) armado una vez
+    por proceso.
+
+    Uso:
+        snapshot = RawMerchantInvoiceSnapshot(creds['postgres_admin'])
+        snapshot.sincronizar()
+        df = snapshot.buscar(['2000001234', ...])
+    """
+
+    def __init__(self, credenciales, ruta=RUTA_SNAPSHOT, columna_delta='id', columna_clave='id',
+                 max_edad=MAX_EDAD_SNAPSHOT):
+        self.credenciales = credenciales
+        self.ruta = ruta
+        self.ruta_delta = f"{ruta}.delta"
+        self.columna_delta = columna_delta
+        self.columna_clave = columna_clave
+        self.max_edad = max_edad
+        self._tabla = None
+        self._indice = None
+        self.claves_buscadas = 0
+        self.claves_encontradas = 0
+
+    @property
+    def tabla(self):
+        """
+        pyarrow.Table mapeada en memoria, base más delta (None si todavía no hay snapshot).
+        """
+        if self._tabla is None and os.path.exists(self.ruta):
+            base, delta = _leer(self.ruta), self._delta()
+            if delta is None:
+                self._tabla = base
+            else:
+                # Las filas que volvieron a llegar en el delta reemplazan a las de la base
+                vigentes = pc.invert(pc.is_in(base[self.columna_clave], value_set=delta[self.columna_clave]))
+                self._tabla = pa.concat_tables([base.filter(vigentes), _castear(delta, base.schema)],
+                                               promote_options='permissive')
+        return self._tabla
+
+    def _delta(self):
+        return _leer(self.ruta_delta) if os.path.exists(self.ruta_delta) else None
+
+    def _vencido(self):
+        return self.max_edad is not None and time.time() - os.path.getmtime(self.ruta) > self.max_edad
+
+    def _consulta_delta(self):
+        base = f"SELECT * FROM {TABLA}"
+        if self.tabla is None or self.tabla.num_rows == 0:
+            return base
+        maximo = pc.max(self.tabla[self.columna_delta]).as_py()
+        if maximo is None:
+            return base
+        if isinstance(maximo, (int, float)):
+            return f"{base} WHERE {self.columna_delta} > {maximo}"
+        # updated_at: >= para no perder filas con el mismo timestamp; los repetidos se descartan por clave
+        return f"{base} WHERE {self.columna_delta} >= '{pd.Timestamp(maximo).isoformat()}'"
+
+    def sincronizar(self):
+        """
+        Trae las filas nuevas de Postgres y actualiza el delta, o la tabla
+        entera si no hay snapshot o la base tiene más de max_edad segundos.
+
+        Returns:
+            int: Cantidad de filas recibidas.
+        """
+        if self.tabla is None or self._vencido():
+            # Carga completa: los lotes se escriben a medida que llegan, sin juntar la tabla en memoria
+            lotes = get_data_iter(f"SELECT * FROM {TABLA}", self.credenciales, output='arrow')
+            filas = self._escribir(lotes, self.ruta)
+            if filas and os.path.exists(self.ruta_delta):
+                os.remove(self.ruta_delta)
+            logging.info(f"Snapshot de {TABLA}: carga completa, {filas} filas.")
+            return filas
+        lotes = get_data_iter(self._consulta_delta(), self.credenciales, output='arrow')
+        nuevas = pa.Table.from_batches(list(lotes))
+        logging.info(f"Snapshot de {TABLA}: {nuevas.num_rows} filas nuevas.")
+        recibidas = nuevas.num_rows
+        if recibidas == 0:
+            return 0
+        delta = self._delta()
+        if delta is not None:
+            nuevas = pa.concat_tables([delta, _castear(nuevas, delta.schema)], promote_options='permissive')
+            if self.columna_delta != self.columna_clave:
+                # La versión más nueva de cada fila es la última que llegó
+                claves = nuevas[self.columna_clave].to_numpy(zero_copy_only=False)
+                _, primeras_desde_el_final = np.unique(claves[::-1], return_index=True)
+                nuevas = nuevas.take(np.sort(len(claves) - 1 - primeras_desde_el_final))
+        self._escribir(nuevas.to_batches(), self.ruta_delta, nuevas.schema)
+        return recibidas
+
+    def _escribir(self, lotes, ruta, schema=None):
+        """
+        Escribe los lotes (pyarrow.RecordBatch) en `ruta` y devuelve la cantidad de filas.
+        Sin schema se toma el del primer lote; sin filas el archivo no se toca.
+        """
+        temporal = f"{ruta}.tmp"
+        filas = 0
+        writer = None
+        with pa.OSFile(temporal, 'wb') as destino:
+            try:
+                for lote in lotes:
+                    if writer is None:
+                        schema = schema or lote.schema
+                        writer = pa.ipc.new_file(destino, schema)
+                    writer.write_batch(lote)
+                    filas += lote.num_rows
+            finally:
+                if writer is not None:
+                    writer.close()
+        if filas == 0:
+            os.remove(temporal)
+            return 0
+        # Reemplazo atómico: un proceso que tenga mapeado el archivo viejo lo sigue leyendo entero
+        os.replace(temporal, ruta)
+        self._tabla = None
+        self._indice = None
+        return filas
+
+    @property
+    def indice(self):
+        """
+        Índice hash de raw_merchant_invoice_id -> posición en la tabla.
+        """
+        if self._indice is None:
+            valores = self.tabla['raw_merchant_invoice_id'].to_numpy(zero_copy_only=False) \
+                if self.tabla is not None else np.array([], dtype=object)
+            self._indice = pd.Index(valores)
+        return self._indice
+
+    def buscar(self, claves, columnas=None):
+        """
+        Filas del snapshot cuyo raw_merchant_invoice_id está en `claves`.
+
+        Args:
+            claves (iterable): raw_merchant_invoice_id a buscar.
+            columnas (list, optional): Columnas a devolver; por defecto todas.
+
+        Returns:
+            pd.DataFrame: Una fila por coincidencia, como un `WHERE raw_merchant_invoice_id IN (...)`.
+        """
+        claves = list(dict.fromkeys(str(c) for c in claves if pd.notna(c)))
+        if self.tabla is None:
+            return pd.DataFrame(columns=columnas or ['raw_merchant_invoice_id', 'order_id'])
+        if self.indice.is_unique:
+            posiciones = self.indice.get_indexer(claves)
+        else:
+            posiciones, _ = self.indice.get_indexer_non_unique(claves)
+        posiciones = np.sort(posiciones[posiciones >= 0])
+        self.claves_buscadas += len(claves)
+        self.claves_encontradas += len(set(self.indice[posiciones]))
+        tabla = self.tabla.select(columnas) if columnas else self.tabla
+        return tabla.take(posiciones).to_pandas()
+
+    def filtrar(self, mascara, columnas=None):
+        """
+        Filas del snapshot que cumplen `mascara`, una función que recibe la
+        pyarrow.Table y devuelve un array booleano (p. ej. con pyarrow.compute).
+        """
+        if self.tabla is None:
+            return pd.DataFrame(columns=columnas)
+        tabla = self.tabla.filter(mascara(self.tabla))
+        return (tabla.select(columnas) if columnas else tabla).to_pandas()
+
+    def registrar_estadisticas(self):
+        filas = self.tabla.num_rows if self.tabla is not None else 0
+        logging.info(f"Snapshot de {TABLA}: {filas} filas; claves buscadas={self.claves_buscadas} "
+                     f"encontradas={self.claves_encontradas}")
@@ -0,0 +1,49 @@
+"""
+Ayudas para las caches y el estado en SQLite (EmbeddingCache, OrderIdLookup,
+PipelineState): conexión compartida entre hilos, consultas `IN (...)` por
+lotes y desalojo LRU.
+"""
+import sqlite3
+
+# SQLite limita la cantidad de parámetros por consulta
+MAX_PARAMETROS = 500
+
+
+def conectar(ruta, esquema):
+    """
+    Abre la base en `ruta` y crea las tablas de `esquema` si no existen.
+
+    La conexión se puede usar desde varios hilos (check_same_thread=False):
+    el que la abre tiene que serializar el acceso con un lock.
+    """
+    conn = sqlite3.connect(ruta, check_same_thread=False)
+    conn.executescript(esquema)
+    conn.commit()
+    return conn
+
+
+def seleccionar_en_lotes(conn, consulta, valores, tamanio=MAX_PARAMETROS):
+    """
+    Ejecuta `consulta` (con un `{placeholders}` dentro de `IN (...)`) de a
+    `tamanio` valores y devuelve todas las filas.
+    """
+    valores = list(valores)
+    filas = []
+    for i in range(0, len(valores), tamanio):
+        parte = valores[i:i + tamanio]
+        filas += conn.execute(consulta.format(placeholders=','.join('?' * len(parte))), parte).fetchall()
+    return filas
+
+
+def desalojar_lru(conn, tabla, max_entradas):
+    """
+    Borra las filas de `tabla` usadas hace más tiempo (columna last_used)
+    hasta dejar `max_entradas`. Devuelve cuántas se borraron.
+    """
+    total = conn.execute(f"SELECT COUNT(*) FROM {tabla}").fetchone()[0]
+    sobrantes = total - max_entradas
+    if sobrantes <= 0:
+        return 0
+    conn.execute(f"DELETE FROM {tabla} WHERE rowid IN (SELECT rowid FROM {tabla} ORDER BY last_used LIMIT ?)",
+                 (sobrantes,))
+    return sobrantes
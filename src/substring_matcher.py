@@ -0,0 +1,75 @@
+"""
+Búsqueda de muchos patrones como subcadenas de muchos textos en una sola pasada.
+
+Reemplaza el loop `for patron in patrones: textos.str.contains(patron)`, que
+recorre todos los textos una vez por patrón. Usa un autómata de Aho–Corasick
+(paquete pyahocorasick) si está instalado; si no, un índice de subcadenas
+por largo de patrón, que da el mismo resultado en Python puro.
+"""
+from collections import defaultdict
+
+import pandas as pd
+
+
+def _coincidencias_aho_corasick(textos, patrones):
+    import ahocorasick
+
+    automata = ahocorasick.Automaton()
+    for patron in patrones:
+        automata.add_word(patron, patron)
+    automata.make_automaton()
+    for i, texto in textos:
+        # Un patrón puede aparecer varias veces en el mismo texto: se informa una
+        vistos = {patron for _, patron in automata.iter(texto)}
+        for patron in vistos:
+            yield i, patron
+
+
+def _coincidencias_por_largo(textos, patrones):
+    por_largo = defaultdict(set)
+    for patron in patrones:
+        por_largo[len(patron)].add(patron)
+    for i, texto in textos:
+        vistos = set()
+        for largo, grupo in por_largo.items():
+            for inicio in range(len(texto) - largo + 1):
+                subcadena = texto[inicio:inicio + largo]
+                if subcadena in grupo:
+                    vistos.add(subcadena)
+        for patron in vistos:
+            yield i, patron
+
+
+def buscar_subcadenas(textos, patrones, motor=None):
+    """
+    Encuentra qué patrones aparecen en cada texto, recorriendo los textos una sola vez.
+
+    Equivale a `textos.str.contains(patron, regex=False)` para cada patrón.
+
+    Args:
+        textos (pd.Series): Textos donde buscar (los nulos se ignoran).
+        patrones (iterable): Subcadenas a buscar (los vacíos y repetidos se ignoran).
+        motor (str, optional): 'aho_corasick' o 'largo'; por defecto Aho–Corasick
+            si pyahocorasick está instalado.
+
+    Returns:
+        pd.DataFrame: Columnas `indice` (índice del texto en `textos`) y `patron`,
+            una fila por par que coincide, en el orden de `textos`.
+    """
+    patrones = list(dict.fromkeys(p for p in patrones if isinstance(p, str) and p))
+    pares = [(i, t) for i, t in textos.items() if isinstance(t, str)]
+    if motor is None:
+        try:
+            import ahocorasick  # noqa: F401
+            motor = 'aho_corasick'
+        except ImportError:
+            motor = 'largo'
+    if not patrones or not pares:
+        return pd.DataFrame({'indice': pd.Series(dtype=textos.index.dtype), 'patron': pd.Series(dtype=object)})
+    if motor == 'aho_corasick':
+        coincidencias = _coincidencias_aho_corasick(pares, patrones)
+    elif motor == 'largo':
+        coincidencias = _coincidencias_por_largo(pares, patrones)
+    else:
+        raise ValueError(f"Motor desconocido: {motor}")
+    return pd.DataFrame(list(coincidencias), columns=['indice', 'patron'])
@@ -0,0 +1,100 @@
+"""
+Enrutamiento de mensajes por etiqueta de negocio.
+
+topic_names.txt agrupa los ~143 topics del modelo en unas pocas etiquetas
+("Tracking", "Reembolso", ...). En vez de comparar strings fila por fila, se
+arma una vez un array topic -> id de etiqueta y una máscara int8 por etiqueta,
+y para cada lote se hace un solo gather de NumPy sobre topic_number.
+"""
+import numpy as np
+import pandas as pd
+
+SIN_ETIQUETA = -1
+
+
+class TopicLabels:
+    """
+    Tablas de búsqueda topic_number -> etiqueta a partir del topic_map
+    ({topic_number: topic_name}) que devuelve cargar_topic_names.
+
+    Atributos:
+        etiquetas (list): Etiquetas en orden de aparición; su índice es el id de etiqueta.
+        lookup (np.ndarray): int16, lookup[topic + offset] = id de etiqueta (o SIN_ETIQUETA).
+        mascaras (dict): {etiqueta: np.ndarray int8}, 1 en los topics de esa etiqueta.
+    """
+
+    def __init__(self, topic_map):
+        if not topic_map:
+            raise ValueError("El topic_map está vacío.")
+        topics = np.fromiter(topic_map.keys(), dtype=np.int64)
+        self.offset = int(-topics.min())
+        self.etiquetas = list(dict.fromkeys(topic_map.values()))
+        self.id_etiqueta = {etiqueta: i for i, etiqueta in enumerate(self.etiquetas)}
+        self.lookup = np.full(int(topics.max()) + self.offset + 1, SIN_ETIQUETA, dtype=np.int16)
+        for topic, etiqueta in topic_map.items():
+            self.lookup[topic + self.offset] = self.id_etiqueta[etiqueta]
+        self.mascaras = {etiqueta: (self.lookup == i).astype(np.int8) for etiqueta, i in self.id_etiqueta.items()}
+        self._nombres = np.array(self.etiquetas + [None], dtype=object)
+
+    def _indices(self, topic_numbers):
+        """
+        Posición de cada topic en las tablas, o -1 si es nulo o no está en el topic_map.
+        """
+        topics = pd.to_numeric(pd.Series(topic_numbers), errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+        indices = np.full(len(topics), -1, dtype=np.int64)
+        validos = np.isfinite(topics)
+        posiciones = topics[validos].astype(np.int64) + self.offset
+        posiciones[(posiciones < 0) | (posiciones >= len(self.lookup))] = -1
+        indices[validos] = posiciones
+        return indices
+
+    def ids_etiqueta(self, topic_numbers):
+        """
+        Id de etiqueta (int16) para cada topic_number; SIN_ETIQUETA si no tiene.
+        """
+        indices = self._indices(topic_numbers)
+        return np.where(indices >= 0, self.lookup[indices], SIN_ETIQUETA).astype(np.int16)
+
+    def nombres(self, topic_numbers):
+        """
+        Etiqueta de cada topic_number (None si no tiene), equivalente a .map(topic_map).
+        """
+        return self._nombres[self.ids_etiqueta(topic_numbers)]
+
+    def mascara(self, topic_numbers, etiquetas):
+        """
+        Máscara booleana de las filas cuyo topic pertenece a alguna de `etiquetas`.
+        """
+        combinada = np.zeros(len(self.lookup) + 1, dtype=np.int8)
+        for etiqueta in etiquetas:
+            combinada[:-1] |= self.mascaras[etiqueta]
+        # La última posición (índice -1) es la de los topics sin etiqueta
+        return combinada[self._indices(topic_numbers)].astype(bool)
+
+    def enrutar(self, df, etiquetas=None, columna='topic_number'):
+        """
+        Separa `df` en un DataFrame por etiqueta en una sola pasada: un gather
+        de ids de etiqueta y un ordenamiento estable (cada grupo conserva el
+        orden original de las filas).
+
+        Args:
+            df (pd.DataFrame): Mensajes con la columna de topics.
+            etiquetas (list, optional): Etiquetas a devolver; por defecto todas.
+            columna (str): Columna con el topic_number.
+
+        Returns:
+            dict: {etiqueta: pd.DataFrame} (vacío si no hubo filas de esa etiqueta).
+        """
+        etiquetas = self.etiquetas if etiquetas is None else list(etiquetas)
+        faltantes = [e for e in etiquetas if e not in self.id_etiqueta]
+        if faltantes:
+            raise KeyError(f"Etiquetas que no están en topic_names: {faltantes}")
+        ids = self.ids_etiqueta(df[columna])
+        orden = np.argsort(ids, kind='stable')
+        ids_ordenados = ids[orden]
+        grupos = {}
+        for etiqueta in etiquetas:
+            i = self.id_etiqueta[etiqueta]
+            desde, hasta = np.searchsorted(ids_ordenados, [i, i + 1])
+            grupos[etiqueta] = df.iloc[orden[desde:hasta]]
+        return grupos
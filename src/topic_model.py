@@ -0,0 +1,175 @@
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+import numpy as np
+from bertopic import BERTopic
+from bertopic.backend import SentenceTransformerBackend
+from src.embedding_cache import EmbeddingCache, RUTA_CACHE
+from src.centroid_classifier import CentroidTopicClassifier
+from src.onnx_embedder import OnnxEmbedder, RUTA_ONNX
+
+RUTA_MODELO = 'bertopic_model_post'
+RUTA_TOPIC_NAMES = 'topic_names.txt'
+
+
+def nombre_modelo_embeddings(ruta_modelo=RUTA_MODELO):
+    """
+    Devuelve el nombre del modelo de embeddings declarado en el config.json del modelo.
+    """
+    with open(os.path.join(ruta_modelo, 'config.json')) as f:
+        return json.load(f).get('embedding_model', '')
+
+
+def cargar_embedder(embedding_backend='pytorch', ruta_modelo=RUTA_MODELO, ruta_onnx=RUTA_ONNX):
+    """
+    Carga el modelo de embeddings según el backend elegido.
+
+    Args:
+        embedding_backend (str): 'pytorch' (sentence-transformers) u 'onnx' (int8 con onnxruntime).
+
+    Returns:
+        BaseEmbedder: Embedder compatible con BERTopic.
+    """
+    if embedding_backend == 'onnx':
+        return OnnxEmbedder(ruta_onnx)
+    if embedding_backend == 'pytorch':
+        return SentenceTransformerBackend(nombre_modelo_embeddings(ruta_modelo))
+    raise ValueError(f"Backend de embeddings desconocido: {embedding_backend}")
+
+
+def cargar_modelo_bertopic(ruta_modelo=RUTA_MODELO, embedding_backend='pytorch'):
+    """
+    Carga el modelo BERTopic (y su modelo de embeddings) desde disco.
+
+    Args:
+        ruta_modelo (str): Carpeta con el modelo serializado.
+        embedding_backend (str): 'pytorch' u 'onnx'.
+
+    Returns:
+        BERTopic: Modelo listo para `transform`.
+    """
+    if embedding_backend == 'pytorch':
+        modelo = BERTopic.load(ruta_modelo)
+    else:
+        modelo = BERTopic.load(ruta_modelo, embedding_model=cargar_embedder(embedding_backend, ruta_modelo))
+    logging.info(f"Modelo BERTopic cargado (embeddings: {embedding_backend}).")
+    return modelo
+
+
+def cargar_clasificador_centroides(ruta_modelo=RUTA_MODELO, temperatura=None, embedding_backend='pytorch'):
+    """
+    Carga el clasificador por centroides (sin UMAP/HDBSCAN) y su modelo de embeddings.
+    Sin `temperatura` usa la ajustada y guardada junto a topic_embeddings.bin.
+
+    Returns:
+        CentroidTopicClassifier: Clasificador con la misma interfaz `transform` que BERTopic.
+    """
+    embedding_model = cargar_embedder(embedding_backend, ruta_modelo)
+    clasificador = CentroidTopicClassifier(embedding_model, ruta_modelo, temperatura=temperatura)
+    logging.info(f"Clasificador por centroides cargado (embeddings: {embedding_backend}, "
+                 f"temperatura: {clasificador.temperatura}).")
+    return clasificador
+
+
+def cargar_topic_names(ruta_topic_names=RUTA_TOPIC_NAMES):
+    """
+    Lee el archivo `topic_number: topic_name` y devuelve un diccionario.
+
+    Args:
+        ruta_topic_names (str): Ruta del archivo de nombres de topics.
+
+    Returns:
+        dict: Diccionario {topic_number (int): topic_name (str)}.
+    """
+    topic_map = {}
+    with open(ruta_topic_names, 'r') as f:
+        for line in f:
+            topic_number, topic_name = line.strip().split(': ')
+            topic_map[int(topic_number)] = topic_name
+    logging.info("Topic names cargados.")
+    return topic_map
+
+
+def cargar_en_segundo_plano(funcion, *args, **kwargs):
+    """
+    Corre `funcion(*args, **kwargs)` en un hilo daemon y devuelve un Future con
+    el resultado, para que la carga del modelo se solape con los pasos de red.
+
+    A diferencia de un ThreadPoolExecutor, el hilo es daemon: si el flujo
+    termina antes de necesitar el modelo (no hubo tickets nuevos), el proceso
+    sale sin esperar a que la carga termine.
+    """
+    futuro = Future()
+
+    def correr():
+        if not futuro.set_running_or_notify_cancel():
+            return
+        inicio = time.perf_counter()
+        try:
+            futuro.set_result(funcion(*args, **kwargs))
+            logging.info(f"{funcion.__name__} terminó en segundo plano en {time.perf_counter() - inicio:.2f}s.")
+        except BaseException as e:
+            futuro.set_exception(e)
+
+    threading.Thread(target=correr, name=f"carga-{funcion.__name__}", daemon=True).start()
+    return futuro
+
+
+def crear_cache_embeddings(ruta_modelo=RUTA_MODELO, ruta_cache=RUTA_CACHE, embedding_backend='pytorch',
+                           **kwargs):
+    """
+    Crea la cache de embeddings asociada al modelo de embeddings del config.json.
+    Los vectores int8/ONNX se guardan bajo otra clave que los de PyTorch.
+    """
+    nombre_modelo = nombre_modelo_embeddings(ruta_modelo)
+    if embedding_backend != 'pytorch':
+        nombre_modelo = f"{nombre_modelo}:{embedding_backend}"
+    return EmbeddingCache(ruta_cache, nombre_modelo=nombre_modelo, **kwargs)
+
+
+def embeber_mensajes(modelo, mensajes, cache=None):
+    """
+    Calcula los embeddings de los mensajes con el modelo de embeddings de BERTopic,
+    reutilizando los que ya estén en `cache`.
+    """
+    funcion_embedding = modelo.embedding_model.embed_documents
+    if cache is None:
+        return funcion_embedding(mensajes)
+    return cache.embeber(mensajes, funcion_embedding)
+
+
+def probabilidad_maxima(probs, n_mensajes):
+    """
+    Reduce la salida de probabilidades de BERTopic a un valor por mensaje.
+
+    Con calculate_probabilities=False BERTopic devuelve un vector 1D (o None),
+    con True (o con CentroidTopicClassifier) devuelve una matriz mensajes x topics.
+    """
+    if probs is None:
+        return np.full(n_mensajes, np.nan)
+    probs = np.asarray(probs, dtype=float)
+    if probs.ndim == 2:
+        return probs.max(axis=1)
+    return probs
+
+
+def asignar_topics(modelo, mensajes, cache=None):
+    """
+    Clasifica una lista de mensajes con el modelo.
+
+    Args:
+        modelo (BERTopic | CentroidTopicClassifier): Modelo cargado.
+        mensajes (list): Lista de textos.
+        cache (EmbeddingCache, optional): Si se indica, solo se embeben los mensajes nuevos.
+
+    Returns:
+        tuple: (topics, probabilidades) como arrays de numpy, uno por mensaje.
+    """
+    if not mensajes:
+        return np.array([], dtype=int), np.array([], dtype=float)
+    embeddings = embeber_mensajes(modelo, mensajes, cache) if cache is not None else None
+    topics, probs = modelo.transform(mensajes, embeddings=embeddings)
+    return np.asarray(topics, dtype=int), probabilidad_maxima(probs, len(mensajes))
@@ -0,0 +1,195 @@
+"""
+Worker residente para la clasificación de topics.
+
+Carga BERTopic y topic_names.txt una sola vez y atiende lotes de
+(ticket_id, message) por un socket local, de modo que las corridas de main.py
+no vuelvan a pagar la carga del modelo.
+
+Los mensajes viajan serializados con pickle, así que worker y cliente tienen
+que compartir una clave secreta en TOPIC_WORKER_AUTHKEY; sin ella no arrancan.
+
+Uso:
+    TOPIC_WORKER_AUTHKEY=... python -m src.topic_worker                      # escucha en TOPIC_WORKER_ADDRESS
+    TOPIC_WORKER_AUTHKEY=... TOPIC_WORKER_ADDRESS=localhost:6123 python main.py
+"""
+import argparse
+import logging
+import os
+import threading
+from multiprocessing.connection import Listener, Client
+
+from src.topic_model import (RUTA_MODELO, RUTA_TOPIC_NAMES, cargar_modelo_bertopic,
+                             cargar_topic_names, asignar_topics, crear_cache_embeddings,
+                             cargar_clasificador_centroides)
+
+DIRECCION_POR_DEFECTO = 'localhost:6123'
+
+
+def parsear_direccion(direccion):
+    """
+    Convierte 'host:puerto' en la tupla que espera multiprocessing.connection.
+    Cualquier otro valor se usa tal cual (socket Unix).
+    """
+    if ':' in direccion:
+        host, puerto = direccion.rsplit(':', 1)
+        return (host, int(puerto))
+    return direccion
+
+
+def _authkey():
+    """
+    Clave compartida de TOPIC_WORKER_AUTHKEY. No hay valor por defecto: con una
+    clave conocida cualquier proceso local podría mandar un pickle al worker.
+    """
+    clave = os.getenv('TOPIC_WORKER_AUTHKEY')
+    if not clave:
+        raise RuntimeError("TOPIC_WORKER_AUTHKEY no está definida; el topic worker necesita una clave secreta.")
+    return clave.encode()
+
+
+class TopicWorker:
+    """
+    Mantiene el modelo en memoria y clasifica lotes bajo pedido.
+    """
+
+    def __init__(self, ruta_modelo=RUTA_MODELO, ruta_topic_names=RUTA_TOPIC_NAMES, usar_cache=True,
+                 clasificador='bertopic', embedding_backend='pytorch', temperatura=None):
+        if clasificador == 'centroides':
+            self.modelo = cargar_clasificador_centroides(ruta_modelo, temperatura=temperatura,
+                                                         embedding_backend=embedding_backend)
+        else:
+            self.modelo = cargar_modelo_bertopic(ruta_modelo, embedding_backend=embedding_backend)
+        self.topic_map = cargar_topic_names(ruta_topic_names)
+        self.cache = (crear_cache_embeddings(ruta_modelo, embedding_backend=embedding_backend)
+                      if usar_cache else None)
+        # BERTopic no garantiza ser thread-safe: un lote a la vez
+        self._lock = threading.Lock()
+
+    def clasificar(self, lote):
+        """
+        Args:
+            lote (list): Lista de tuplas (ticket_id, message).
+
+        Returns:
+            list: Un diccionario por mensaje con ticket_id, topic_number,
+            topic_name y probability.
+        """
+        ticket_ids = [ticket_id for ticket_id, _ in lote]
+        mensajes = [mensaje for _, mensaje in lote]
+        with self._lock:
+            topics, probabilidades = asignar_topics(self.modelo, mensajes, self.cache)
+            if self.cache is not None:
+                self.cache.registrar_estadisticas()
+        return [
+            {
+                'ticket_id': ticket_id,
+                'topic_number': int(topic),
+                'topic_name': self.topic_map.get(int(topic)),
+                'probability': float(probabilidad)
+            }
+            for ticket_id, topic, probabilidad in zip(ticket_ids, topics, probabilidades)
+        ]
+
+    def _atender(self, conn):
+        with conn:
+            while True:
+                try:
+                    pedido = conn.recv()
+                except EOFError:
+                    return
+                if pedido == 'ping':
+                    conn.send('pong')
+                    continue
+                try:
+                    respuesta = {'resultados': self.clasificar(pedido)}
+                except Exception as e:
+                    logging.error(f"Error al clasificar lote en el worker: {e}")
+                    respuesta = {'error': str(e)}
+                try:
+                    conn.send(respuesta)
+                except OSError:
+                    # El cliente cerró la conexión por timeout antes de la respuesta
+                    return
+
+    def servir(self, direccion=DIRECCION_POR_DEFECTO):
+        """
+        Escucha conexiones indefinidamente; cada cliente se atiende en un hilo.
+        """
+        with Listener(parsear_direccion(direccion), authkey=_authkey()) as listener:
+            logging.info(f"Topic worker escuchando en {direccion}.")
+            while True:
+                conn = listener.accept()
+                threading.Thread(target=self._atender, args=(conn,), daemon=True).start()
+
+
+class TopicWorkerClient:
+    """
+    Cliente del worker residente. Expone `clasificar` con la misma salida que
+    TopicWorker.clasificar.
+    """
+
+    def __init__(self, direccion=DIRECCION_POR_DEFECTO, timeout=None):
+        self.direccion = direccion
+        self.timeout = timeout
+        self._conn = self._conectar()
+
+    def _conectar(self):
+        return Client(parsear_direccion(self.direccion), authkey=_authkey())
+
+    def _conexion(self):
+        if self._conn is None:
+            self._conn = self._conectar()
+        return self._conn
+
+    def ping(self):
+        self._conexion().send('ping')
+        return self._conn.recv() == 'pong'
+
+    def clasificar(self, lote):
+        self._conexion().send(list(lote))
+        if self.timeout is not None and not self._conn.poll(self.timeout):
+            # La respuesta tardía llegaría como respuesta del próximo lote: se descarta
+            # la conexión y el próximo pedido abre otra
+            self.close()
+            raise TimeoutError(f"El topic worker no respondió en {self.timeout}s.")
+        respuesta = self._conn.recv()
+        if 'error' in respuesta:
+            raise Exception(f"Error en el topic worker: {respuesta['error']}")
+        return respuesta['resultados']
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        level=logging.INFO,
+        handlers=[
+            logging.FileHandler("pipeline_logs.log"),
+            logging.StreamHandler()
+        ]
+    )
+    parser = argparse.ArgumentParser(description="Worker residente de BERTopic.")
+    parser.add_argument('--address', default=os.getenv('TOPIC_WORKER_ADDRESS', DIRECCION_POR_DEFECTO))
+    parser.add_argument('--modelo', default=RUTA_MODELO)
+    parser.add_argument('--topic-names', default=RUTA_TOPIC_NAMES)
+    parser.add_argument('--clasificador', choices=['bertopic', 'centroides'],
+                        default=os.getenv('TOPIC_CLASIFICADOR', 'bertopic'))
+    parser.add_argument('--embedding-backend', choices=['pytorch', 'onnx'],
+                        default=os.getenv('EMBEDDING_BACKEND', 'pytorch'))
+    parser.add_argument('--temperatura', type=float, default=os.getenv('TOPIC_TEMPERATURA'),
+                        help="clasificador por centroides; por defecto la ajustada que se guardó con el modelo")
+    args = parser.parse_args()
+    _authkey()  # falla antes de cargar el modelo si falta la clave
+
+    TopicWorker(args.modelo, args.topic_names, clasificador=args.clasificador,
+                embedding_backend=args.embedding_backend, temperatura=args.temperatura).servir(args.address)